@@ -7,8 +7,11 @@ import typer
 from dotenv import load_dotenv
 
 from python_arango_ogm.db.pao_database import PAODatabase
+from python_arango_ogm.db.pao_index_advisor import PAOIndexAdvisor
 from python_arango_ogm.db.pao_migration_builder import PAOMigrationBuilder
 from python_arango_ogm.db.pao_migrator import PAOMigrator
+from python_arango_ogm.db.pao_model_discovery import PAOModelDiscovery
+from python_arango_ogm.db.pao_query_shapes import PAOQueryShapeLog
 
 # print("Setting app root to ", os.getcwd())
 app = typer.Typer()
@@ -70,6 +73,23 @@ def list_migrations(env_file: str = None):
     print(json.dumps(migrations, indent=4))
 
 
+@app.command()
+def advise(query_log: str, env_file: str = None):
+    """
+    Explain recorded query shapes (see PAO_QUERY_SHAPE_LOG) against the migrated database; reporting
+    full collection scans and in-memory sorts, with migration snippets for indexes to cover them.
+
+    @params:
+        query_log is the file of recorded query shapes
+    """
+    get_app_root()
+    load_environment(env_file=env_file)
+    pao_db = PAODatabase()
+    advisor = PAOIndexAdvisor(pao_db, PAOModelDiscovery().discover())
+    advice = advisor.advise(PAOQueryShapeLog.load(query_log))
+    print(advisor.format_report(advice))
+
+
 def load_environment(env_file):
     """ Load given environment file, if it exists. """
     if env_file:
@@ -0,0 +1,935 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import time
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, Literal, NamedTuple, Optional, Sequence,
+    Tuple, Union
+)
+
+import httpx
+from loguru import logger
+
+from python_arango_ogm.db.pao_connection import PAOConnectionConfig
+from python_arango_ogm.db.pao_db_base import (
+    ACTIVE_TRANSACTION, CursorOptions, Page, PAODBBase, TraversalDirectionEnum, TraversalResultEnum, invalidates_cache
+)
+from python_arango_ogm.db.pao_migration_model import PAOMigrationModel
+from python_arango_ogm.db.pao_model_discovery import PAOModelDiscovery
+from python_arango_ogm.db.pao_query_builder import PAOQueryBuilder
+from python_arango_ogm.db.pao_query_cache import CACHE_MISS, PAOQueryCache
+from python_arango_ogm.db.pao_query_compiler import CompiledQuery, PAOQueryCompiler
+from python_arango_ogm.db.pao_query_profiler import QueryProfile, QueryRun
+from python_arango_ogm.utils import iter_util
+
+
+class PAOServerError(RuntimeError):
+    """ Error response from the ArangoDB server """
+
+    def __init__(self, response: httpx.Response):
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        self.http_code = response.status_code
+        self.error_num = body.get('errorNum')
+        self.error_message = body.get('errorMessage', response.text)
+        super().__init__(f"[HTTP {self.http_code}][ERR {self.error_num}] {self.error_message}")
+
+
+class StreamTransaction(NamedTuple):
+    """ A stream transaction, and the host (coordinator) it was begun on """
+    transaction_id: str
+    host_index: int
+
+
+class AsyncPAOCursor:
+    """
+    Cursor over the result of an AQL query.  Consume documents with `async for`, or whole
+    batches with `batches()`.  The server cursor is deleted if the consumer stops early.
+    If `prefetch` is given, a task fetches up to that many batches ahead of the consumer.
+    If `run` is given, the query is profiled when the cursor is closed.
+    """
+
+    def __init__(
+            self,
+            pao_db: AsyncPAODatabase,
+            body: Dict[str, Any],
+            host_index: int = None,
+            prefetch: int = 0,
+            run: QueryRun = None
+    ):
+        self._pao_db = pao_db
+        self._host_index = host_index
+        self._prefetch = prefetch
+        self._run = run
+        self._id = body.get('id')
+        self._batch = body.get('result', [])
+        self._has_more = body.get('hasMore', False)
+        self.count = body.get('count')
+        self.extra = body.get('extra', {})
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.docs()
+
+    async def docs(self) -> AsyncIterator[Dict[str, Any]]:
+        """ Yield documents, fetching batches from the server as needed """
+        async for batch in self.batches():
+            for doc in batch:
+                yield doc
+
+    async def batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """ Yield batches of documents, fetching from the server as needed """
+        batches = self._prefetched_batches() if self._prefetch else self._fetched_batches()
+        try:
+            async for batch in batches:
+                yield batch
+        finally:
+            await batches.aclose()
+            await self.close()
+
+    async def _fetched_batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        while True:
+            batch, self._batch = self._batch, []
+            if self._run:
+                self._run.add_batch(len(batch))
+            yield batch
+            if not self._has_more:
+                break
+            start_time = time.perf_counter()
+            body = await self._pao_db._request('POST', f"/_api/cursor/{self._id}", host_index=self._host_index)
+            if self._run:
+                self._run.add_time(start_time)
+            self._batch = body['result']
+            self._has_more = body['hasMore']
+            self.extra = body.get('extra', self.extra)
+
+    async def _prefetched_batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        batches = asyncio.Queue(maxsize=self._prefetch)
+
+        async def fetch_batches():
+            try:
+                async for batch in self._fetched_batches():
+                    await batches.put(batch)
+                await batches.put(None)
+            except Exception as e:
+                await batches.put(e)
+
+        task = asyncio.create_task(fetch_batches())
+        try:
+            while (item := await batches.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def first(self) -> Optional[Dict[str, Any]]:
+        """ Return first document (or None) and close cursor """
+        try:
+            if self._run:
+                self._run.add_batch(len(self._batch))
+            result = self._batch[0] if self._batch else None
+        finally:
+            await self.close()
+        return result
+
+    async def to_list(self) -> List[Dict[str, Any]]:
+        """ Return all documents as a list """
+        return [doc async for doc in self.docs()]
+
+    async def close(self):
+        """ Delete the server cursor if it has not been exhausted, and profile its query """
+        if self._has_more and self._id:
+            self._has_more = False
+            await self._pao_db._request(
+                'DELETE', f"/_api/cursor/{self._id}", ignore_missing=True, host_index=self._host_index
+            )
+        if self._run:
+            run, self._run = self._run, None
+            await self._pao_db._finish_query(run, self.extra.get('stats'))
+
+
+class AsyncPAODatabase(PAOQueryBuilder, PAODBBase):
+    """
+    Native asyncio database, implementing the PAODBBase contract with awaitable methods.
+    Requests are made through a single pooled httpx.AsyncClient, so many independent queries
+    may run concurrently (see `gather`).  It injects itself into models as `async_db`.
+
+    Usage:
+        async with AsyncPAODatabase() as pao_db:
+            await pao_db.setup_app_database()
+            foo = await FooModel.find_by_key_async(key)
+    """
+
+    def __init__(
+            self,
+            use_plan_cache: bool = None,
+            connection_config: PAOConnectionConfig = None,
+            query_cache: PAOQueryCache = None,
+            slow_query_ms: float = None
+    ):
+        """
+        :param use_plan_cache: Opt into ArangoDB's query plan cache (requires ArangoDB 3.12.4+).
+        Defaults to PAO_DB_USE_PLAN_CACHE from the environment.
+        :param connection_config: Connection pooling, keep-alive, retry and host settings;
+        defaults to settings from the environment.
+        :param query_cache: Cache for results of reads on models with a CACHE_TTL; defaults to
+        a PAOLRUQueryCache if PAO_RESULT_CACHE_ENTRIES is set in the environment.
+        :param slow_query_ms: Log queries slower than this, with their plans; defaults to
+        PAO_SLOW_QUERY_MS from the environment (unset disables the slow query log).
+        """
+        self.app_db_name = os.getenv('PAO_APP_DB_NAME')
+        root_user = os.getenv('PAO_DB_ROOT_USER')
+        root_password = os.getenv('PAO_DB_ROOT_PASS')
+        self.app_user = os.getenv('PAO_APP_DB_USER', 'root')
+        self.app_pass = os.getenv('PAO_APP_DB_PASS')
+
+        if self.app_db_name is None:
+            raise ValueError("PAO_APP_DB_NAME needs to be defined in environment or in a .env file.")
+
+        if root_user is None:
+            raise ValueError("PAO_DB_ROOT_USER needs to be defined in environment or in a .env file.")
+
+        if root_password is None:
+            raise ValueError('PAO_DB_ROOT_PASS needs to be defined in environment or in a .env file.')
+
+        if self.app_pass is None:
+            raise ValueError('PAO_APP_DB_PASS needs to be defined in environment or in a .env file.')
+
+        if use_plan_cache is None:
+            use_plan_cache = os.getenv('PAO_DB_USE_PLAN_CACHE', 'false').lower() in ['1', 'true', 'yes']
+        self.use_plan_cache = use_plan_cache
+        super().__init__(query_cache, slow_query_ms)
+
+        self.connection_config = connection_config or PAOConnectionConfig()
+        self.host_resolver = self.connection_config.create_resolver()
+        self.root_auth = httpx.BasicAuth(root_user, root_password)
+        self.client = self.connection_config.create_async_client(httpx.BasicAuth(self.app_user, self.app_pass))
+        self.inject_into_models()
+
+    async def __aenter__(self) -> AsyncPAODatabase:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """ Close the underlying HTTP client and its connections """
+        await self.client.aclose()
+
+    async def setup_app_database(self, delete_db: bool = False):
+        """
+        Setup app databases; deleting if specified by delete_db
+        """
+        databases = await self._request('GET', '/_api/database', sys_db=True)
+        create_db = True
+        if self.app_db_name in databases['result']:
+            if delete_db:
+                await self._request('DELETE', f"/_api/database/{self.app_db_name}", sys_db=True, ignore_missing=True)
+            else:
+                create_db = False
+        if create_db:
+            await self._request('POST', '/_api/database', sys_db=True, json={
+                'name': self.app_db_name,
+                'users': [{'username': self.app_user, 'passwd': self.app_pass, 'active': True}]
+            })
+
+    def inject_into_models(self):
+        """ Inject database into models as `async_db`, as AsyncPAODatabase is where the functionality is implemented."""
+        discoverer = PAOModelDiscovery()
+        model_hash: Dict[str, any] = discoverer.discover()
+        for m, model in model_hash.items():
+            logger.debug(f"Injecting async DB into model {m}")
+            model.async_db = self
+
+        # Inject into built-in models:
+        PAOMigrationModel.async_db = self
+
+    def get_db(self) -> httpx.AsyncClient:
+        """ Return underlying HTTP client"""
+        return self.client
+
+    def connection_stats(self) -> Dict[str, Dict[str, Any]]:
+        """ Return request and pool saturation stats per host (see PAOConnectionStats.as_dict) """
+        return self.connection_config.stats.as_dict()
+
+    @contextlib.asynccontextmanager
+    async def transaction(
+            self,
+            write: Sequence[str] = None,
+            read: Sequence[str] = None,
+            exclusive: Sequence[str] = None,
+            lock_timeout: int = None,
+            max_size: int = None,
+            sync: bool = None,
+            allow_implicit: bool = True
+    ) -> AsyncIterator[StreamTransaction]:
+        """
+        Run a stream transaction; see `PAODBBase.transaction`.  Requests within it are sent with its id,
+        to the coordinator it was begun on.  A stream transaction runs one request at a time, so awaitables
+        within it shouldn't be run concurrently (e.g., with `gather`):
+
+            async with pao_db.transaction(write=['foo', 'foo__bar']):
+                foo = await FooModel.insert_async({...})
+        """
+        transaction = self._transaction_handle()
+        if transaction is not None:
+            yield transaction
+            return
+
+        options = self._transaction_options(write, read, exclusive, lock_timeout, max_size, sync, allow_implicit)
+        data = {
+            'collections': {k: options[k] for k in ['read', 'write', 'exclusive']},
+            'lockTimeout': options['lock_timeout'],
+            'maxTransactionSize': options['max_size'],
+            'waitForSync': options['sync'],
+            'allowImplicit': options['allow_implicit']
+        }
+        response, host_index = await self._send(
+            'POST', '/_api/transaction/begin', json={k: v for k, v in data.items() if v is not None}
+        )
+        transaction = StreamTransaction(self._parse_response(response)['result']['id'], host_index)
+        logger.debug(f"BEGIN transaction {transaction.transaction_id}")
+        token = ACTIVE_TRANSACTION.set((self, transaction))
+        try:
+            yield transaction
+        except BaseException:
+            await self._request(
+                'DELETE', f"/_api/transaction/{transaction.transaction_id}", host_index=transaction.host_index
+            )
+            raise
+        else:
+            await self._request(
+                'PUT', f"/_api/transaction/{transaction.transaction_id}", host_index=transaction.host_index
+            )
+        finally:
+            self._end_transaction(token, options)
+
+    async def gather(self, *aws: Awaitable, concurrency: int = None) -> List[Any]:
+        """
+        Run given awaitables (e.g., independent queries) concurrently over the pooled client,
+        returning their results in order.  At most `concurrency` run at once, if given.
+        """
+        if concurrency is None:
+            return await asyncio.gather(*aws)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(aw: Awaitable):
+            async with semaphore:
+                return await aw
+
+        return await asyncio.gather(*[limited(aw) for aw in aws])
+
+    async def execute(self, query: CompiledQuery, count: bool = False, batch_size: int = None,
+                      ttl: int = None, stream: bool = None, prefetch: int = 0) -> AsyncPAOCursor:
+        """ Execute compiled query, returning a cursor; fetching up to `prefetch` batches ahead if given """
+        data = {'query': query.aql, 'bindVars': query.bind_vars, 'count': count}
+        options = {}
+        if batch_size is not None:
+            data['batchSize'] = batch_size
+        if ttl is not None:
+            data['ttl'] = ttl
+        if stream is not None:
+            options['stream'] = stream
+        if self.use_plan_cache:
+            options['usePlanCache'] = True
+        if options:
+            data['options'] = options
+
+        logger.debug(f"AQL: {query.aql}")
+        run = self.query_profiler.start(query)
+        start_time = time.perf_counter()
+        response, host_index = await self._send('POST', '/_api/cursor', json=data)
+        body = self._parse_response(response)
+        run.add_time(start_time)
+        # Cursors live on the coordinator that created them; so further batches are fetched from the same host:
+        return AsyncPAOCursor(self, body, host_index, prefetch, run)
+
+    async def explain(self, query: CompiledQuery) -> Dict[str, Any]:
+        """ Return the optimizer's plan for compiled query, without executing it """
+        body = await self._request('POST', '/_api/explain', json={'query': query.aql, 'bindVars': query.bind_vars})
+        return body['plan']
+
+    def add_query_hook(self, hook: Callable[[QueryProfile], Any]):
+        """ Register hook, called with a QueryProfile of each executed query """
+        self.query_profiler.add_hook(hook)
+
+    def remove_query_hook(self, hook: Callable[[QueryProfile], Any]):
+        self.query_profiler.remove_hook(hook)
+
+    async def _finish_query(self, run: QueryRun, stats: Dict[str, Any] = None):
+        """ Profile finished query run; logging it with its plan if it was slow """
+        profile = self.query_profiler.finish(run, stats)
+        if self.query_profiler.is_slow(profile):
+            plan = None
+            if self.query_profiler.needs_plan(profile):
+                try:
+                    plan = await self.explain(run.query)
+                except (PAOServerError, httpx.HTTPError) as e:
+                    logger.warning(f"Could not explain slow query: {e}")
+            self.query_profiler.log_slow_query(profile, plan)
+
+    async def find_by_key(
+            self,
+            collection_name: str,
+            key: Any,
+            rev: str = None,
+            cache_ttl: float = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+          Find document on collection by given key value, using the document API.
+          If `rev` is given, the document's revision must match.
+          The result is cached for cache_ttl seconds, if given and the database has a query_cache.
+          If only (or exclude) is given, the document is projected with a primary index query instead.
+        """
+        if only or exclude:
+            query = self._compile_by_key(collection_name, key, rev, only, exclude)
+            return await self._read_through_async(
+                collection_name, ('first', *PAOQueryCache.query_key(query)), cache_ttl, lambda: self._first_doc(query)
+            )
+        return await self._read_through_async(collection_name, ('key', key, rev), cache_ttl, lambda: self._request(
+            'GET', f"/_api/document/{collection_name}/{key}", headers=self._rev_headers(rev), ignore_missing=True
+        ))
+
+    async def find_by_keys(
+            self,
+            collection_name: str,
+            keys: Sequence[str],
+            chunk_size: int = 500,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None,
+            concurrency: int = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Find documents by given keys (or _id strings) with chunked multi-document requests, run concurrently;
+        at most `concurrency` at once (by default, the connection pool size).
+        If only (or exclude) is given, each chunk is instead projected by a query on the primary index.
+        Returns documents in the order of given keys, with None for keys that were not found.
+        """
+        handles, collection_keys = self._group_handles(collection_name, keys)
+        if only or exclude:
+            async def query_chunk(chunk):
+                query = self._compile_by_handles(chunk, only, exclude)
+                return await (await self.execute(query, **self._cursor_options())).to_list()
+
+            requests = [query_chunk(c) for c in iter_util.chunken(list(dict.fromkeys(handles)), chunk_size)]
+        else:
+            requests = [
+                self._request('PUT', f"/_api/document/{coll_name}", json=[{'_key': k} for k in chunk],
+                              params={'onlyget': True})
+                for coll_name, coll_keys in collection_keys.items()
+                for chunk in iter_util.chunken(coll_keys, chunk_size)
+            ]
+        docs = {}
+        concurrency = concurrency or self.connection_config.pool_size
+        for chunk_docs in await self.gather(*requests, concurrency=concurrency):
+            docs.update({doc['_id']: doc for doc in chunk_docs if doc and '_id' in doc})
+
+        return [docs.get(handle) for handle in handles]
+
+    async def get_related_edges(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None
+    ) -> AsyncPAOCursor:
+        """
+        Gets `association_collection_name` edges of `collection_name`;
+        looking up by the keys and values in `lookup_key_dict`:
+        """
+        query = self._compile_related_edges(collection_name, association_collection_name, lookup_key_dict)
+        return await self.execute(query, **self._cursor_options(cursor_options))
+
+    async def get_related_vertices(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> AsyncPAOCursor:
+        """
+        Lookup associated vertices (`association_collection_name`) through edges,
+        from given collection_name, using keys and values in lookup_key_dict;
+        projected to only (or all but exclude) attributes, if given:
+        """
+        query = self._compile_related_vertices(
+            collection_name, association_collection_name, lookup_key_dict, only, exclude
+        )
+        return await self.execute(query, **self._cursor_options(cursor_options))
+
+    async def get_page(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict = None,
+            sort_key_dict: Dict[str, str] = None,
+            page_size: int = 100,
+            after: str = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Page:
+        """
+        Gets a page of documents, seeking past the page given by token `after`; see `PAODBBase.get_page`.
+        """
+        query = self._compile_page(collection_name, lookup_key_dict, sort_key_dict, page_size, after, only, exclude)
+        cursor = await self.execute(query, **self._cursor_options({'batch_size': page_size + 1}))
+        return self._page(await cursor.to_list(), sort_key_dict, page_size)
+
+    async def get_related_vertices_by_parent(
+            self,
+            edge_collection_name: str,
+            parent_ids: Sequence[str],
+            limit: int = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lookup vertices associated through edge_collection_name with each of parent_ids, with a single query;
+        returning lists of up to `limit` vertices (projected, if only or exclude is given), by parent _id.
+        """
+        query = self._compile_related_vertices_by_parent(edge_collection_name, parent_ids, limit, only, exclude)
+        cursor = await self.execute(query, **self._cursor_options())
+        return {row['parent_id']: row['related'] async for row in cursor}
+
+    async def traverse(
+            self,
+            start_id: str,
+            edge_collection_names: Sequence[str] = None,
+            depth: Tuple[int, int] = (1, 1),
+            direction: TraversalDirectionEnum = TraversalDirectionEnum.OUTBOUND,
+            prune: Dict[str, Any] = None,
+            edge_filter: Dict[str, Any] = None,
+            vertex_filter: Dict[str, Any] = None,
+            result: TraversalResultEnum = TraversalResultEnum.VERTICES,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None
+    ) -> AsyncPAOCursor:
+        """
+        Traverse from vertex start_id on the server; returning a cursor of vertices, edges or paths.
+        See `PAODBBase.traverse`.
+        """
+        query = self._compile_traversal(
+            start_id, edge_collection_names, depth, direction, prune, edge_filter, vertex_filter, result
+        )
+        return await self.execute(query, **self._cursor_options(cursor_options))
+
+    async def find_by_attributes(self, collection_name: str, lookup_key_dict: Dict = None, cache_ttl: float = None):
+        """
+        Find a single document by given collection_name,
+        looking up by the keys and values in lookup_key_dict:
+        """
+        query = self._compile_by_attributes(collection_name, lookup_key_dict)
+        return await self._read_through_async(
+            collection_name, ('first', *PAOQueryCache.query_key(query)), cache_ttl, lambda: self._first_doc(query)
+        )
+
+    async def _first_doc(self, query: CompiledQuery) -> Optional[Dict[str, Any]]:
+        cursor = await self.execute(query, **self._cursor_options({'batch_size': 1}))
+        return await cursor.first()
+
+    async def get_by_attributes(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            sort_key_dict: Dict[str, Literal['ASC', 'DESC', '']] = None,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None,
+            cache_ttl: float = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> AsyncPAOCursor:
+        """
+        Gets documents from given collection_name, looking up by the keys and values
+        in lookup_key_dict, sorting by keys and direction (projected to only, or all but exclude, attributes);
+        returning a cursor.  Results are cached for cache_ttl seconds, if given and the database has a query_cache.
+        """
+        query = self._compile_by_attributes(collection_name, lookup_key_dict, sort_key_dict, only, exclude)
+        if not (cache_ttl and self.query_cache):
+            return await self.execute(query, **self._cursor_options(cursor_options))
+
+        async def read_docs():
+            return await (await self.execute(query, **self._cursor_options(cursor_options))).to_list()
+
+        docs = await self._read_through_async(
+            collection_name, ('query', *PAOQueryCache.query_key(query)), cache_ttl, read_docs
+        )
+        return AsyncPAOCursor(self, {'result': docs, 'hasMore': False})
+
+    async def count(self, collection_name: str, lookup_key_dict: Dict[str, Any] = None, cache_ttl: float = None) -> int:
+        """
+        Count documents matching the keys and values in lookup_key_dict with a COLLECT query;
+        or, without a lookup, with the collection's count endpoint.
+        """
+        if not lookup_key_dict:
+            async def collection_count():
+                return (await self._request('GET', f"/_api/collection/{collection_name}/count"))['count']
+
+            return await self._read_through_async(collection_name, ('count',), cache_ttl, collection_count)
+        query = self._compile_count(collection_name, lookup_key_dict)
+        return await self._read_through_async(
+            collection_name, ('first', *PAOQueryCache.query_key(query)), cache_ttl, lambda: self._first_doc(query)
+        )
+
+    async def aggregate(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            group_by: Sequence[str] = None,
+            metrics: Dict[str, Tuple[str, str]] = None,
+            cache_ttl: float = None
+    ) -> List[Dict[str, Any]]:
+        """ Aggregate matching documents on the server, returning a row per group; see `PAODBBase.aggregate` """
+        query = self._compile_aggregate(collection_name, lookup_key_dict, group_by, metrics)
+
+        async def read_rows():
+            return await (await self.execute(query, **self._cursor_options())).to_list()
+
+        return await self._read_through_async(
+            collection_name, ('query', *PAOQueryCache.query_key(query)), cache_ttl, read_rows
+        )
+
+    @invalidates_cache
+    async def remove_by_key(self, collection_name: str, key: str, rev: str = None, silent: bool = False):
+        """
+        Remove a document identified by `key` from collection, using the document API.
+        If `rev` is given, the document's revision must match.
+        """
+        result = await self._request(
+            'DELETE', f"/_api/document/{collection_name}/{key}", params={'silent': silent}, headers=self._rev_headers(rev)
+        )
+        return True if silent else result
+
+    @invalidates_cache
+    async def remove_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Union[str, Dict[str, Any]]],
+            check_rev: bool = True,
+            silent: bool = False
+    ):
+        """
+        Remove documents (keys or documents with _key and optionally _rev) from collection with a single request.
+        """
+        key_docs = [{'_key': d} if isinstance(d, str) else d for d in docs]
+        result = await self._request('DELETE', f"/_api/document/{collection_name}", json=key_docs, params={
+            'ignoreRevs': not check_rev, 'silent': silent
+        })
+        return True if silent else result
+
+    async def insert_edge(self, collection_name: str, association_collection_name: str, from_key, to_key):
+        """
+          Insert edge document using keys (_from and _to are generated using collection name).
+          Collection inferred from collection_name and association_collection_name.
+        """
+        edge_collection_name = self.edge_collection_name(collection_name, association_collection_name)
+        doc = {
+            "_from": f"{collection_name}/{from_key}",
+            "_to": f"{association_collection_name}/{to_key}"
+        }
+        return await self.insert_doc(edge_collection_name, doc)
+
+    async def insert_edges(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            pairs: Iterable[Tuple[str, str]],
+            attrs: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            on_duplicate: Literal['error', 'update', 'replace', 'ignore'] = 'error'
+    ) -> List[Dict[str, Any]]:
+        """
+          Insert edges between (from_key, to_key) pairs, streamed through the bulk import endpoint in chunks
+          of `batch_size`; see `PAODBBase.insert_edges`.
+        """
+        edge_collection_name = self.edge_collection_name(collection_name, association_collection_name)
+        docs = self._edge_docs(collection_name, association_collection_name, pairs, attrs)
+        return await self.insert_docs(edge_collection_name, docs, batch_size=batch_size, on_duplicate=on_duplicate)
+
+    @invalidates_cache
+    async def insert_doc(self, collection_name: str, doc: Dict, return_new: bool = True, silent: bool = False):
+        """
+          Insert a new doc in collection, using the document API.  Documents with literal
+          values (e.g., '`DATE_NOW()`') are inserted with an AQL query, so the server can evaluate them.
+        """
+        if any(PAOQueryCompiler.is_literal(v) for v in doc.values()):
+            cursor = await self.execute(self._compile_insert_doc(collection_name, doc))
+            return await cursor.first()
+
+        result = await self._request('POST', f"/_api/document/{collection_name}", json=doc, params={
+            'returnNew': return_new, 'silent': silent
+        })
+        return self._write_result(result, return_new, silent)
+
+    @invalidates_cache
+    async def replace_doc(
+            self,
+            collection_name: str,
+            key: str,
+            doc: Dict[str, Any],
+            rev: str = None,
+            return_new: bool = True,
+            silent: bool = False
+    ):
+        """ Replace document identified by `key` (and revision, if given) in collection, using the document API """
+        result = await self._request(
+            'PUT', f"/_api/document/{collection_name}/{key}",
+            json=self._key_addressed_doc(key, doc),
+            params={'returnNew': return_new, 'silent': silent},
+            headers=self._rev_headers(rev)
+        )
+        return self._write_result(result, return_new, silent)
+
+    @invalidates_cache
+    async def replace_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Dict[str, Any]],
+            check_rev: bool = True,
+            return_new: bool = False,
+            silent: bool = False
+    ):
+        """ Replace documents (each with a _key and optionally _rev) in collection with a single request """
+        result = await self._request('PUT', f"/_api/document/{collection_name}", json=list(docs), params={
+            'ignoreRevs': not check_rev, 'returnNew': return_new, 'silent': silent
+        })
+        return True if silent else result
+
+    @invalidates_cache
+    async def update_doc(
+            self,
+            collection_name: str,
+            key: str,
+            doc: Dict[str, Any],
+            rev: str = None,
+            return_new: bool = True,
+            silent: bool = False,
+            keep_null: bool = True
+    ):
+        """ Update (patch) document identified by `key` (and revision, if given), using the document API """
+        result = await self._request(
+            'PATCH', f"/_api/document/{collection_name}/{key}",
+            json=self._key_addressed_doc(key, doc),
+            params={'returnNew': return_new, 'silent': silent, 'keepNull': keep_null},
+            headers=self._rev_headers(rev)
+        )
+        return self._write_result(result, return_new, silent)
+
+    @invalidates_cache
+    async def update_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Dict[str, Any]],
+            check_rev: bool = True,
+            return_new: bool = False,
+            silent: bool = False,
+            keep_null: bool = True
+    ):
+        """ Update (patch) documents (each with a _key and optionally _rev) in collection with a single request """
+        result = await self._request('PATCH', f"/_api/document/{collection_name}", json=list(docs), params={
+            'ignoreRevs': not check_rev, 'returnNew': return_new, 'silent': silent, 'keepNull': keep_null
+        })
+        return True if silent else result
+
+    @invalidates_cache
+    async def insert_docs(
+            self,
+            collection_name: str,
+            docs: Iterable[Dict[str, Any]],
+            batch_size: int = 1000,
+            on_duplicate: Literal['error', 'update', 'replace', 'ignore'] = 'error'
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert given documents into collection through the bulk import endpoint, streaming
+        `docs` (any iterable) in chunks of `batch_size`; returning a report per chunk.
+        """
+        reports = []
+        for chunk_num, chunk in enumerate(iter_util.chunken(docs, batch_size)):
+            try:
+                result = await self._request('POST', '/_api/import', json=chunk, params={
+                    'type': 'list',
+                    'collection': collection_name,
+                    'complete': False,
+                    'details': True,
+                    'onDuplicate': on_duplicate
+                })
+            except PAOServerError as e:
+                result = {'created': 0, 'errors': len(chunk), 'details': [str(e)]}
+
+            report = {k: result.get(k, 0) for k in ['created', 'errors', 'empty', 'updated', 'ignored']}
+            report['chunk'] = chunk_num
+            report['details'] = result.get('details', [])
+            logger.debug(f"Imported chunk {chunk_num} into {collection_name}: {report}")
+            reports.append(report)
+
+        return reports
+
+    @invalidates_cache
+    async def upsert_doc(
+            self,
+            collection_name: str,
+            doc: Dict,
+            lookup_keys: Sequence[str] = None,
+            insert_dict=None,
+            update_dict=None
+    ):
+        """
+          Upsert a doc in collection using given lookup_keys
+          insert_dict: Dictionary of values to insert only
+          update_dict: Dictionary of values to update only
+        """
+        lookup_key_dict, insert_doc, update_doc, key_addressed = self._prepare_upsert(
+            collection_name, doc, lookup_keys, insert_dict, update_dict
+        )
+        if key_addressed:
+            result = await self._request('POST', f"/_api/document/{collection_name}", json=dict(doc, **update_doc), params={
+                'overwriteMode': 'update', 'keepNull': False, 'returnNew': True
+            })
+            return result['new']
+
+        cursor = await self.execute(self._compile_upsert_doc(collection_name, lookup_key_dict, insert_doc, update_doc))
+        result = await cursor.first()
+        if result is None:
+            raise RuntimeError(f"Error: collection_name document {doc} was not upserted.")
+        return result
+
+    @invalidates_cache
+    async def upsert_docs(
+            self,
+            collection_name: str,
+            docs: Iterable[Dict[str, Any]],
+            lookup_keys: Sequence[str],
+            insert_dict: Dict[str, Any] = None,
+            update_dict: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            new_doc_callback: Callable[[Dict[str, Any]], Any] = None
+    ) -> Dict[str, int]:
+        """
+        Upsert given documents in collection, using given lookup_keys; with a single query per batch.
+        Returns counts of inserted and updated documents; new documents are passed to new_doc_callback.
+        """
+        counts = {'inserted': 0, 'updated': 0}
+        for batch in iter_util.chunken(docs, batch_size):
+            query = self._compile_upsert_docs(
+                collection_name, batch, lookup_keys, insert_dict, update_dict, return_new=bool(new_doc_callback)
+            )
+            async for result in await self.execute(query, **self._cursor_options()):
+                if new_doc_callback:
+                    counts['inserted' if result['inserted'] else 'updated'] += 1
+                    new_doc_callback(result['doc'])
+                else:
+                    counts['inserted' if result['inserted'] else 'updated'] += result['count']
+
+        return counts
+
+    async def _read_through_async(
+            self,
+            collection_name: str,
+            key: Hashable,
+            cache_ttl: Optional[float],
+            read: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return cached result for key; otherwise read (await) it, caching it for cache_ttl seconds.
+        The cache is bypassed within transactions.
+        """
+        if self.query_cache is None or not cache_ttl or self._transaction_handle() is not None:
+            return await read()
+        result = self.query_cache.get(collection_name, key)
+        if result is CACHE_MISS:
+            result = await read()
+            self.query_cache.set(collection_name, key, result, cache_ttl)
+        return self._cached_copy(result)
+
+    async def _request(
+            self,
+            method: str,
+            path: str,
+            json: Any = None,
+            params: Dict[str, Any] = None,
+            headers: Dict[str, str] = None,
+            sys_db: bool = False,
+            ignore_missing: bool = False,
+            host_index: int = None
+    ) -> Any:
+        """ Make request to given path of the app (or system) database, returning parsed JSON body """
+        response, _ = await self._send(method, path, json, params, headers, sys_db, host_index)
+        return self._parse_response(response, ignore_missing)
+
+    async def _send(
+            self,
+            method: str,
+            path: str,
+            json: Any = None,
+            params: Dict[str, Any] = None,
+            headers: Dict[str, str] = None,
+            sys_db: bool = False,
+            host_index: int = None
+    ) -> Tuple[httpx.Response, int]:
+        """
+        Send request, returning the response and index of the host that served it.
+        The host is selected by the host resolver, unless host_index is given; if a connection
+        to the selected host fails, other hosts are tried.  Requests pinned to a host (by host_index,
+        or by the active transaction) aren't retried elsewhere: cursors and stream transactions only
+        exist on the coordinator that created them.
+        """
+        db_name = '_system' if sys_db else self.app_db_name
+        transaction = None if sys_db or path.startswith('/_api/transaction') else self._transaction_handle()
+        if transaction is not None:
+            # Stream transactions live on the coordinator they were begun on:
+            headers = {**(headers or {}), 'x-arango-trx-id': transaction.transaction_id}
+            host_index = transaction.host_index
+        stats = self.connection_config.stats
+        failed_hosts = set()
+        tries = 1
+        pinned = host_index is not None
+        if host_index is None:
+            host_index = self.host_resolver.get_host_index()
+        while True:
+            start_time = stats.begin(host_index)
+            try:
+                response = await self.client.request(
+                    method,
+                    f"{self.connection_config.hosts[host_index]}/_db/{db_name}{path}",
+                    json=json,
+                    params=params,
+                    headers=headers,
+                    auth=self.root_auth if sys_db else httpx.USE_CLIENT_DEFAULT
+                )
+            except httpx.ConnectError:
+                stats.end(host_index, start_time, error=True)
+                failed_hosts.add(host_index)
+                if pinned or tries >= self.host_resolver.max_tries:
+                    raise
+                if len(failed_hosts) >= self.host_resolver.host_count:
+                    failed_hosts.clear()
+                tries += 1
+                host_index = self.host_resolver.get_host_index(failed_hosts)
+                continue
+            stats.end(host_index, start_time, error=response.status_code >= 500)
+            return response, host_index
+
+    @staticmethod
+    def _parse_response(response: httpx.Response, ignore_missing: bool = False) -> Any:
+        if ignore_missing and response.status_code == 404:
+            return None
+        if response.is_error:
+            raise PAOServerError(response)
+        return response.json() if response.content else None
+
+    @staticmethod
+    def _rev_headers(rev: str = None) -> Optional[Dict[str, str]]:
+        return {'If-Match': rev} if rev is not None else None
+
+    @staticmethod
+    def _write_result(result: Dict[str, Any], return_new: bool, silent: bool):
+        if silent:
+            return True
+        return result['new'] if return_new else result
@@ -0,0 +1,253 @@
+import os
+import threading
+import time
+from enum import StrEnum, auto
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Sequence, Set, Tuple, Union
+
+import httpx
+from arango import ArangoClient
+from arango.http import DefaultHTTPClient
+from arango.resolver import (
+    FallbackHostResolver,
+    HostResolver,
+    RandomHostResolver,
+    RoundRobinHostResolver,
+    SingleHostResolver
+)
+from arango.response import Response
+from requests import Session
+
+TRUE_VALUES = ['1', 'true', 'yes']
+
+# Response statuses retried with backoff; as python-arango's HTTP client does for idempotent requests:
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class HostSelectionEnum(StrEnum):
+    """
+    Host Selection Enum, used to specify how a coordinator is selected for each request
+    when multiple hosts are configured:
+    """
+
+    FALLBACK = auto()
+    ROUNDROBIN = auto()
+    RANDOM = auto()
+    LEAST_LOADED = auto()
+
+
+class PAOConnectionStats:
+    """
+    Thread-safe request counters per host; used to expose pool saturation and to select the least loaded host.
+    """
+
+    def __init__(self, hosts: Sequence[str], pool_size: int):
+        self.hosts = list(hosts)
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._in_flight = [0] * len(self.hosts)
+        self._peak_in_flight = [0] * len(self.hosts)
+        self._requests = [0] * len(self.hosts)
+        self._errors = [0] * len(self.hosts)
+        self._elapsed = [0.0] * len(self.hosts)
+
+    def begin(self, host_index: int) -> float:
+        """ Record start of a request to host; returns start time to pass to `end` """
+        with self._lock:
+            self._in_flight[host_index] += 1
+            self._requests[host_index] += 1
+            self._peak_in_flight[host_index] = max(self._peak_in_flight[host_index], self._in_flight[host_index])
+        return time.perf_counter()
+
+    def end(self, host_index: int, start_time: float, error: bool = False):
+        """ Record end of a request to host """
+        with self._lock:
+            self._in_flight[host_index] -= 1
+            self._elapsed[host_index] += time.perf_counter() - start_time
+            if error:
+                self._errors[host_index] += 1
+
+    def least_loaded(self, indexes_to_filter: Optional[Set[int]] = None) -> int:
+        """ Return index of host with the fewest requests in flight """
+        indexes_to_filter = indexes_to_filter or set()
+        candidates = [i for i in range(len(self.hosts)) if i not in indexes_to_filter] or range(len(self.hosts))
+        with self._lock:
+            return min(candidates, key=lambda i: (self._in_flight[i], self._requests[i]))
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return stats per host: requests, errors, in_flight, peak_in_flight, avg_ms and saturation
+        (peak requests in flight relative to pool size; at or above 1.0 requests waited for, or
+        opened connections beyond, the pool).
+        """
+        with self._lock:
+            return {
+                host: {
+                    'requests': self._requests[i],
+                    'errors': self._errors[i],
+                    'in_flight': self._in_flight[i],
+                    'peak_in_flight': self._peak_in_flight[i],
+                    'avg_ms': 1000 * self._elapsed[i] / self._requests[i] if self._requests[i] else 0.0,
+                    'saturation': self._peak_in_flight[i] / self.pool_size,
+                }
+                for i, host in enumerate(self.hosts)
+            }
+
+
+class LeastLoadedHostResolver(HostResolver):
+    """ Host resolver selecting the host with the fewest requests in flight """
+
+    def __init__(self, stats: PAOConnectionStats, max_tries: Optional[int] = None):
+        super().__init__(len(stats.hosts), max_tries)
+        self._stats = stats
+
+    def get_host_index(self, indexes_to_filter: Optional[Set[int]] = None) -> int:
+        return self._stats.least_loaded(indexes_to_filter)
+
+
+class PAOHTTPClient(DefaultHTTPClient):
+    """
+    python-arango HTTP client with a sized connection pool per host, optional keep-alive,
+    bounded retries with backoff for idempotent requests (GET, HEAD, OPTIONS), and request stats.
+    AQL reads are sent with POST, so they're retried by `PAODatabase` instead (see `retry_delays`).
+    """
+
+    def __init__(self, stats: PAOConnectionStats, keep_alive: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+        self.keep_alive = keep_alive
+        self._session_hosts: Dict[int, int] = {}
+
+    def create_session(self, host: str) -> Session:
+        session = super().create_session(host)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        self._session_hosts[id(session)] = self.stats.hosts.index(host)
+        return session
+
+    def send_request(
+            self,
+            session: Session,
+            method: str,
+            url: str,
+            headers: Optional[MutableMapping[str, str]] = None,
+            params: Optional[MutableMapping[str, str]] = None,
+            data: Any = None,
+            auth: Optional[Tuple[str, str]] = None,
+    ) -> Response:
+        host_index = self._session_hosts.get(id(session), 0)
+        start_time = self.stats.begin(host_index)
+        error = True
+        try:
+            response = super().send_request(session, method, url, headers, params, data, auth)
+            error = response.status_code >= 500
+            return response
+        finally:
+            self.stats.end(host_index, start_time, error)
+
+
+class PAOConnectionConfig:
+    """
+    HTTP connection settings shared by PAODatabase and AsyncPAODatabase.  Arguments not given
+    are read from the environment (see README), falling back to the defaults below.
+
+    :param hosts: Coordinator URLs (PAO_DB_HOSTS, comma separated); defaults to PAO_DB_PROTOCOL://PAO_DB_HOST:PAO_DB_PORT
+    :param pool_size: Maximum connections kept per host (PAO_DB_POOL_SIZE)
+    :param pool_timeout: Seconds to wait for a free connection when the pool is exhausted; None
+    opens extra, unpooled connections instead (PAO_DB_POOL_TIMEOUT)
+    :param keep_alive: Keep connections open between requests (PAO_DB_KEEP_ALIVE)
+    :param request_timeout: Request timeout in seconds (PAO_DB_REQUEST_TIMEOUT)
+    :param retries: Retries for failed connections, idempotent requests and (with PAODatabase) read-only AQL
+    queries outside transactions (PAO_DB_RETRIES)
+    :param backoff_factor: Exponential backoff factor between retries, in seconds (PAO_DB_RETRY_BACKOFF)
+    :param host_selection: How a host is selected when multiple are given (PAO_DB_HOST_SELECTION)
+    """
+
+    def __init__(
+            self,
+            hosts: Union[str, Sequence[str]] = None,
+            pool_size: int = None,
+            pool_timeout: float = None,
+            keep_alive: bool = None,
+            request_timeout: float = None,
+            retries: int = None,
+            backoff_factor: float = None,
+            host_selection: Union[str, HostSelectionEnum] = None
+    ):
+        if hosts is None:
+            hosts = os.getenv('PAO_DB_HOSTS')
+        if hosts is None:
+            host = os.getenv('PAO_DB_HOST', 'localhost')
+            port = os.getenv('PAO_DB_PORT', 8529)
+            protocol = os.getenv('PAO_DB_PROTOCOL', 'http')
+            hosts = f"{protocol}://{host}:{port}"
+        if isinstance(hosts, str):
+            hosts = hosts.split(',')
+        self.hosts: List[str] = [h.strip().rstrip('/') for h in hosts if h.strip()]
+        if not self.hosts:
+            raise ValueError("At least one DB host needs to be given.")
+
+        self.pool_size = pool_size if pool_size is not None else int(os.getenv('PAO_DB_POOL_SIZE', 10))
+        if pool_timeout is None and os.getenv('PAO_DB_POOL_TIMEOUT'):
+            pool_timeout = float(os.getenv('PAO_DB_POOL_TIMEOUT'))
+        self.pool_timeout = pool_timeout
+        if keep_alive is None:
+            keep_alive = os.getenv('PAO_DB_KEEP_ALIVE', 'true').lower() in TRUE_VALUES
+        self.keep_alive = keep_alive
+        self.request_timeout = request_timeout if request_timeout is not None else float(
+            os.getenv('PAO_DB_REQUEST_TIMEOUT', 60)
+        )
+        self.retries = retries if retries is not None else int(os.getenv('PAO_DB_RETRIES', 3))
+        self.backoff_factor = backoff_factor if backoff_factor is not None else float(
+            os.getenv('PAO_DB_RETRY_BACKOFF', 0.5)
+        )
+        self.host_selection = HostSelectionEnum(host_selection or os.getenv('PAO_DB_HOST_SELECTION', 'fallback'))
+
+        if self.pool_size < 1:
+            raise ValueError(f"Pool size should be at least 1; got {self.pool_size}")
+
+        self.stats = PAOConnectionStats(self.hosts, self.pool_size)
+
+    def retry_delays(self) -> Iterator[float]:
+        """ Yield the backoff delay (in seconds) before each retry """
+        for attempt in range(self.retries):
+            yield self.backoff_factor * 2 ** attempt
+
+    def create_client(self) -> ArangoClient:
+        """ Create python-arango client using these settings """
+        http_client = PAOHTTPClient(
+            self.stats,
+            keep_alive=self.keep_alive,
+            request_timeout=self.request_timeout,
+            retry_attempts=self.retries,
+            backoff_factor=self.backoff_factor,
+            pool_connections=len(self.hosts),
+            pool_maxsize=self.pool_size,
+            pool_timeout=self.pool_timeout
+        )
+        return ArangoClient(hosts=self.hosts, host_resolver=self.create_resolver(), http_client=http_client)
+
+    def create_async_client(self, auth: httpx.Auth) -> httpx.AsyncClient:
+        """
+        Create httpx client for AsyncPAODatabase using these settings.  httpx retries failed
+        connections only; reads are not retried, as a request may have reached the server.
+        """
+        limits = httpx.Limits(
+            max_connections=self.pool_size * len(self.hosts),
+            max_keepalive_connections=self.pool_size * len(self.hosts) if self.keep_alive else 0
+        )
+        timeout = httpx.Timeout(self.request_timeout, pool=self.pool_timeout)
+        transport = httpx.AsyncHTTPTransport(limits=limits, retries=self.retries)
+        return httpx.AsyncClient(auth=auth, timeout=timeout, transport=transport)
+
+    def create_resolver(self) -> HostResolver:
+        """ Create host resolver for host_selection """
+        host_count = len(self.hosts)
+        if host_count == 1:
+            return SingleHostResolver(1)
+        if self.host_selection == HostSelectionEnum.LEAST_LOADED:
+            return LeastLoadedHostResolver(self.stats)
+        if self.host_selection == HostSelectionEnum.ROUNDROBIN:
+            return RoundRobinHostResolver(host_count)
+        if self.host_selection == HostSelectionEnum.RANDOM:
+            return RandomHostResolver(host_count)
+        return FallbackHostResolver(host_count)
@@ -1,29 +1,67 @@
+import contextlib
+import inspect
 import os
-from typing import Any, Dict, Sequence, Literal
-import uuid
-
-from arango import ArangoClient
+import queue
+import threading
+import time
+from typing import (
+    Any, Callable, Dict, Generator, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple, Union
+)
+
+from arango import AQLQueryExecuteError, AQLQueryExplainError, DocumentInsertError
+from arango.aql import AQL
+from arango.database import StandardDatabase, TransactionDatabase
 from loguru import logger
 
-from python_arango_ogm.db.pao_db_base import PAODBBase
+from python_arango_ogm.db.pao_connection import RETRY_STATUS_CODES, PAOConnectionConfig
+from python_arango_ogm.db.pao_db_base import (
+    ACTIVE_TRANSACTION, CursorOptions, Page, PAODBBase, TraversalDirectionEnum, TraversalResultEnum, invalidates_cache
+)
 from python_arango_ogm.db.pao_model_discovery import PAOModelDiscovery
-from python_arango_ogm.db.pao_queries import PAOQueries
+from python_arango_ogm.db.pao_query_builder import PAOQueryBuilder
+from python_arango_ogm.db.pao_query_cache import PAOQueryCache
+from python_arango_ogm.db.pao_query_compiler import CompiledQuery, PAOQueryCompiler
+from python_arango_ogm.db.pao_query_profiler import QueryProfile, QueryRun
 from python_arango_ogm.db.pao_migration_model import PAOMigrationModel
+from python_arango_ogm.db.pao_session import ACTIVE_SESSION, PAOSession
 
+from python_arango_ogm.utils import iter_util
 from python_arango_ogm.utils.singleton import Singleton
 
+# Sentinel marking the end of prefetched batches:
+PREFETCH_DONE = object()
+
+# Whether the installed python-arango can opt queries into the server's plan cache:
+AQL_PLAN_CACHE_SUPPORTED = 'use_plan_cache' in inspect.signature(AQL.execute).parameters
 
-class PAODatabase(PAODBBase):
+
+class PAODatabase(PAOQueryBuilder, PAODBBase):
     __metaclass__ = Singleton
-    VALID_SORT_VALUES = ["ASC", "DESC", ""]
+    VALID_SORT_VALUES = PAOQueryCompiler.VALID_SORT_VALUES
+    _db: StandardDatabase = None
 
-    def __init__(self, delete_db: bool = False):
+    def __init__(
+            self,
+            delete_db: bool = False,
+            use_plan_cache: bool = None,
+            connection_config: PAOConnectionConfig = None,
+            query_cache: PAOQueryCache = None,
+            slow_query_ms: float = None
+    ):
+        """
+        :param delete_db: Delete the app database (if it exists) before setting it up.
+        :param use_plan_cache: Opt into ArangoDB's query plan cache (requires ArangoDB 3.12.4+
+        and python-arango 8.2+).  Defaults to PAO_DB_USE_PLAN_CACHE from the environment.
+        :param connection_config: Connection pooling, keep-alive, retry and host settings;
+        defaults to settings from the environment.
+        :param query_cache: Cache for results of reads on models with a CACHE_TTL; defaults to
+        a PAOLRUQueryCache if PAO_RESULT_CACHE_ENTRIES is set in the environment.
+        :param slow_query_ms: Log queries slower than this, with their plans; defaults to
+        PAO_SLOW_QUERY_MS from the environment (unset disables the slow query log).
+        """
         # TODO: These probably don't need to be members:
-        print("CONSTRUCTING DB")
+        logger.debug("Constructing DB")
         self.app_db_name = os.getenv('PAO_APP_DB_NAME')
-        host = os.getenv('PAO_DB_HOST', 'localhost')
-        port = os.getenv('PAO_DB_PORT', 8529)
-        protocol = os.getenv('PAO_DB_PROTOCOL', 'http')
         root_user = os.getenv('PAO_DB_ROOT_USER')
         root_password = os.getenv('PAO_DB_ROOT_PASS')
 
@@ -36,7 +74,18 @@ class PAODatabase(PAODBBase):
         if root_password is None:
             raise ValueError('PAO_DB_ROOT_PASS needs to be defined in environment or in a .env file.')
 
-        self.client = ArangoClient(hosts=f"{protocol}://{host}:{port}")
+        if use_plan_cache is None:
+            use_plan_cache = os.getenv('PAO_DB_USE_PLAN_CACHE', 'false').lower() in ['1', 'true', 'yes']
+        if use_plan_cache and not AQL_PLAN_CACHE_SUPPORTED:
+            raise ValueError(
+                "use_plan_cache (PAO_DB_USE_PLAN_CACHE) requires a python-arango version whose AQL.execute "
+                "supports use_plan_cache (8.2+); upgrade python-arango, or use AsyncPAODatabase"
+            )
+        self.use_plan_cache = use_plan_cache
+        super().__init__(query_cache, slow_query_ms)
+
+        self.connection_config = connection_config or PAOConnectionConfig()
+        self.client = self.connection_config.create_client()
 
         # Connect to "_system" database as root user.
         # This returns an API wrapper for "_system" database.
@@ -94,72 +143,245 @@ class PAODatabase(PAODBBase):
         """ Return underlying python-arango database"""
         return self.db
 
-    def find_by_key(self, collection_name: str, key: Any):
+    @property
+    def db(self) -> Union[StandardDatabase, TransactionDatabase]:
+        """ The python-arango database; or its transaction, within a `transaction` block """
+        transaction_db = self._transaction_handle()
+        return self._db if transaction_db is None else transaction_db
+
+    @db.setter
+    def db(self, db: StandardDatabase):
+        self._db = db
+
+    @contextlib.contextmanager
+    def transaction(
+            self,
+            write: Sequence[str] = None,
+            read: Sequence[str] = None,
+            exclusive: Sequence[str] = None,
+            lock_timeout: int = None,
+            max_size: int = None,
+            sync: bool = None,
+            allow_implicit: bool = True
+    ) -> Iterator[TransactionDatabase]:
         """
-          Find document on collection by given key value:
+        Run a stream transaction, yielding the python-arango TransactionDatabase; see `PAODBBase.transaction`:
+
+            with pao_db.transaction(write=['foo', 'foo__bar']):
+                foo = FooModel.insert({...})
+                foo.insert_edge(FooModel.bar_edge, bar)
         """
-        return self.db.collection(collection_name).get(key)
+        transaction_db = self._transaction_handle()
+        if transaction_db is not None:
+            yield transaction_db
+            return
+
+        options = self._transaction_options(write, read, exclusive, lock_timeout, max_size, sync, allow_implicit)
+        transaction_db = self._db.begin_transaction(**options)
+        logger.debug(f"BEGIN transaction {transaction_db.transaction_id}")
+        token = ACTIVE_TRANSACTION.set((self, transaction_db))
+        try:
+            yield transaction_db
+        except BaseException:
+            transaction_db.abort_transaction()
+            raise
+        else:
+            transaction_db.commit_transaction()
+        finally:
+            self._end_transaction(token, options)
+
+    def connection_stats(self) -> Dict[str, Dict[str, Any]]:
+        """ Return request and pool saturation stats per host (see PAOConnectionStats.as_dict) """
+        return self.connection_config.stats.as_dict()
 
-    def get_related_edges(self, collection_name: str, association_collection_name: str, lookup_key_dict: Dict):
+    def find_by_key(
+            self,
+            collection_name: str,
+            key: Any,
+            rev: str = None,
+            cache_ttl: float = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ):
+        """
+          Find document on collection by given key value, using the document API.
+          If `rev` is given, the document's revision must match.
+          The result is cached for cache_ttl seconds, if given and the database has a query_cache.
+          If only (or exclude) is given, the document is projected with a primary index query instead.
+        """
+        if only or exclude:
+            query = self._compile_by_key(collection_name, key, rev, only, exclude)
+            return self._read_through(
+                collection_name, ('first', *PAOQueryCache.query_key(query)), cache_ttl, lambda: self._first_doc(query)
+            )
+        return self._read_through(
+            collection_name, ('key', key, rev), cache_ttl, lambda: self.db.collection(collection_name).get(key, rev=rev)
+        )
+
+    def find_by_keys(
+            self,
+            collection_name: str,
+            keys: Sequence[str],
+            chunk_size: int = 500,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Find documents by given keys with chunked multi-document requests (chunk_size keys per request).
+        Keys may also be document handles (_id strings), which may refer to other collections.
+        If only (or exclude) is given, each chunk is instead projected by a query on the primary index.
+        Returns documents in the order of given keys, with None for keys that were not found.
+        """
+        handles, collection_keys = self._group_handles(collection_name, keys)
+        docs = {}
+        if only or exclude:
+            for chunk in iter_util.chunken(list(dict.fromkeys(handles)), chunk_size):
+                query = self._compile_by_handles(chunk, only, exclude)
+                docs.update({doc['_id']: doc for doc in self._query_docs(query) if doc})
+            return [docs.get(handle) for handle in handles]
+
+        for coll_name, coll_keys in collection_keys.items():
+            collection = self.db.collection(coll_name)
+            for chunk in iter_util.chunken(coll_keys, chunk_size):
+                docs.update({doc['_id']: doc for doc in collection.get_many(chunk)})
+
+        return [docs.get(handle) for handle in handles]
+
+    def get_related_edges(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None
+    ):
         """
         Gets `association_collection_name` edges of `collection_name`;
         looking up by the keys and values in `lookup_key_dict`:
         """
-        lookup_filter = self._format_lookup_filter(lookup_key_dict)
-        aql = PAOQueries.AQL_QUERY_RELATED_EDGES.format(lookup_filter=lookup_filter)
-        edge_collection_name = f"{collection_name}__{association_collection_name}"
+        edge_collection_name = self.edge_collection_name(collection_name, association_collection_name)
+        query = self._compile_related_edges(collection_name, association_collection_name, lookup_key_dict)
         logger.debug(f"Association query on [{collection_name}]->[{edge_collection_name}] [aql]")
-        cursor = self.db.aql.execute(aql, count=True, batch_size=10, bind_vars={
-            '@collection': collection_name,
-            '@edge_collection': edge_collection_name
-        })
-
-        return self._cursor_doc_generator(cursor)
+        return self._query_docs(query, cursor_options)
 
-    def get_related_vertices(self, collection_name: str, association_collection_name: str, lookup_key_dict: Dict):
+    def get_related_vertices(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ):
         """
         Lookup associated vertices (`association_collection_name`) through edges,
-        from given collection_name, using keys and values in lookup_key_dict:
+        from given collection_name, using keys and values in lookup_key_dict;
+        projected to only (or all but exclude) attributes, if given:
         """
-        lookup_filter = self._format_lookup_filter(lookup_key_dict)
-        aql = PAOQueries.AQL_QUERY_RELATED_VERTICES.format(lookup_filter=lookup_filter)
-        edge_collection_name = f"{collection_name}__{association_collection_name}"
+        edge_collection_name = self.edge_collection_name(collection_name, association_collection_name)
+        query = self._compile_related_vertices(
+            collection_name, association_collection_name, lookup_key_dict, only, exclude
+        )
         logger.debug(f"Association query on [{collection_name}]->[{edge_collection_name}] [aql]")
-        cursor = self.db.aql.execute(aql, count=True, batch_size=10, bind_vars={
-            '@collection': collection_name,
-            '@edge_collection': edge_collection_name,
-            '@association_collection': association_collection_name
-        })
+        return self._query_docs(query, cursor_options)
+
+    def get_page(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict = None,
+            sort_key_dict: Dict[str, str] = None,
+            page_size: int = 100,
+            after: str = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Page:
+        """
+        Gets a page of documents, seeking past the page given by token `after`; see `PAODBBase.get_page`.
+        """
+        query = self._compile_page(collection_name, lookup_key_dict, sort_key_dict, page_size, after, only, exclude)
+        docs = self._query_docs(query, {'batch_size': page_size + 1})
+        return self._page(docs, sort_key_dict, page_size)
 
-        return self._cursor_doc_generator(cursor)
+    def get_related_vertices_by_parent(
+            self,
+            edge_collection_name: str,
+            parent_ids: Sequence[str],
+            limit: int = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lookup vertices associated through edge_collection_name with each of parent_ids, with a single query;
+        returning lists of up to `limit` vertices (projected, if only or exclude is given), by parent _id.
+        """
+        query = self._compile_related_vertices_by_parent(edge_collection_name, parent_ids, limit, only, exclude)
+        return {row['parent_id']: row['related'] for row in self._query_docs(query)}
+
+    def traverse(
+            self,
+            start_id: str,
+            edge_collection_names: Sequence[str] = None,
+            depth: Tuple[int, int] = (1, 1),
+            direction: TraversalDirectionEnum = TraversalDirectionEnum.OUTBOUND,
+            prune: Dict[str, Any] = None,
+            edge_filter: Dict[str, Any] = None,
+            vertex_filter: Dict[str, Any] = None,
+            result: TraversalResultEnum = TraversalResultEnum.VERTICES,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None
+    ):
+        """
+        Traverse from vertex start_id on the server; returning a generator of vertices, edges or paths.
+        See `PAODBBase.traverse`.
+        """
+        query = self._compile_traversal(
+            start_id, edge_collection_names, depth, direction, prune, edge_filter, vertex_filter, result
+        )
+        return self._query_docs(query, cursor_options)
 
-    def find_by_attributes(self, collection_name: str, lookup_key_dict: Dict = None):
+    def find_by_attributes(self, collection_name: str, lookup_key_dict: Dict = None, cache_ttl: float = None):
         """
         Find a single document by given collection_name,
         looking up by the keys and values in lookup_key_dict:
         """
-        docs = self.get_by_attributes(collection_name, lookup_key_dict)
-        try:
-            result = docs.__next__()
-        except StopIteration:
-            result = None
-
-        return result
+        query = self._compile_by_attributes(collection_name, lookup_key_dict)
+        return self._read_through(
+            collection_name, ('first', *PAOQueryCache.query_key(query)), cache_ttl, lambda: self._first_doc(query)
+        )
 
-    def remove_by_key(self, collection_name: str, key: str):
-        """ Remove a document identified by `key` from collection """
-        lookup_filter = self._format_lookup_filter({"_key": key})
-        aql = PAOQueries.AQL_REMOVE_BY_ATTRS.format(lookup_filter=lookup_filter)
+    @invalidates_cache
+    def remove_by_key(self, collection_name: str, key: str, rev: str = None, silent: bool = False):
+        """
+        Remove a document identified by `key` from collection, using the document API.
+        If `rev` is given, the document's revision must match.
+        Returns document metadata (_id, _key, _rev), or True if `silent`.
+        """
+        logger.debug(f"REMOVE [{collection_name}/{key}]")
+        return self.db.collection(collection_name).delete(key, rev=rev, check_rev=rev is not None, silent=silent)
 
-        logger.debug(f"REMOVE query: [{aql}]")
-        cursor = self.db.aql.execute(aql, count=True, bind_vars={'@collection': collection_name})
-        return self._cursor_doc_generator(cursor)
+    @invalidates_cache
+    def remove_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Union[str, Dict[str, Any]]],
+            check_rev: bool = True,
+            silent: bool = False
+    ):
+        """
+        Remove documents (keys or documents with _key and optionally _rev) from collection with a single request.
+        If check_rev, revisions of documents which include _rev must match.
+        Returns document metadata (or an error) per document, or True if `silent`.
+        """
+        key_docs = [{'_key': d} if isinstance(d, str) else d for d in docs]
+        return self.db.collection(collection_name).delete_many(key_docs, check_rev=check_rev, silent=silent)
 
     def get_by_attributes(
             self,
             collection_name: str,
             lookup_key_dict: Dict[str, Any] = None,
-            sort_key_dict: Dict[str, Literal['ASC', 'DESC', '']] = None
+            sort_key_dict: Dict[str, Literal['ASC', 'DESC', '']] = None,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None,
+            cache_ttl: float = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
     ):
         """
         Gets documents from given collection_name, looking up by the keys and values
@@ -168,14 +390,95 @@ class PAODatabase(PAODBBase):
         :param lookup_key_dict: A dictionary of keys and corresponding values used to query this collection values
         (ASC, DESC): :param sort_key_dict: A dictionary of keys by which to sort documents.  Values specify
         direction: [ASC, DESC, '']
+        :param cursor_options: CursorOptions, or a dictionary overriding some of DEFAULT_CURSOR_OPTIONS
+        :param cache_ttl: Seconds to cache results for, if the database has a query_cache
+        :param only: Attributes to return (along with _id, _key and _rev)
+        :param exclude: Attributes not to return
         """
         logger.debug(f"LOOKUP:{lookup_key_dict} and SORT:{sort_key_dict}")
-        lookup_filter = self._format_lookup_filter(lookup_key_dict)
-        sort_by = self._format_sort(sort_key_dict)
-        aql = PAOQueries.AQL_QUERY_BY_ATTRS.format(lookup_filter=lookup_filter, sort_by=sort_by)
-        logger.debug(f"LOOKUP query: {aql}")
-        cursor = self.db.aql.execute(aql, count=True, bind_vars={'@collection': collection_name})
-        return self._cursor_doc_generator(cursor)
+        query = self._compile_by_attributes(collection_name, lookup_key_dict, sort_key_dict, only, exclude)
+        logger.debug(f"LOOKUP query: {query.aql}")
+        if not (cache_ttl and self.query_cache):
+            return self._query_docs(query, cursor_options)
+
+        docs = self._read_through(
+            collection_name,
+            ('query', *PAOQueryCache.query_key(query)),
+            cache_ttl,
+            lambda: list(self._query_docs(query, cursor_options))
+        )
+        return iter(docs)
+
+    @contextlib.contextmanager
+    def session(
+            self,
+            flush_every: int = 5000,
+            flush_interval: float = None,
+            on_duplicate: Literal['error', 'update', 'replace', 'ignore'] = 'error'
+    ) -> Iterator[PAOSession]:
+        """
+        Unit of work; document and edge inserts (`insert_doc`, `insert_edge`, and so `PAOModel.insert` and
+        `PAOModel.insert_edge`) within it are buffered per collection, and flushed as bulk imports (see
+        `PAOSession`).  Buffered documents are flushed when the block exits, or discarded if it raises.
+        Nested blocks join the enclosing session.  Flush reports (with throughput and failed documents)
+        are kept in the session's `reports`:
+
+            with pao_db.session(flush_every=5000) as s:
+                for row in rows:
+                    FooModel.insert(row)
+            failed = s.errors
+        """
+        session = self._active_session()
+        if session is not None:
+            yield session
+            return
+
+        session = PAOSession(self, flush_every, flush_interval, on_duplicate)
+        token = ACTIVE_SESSION.set(session)
+        try:
+            yield session
+        except BaseException:
+            session.discard()
+            raise
+        finally:
+            ACTIVE_SESSION.reset(token)
+        session.flush()
+
+    def _active_session(self) -> Optional[PAOSession]:
+        session = ACTIVE_SESSION.get()
+        return session if session is not None and session.pao_db is self else None
+
+    def count(self, collection_name: str, lookup_key_dict: Dict[str, Any] = None, cache_ttl: float = None) -> int:
+        """
+        Count documents matching the keys and values in lookup_key_dict with a COLLECT query;
+        or, without a lookup, with the collection's count.
+        """
+        if not lookup_key_dict:
+            return self._read_through(
+                collection_name, ('count',), cache_ttl, lambda: self.db.collection(collection_name).count()
+            )
+        query = self._compile_count(collection_name, lookup_key_dict)
+        return self._read_through(
+            collection_name, ('first', *PAOQueryCache.query_key(query)), cache_ttl, lambda: self._first_doc(query)
+        )
+
+    def aggregate(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            group_by: Sequence[str] = None,
+            metrics: Dict[str, Tuple[str, str]] = None,
+            cache_ttl: float = None
+    ) -> List[Dict[str, Any]]:
+        """ Aggregate matching documents on the server, returning a row per group; see `PAODBBase.aggregate` """
+        query = self._compile_aggregate(collection_name, lookup_key_dict, group_by, metrics)
+        logger.debug(f"AGGREGATE query: {query.aql}")
+        return self._read_through(
+            collection_name,
+            ('query', *PAOQueryCache.query_key(query)),
+            cache_ttl,
+            lambda: list(self._query_docs(query))
+        )
 
     def insert_edge(self, collection_name: str, association_collection_name: str, from_key, to_key):
         """
@@ -183,40 +486,170 @@ class PAODatabase(PAODBBase):
           Collection inferred from collection_name and association_collection_name.
           TODO: Add attributes to set on edge
         """
-        edge_collection_name = f"{collection_name}__{association_collection_name}"
+        edge_collection_name = self.edge_collection_name(collection_name, association_collection_name)
         doc = {
             "_from": f"{collection_name}/{from_key}",
             "_to": f"{association_collection_name}/{to_key}"
         }
         return self.insert_doc(edge_collection_name, doc)
 
-    def insert_doc(self, collection_name: str, doc: Dict):
+    def insert_edges(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            pairs: Iterable[Tuple[str, str]],
+            attrs: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            on_duplicate: Literal['error', 'update', 'replace', 'ignore'] = 'error'
+    ) -> List[Dict[str, Any]]:
+        """
+          Insert edges between (from_key, to_key) pairs, streamed through the bulk import endpoint in chunks
+          of `batch_size`; see `PAODBBase.insert_edges`.
+        """
+        edge_collection_name = self.edge_collection_name(collection_name, association_collection_name)
+        docs = self._edge_docs(collection_name, association_collection_name, pairs, attrs)
+        return self.insert_docs(edge_collection_name, docs, batch_size=batch_size, on_duplicate=on_duplicate)
+
+    @invalidates_cache
+    def insert_doc(self, collection_name: str, doc: Dict, return_new: bool = True, silent: bool = False):
         """
-          Insert a new doc in collection:
+          Insert a new doc in collection, using the document API.  Documents with literal
+          values (e.g., '`DATE_NOW()`') are inserted with an AQL query, so the server can evaluate them.
+          Returns the new document if `return_new`; otherwise document metadata (or True if `silent`).
+          Within a `session`, documents without literals are buffered instead; and returned as given.
         """
-        print(f"Inserting into collection {collection_name}: ", doc)
-        new_doc = self.__autogen_keys(collection_name, doc)
-        insert_attrs = self._format_query_attrs(new_doc)
-        aql = PAOQueries.AQL_INSERT_DOC.format(insert_attrs=insert_attrs)
-        logger.debug(f"INSERT QUERY: {aql}: {insert_attrs}")
-        inserted_docs = self.db.aql.execute(aql, count=True, bind_vars={'@collection': collection_name})
-        logger.debug(f"inserted_docs: {inserted_docs.count()}")
-        if not inserted_docs.count():
+        logger.debug(f"Inserting into collection {collection_name}: {doc}")
+        has_literals = any(PAOQueryCompiler.is_literal(v) for v in doc.values())
+        session = self._active_session()
+        if session is not None and not has_literals:
+            return True if silent else session.insert(collection_name, doc)
+
+        if not has_literals:
+            result = self.db.collection(collection_name).insert(doc, return_new=return_new, silent=silent)
+            return result['new'] if return_new and not silent else result
+
+        query = self._compile_insert_doc(collection_name, doc)
+        logger.debug(f"INSERT QUERY: {query.aql}")
+        inserted_doc = self._first_doc(query)
+        if inserted_doc is None:
             raise RuntimeError(f"Error: collection_name document {doc} was not inserted.")
 
-        return inserted_docs.next()
+        return inserted_doc
 
-    def insert_docs(self, collection_name: str, docs: Sequence[dict[str, Any]]):
-        """ Insert given documents into collection with a single query"""
-        new_docs = [self.__autogen_keys(collection_name, doc) for doc in docs]
-        new_docs = [self.__format_query_values(doc) for doc in new_docs]
-        cursor = self.db.aql.execute(PAOQueries.AQL_INSERT_DOCS, bind_vars={
-            '@collection': collection_name,
-            'docs': new_docs
-        })
+    @invalidates_cache
+    def replace_doc(
+            self,
+            collection_name: str,
+            key: str,
+            doc: Dict[str, Any],
+            rev: str = None,
+            return_new: bool = True,
+            silent: bool = False
+    ):
+        """
+        Replace document identified by `key` in collection, using the document API.
+        If `rev` is given, the document's revision must match.
+        Returns the new document if `return_new`; otherwise document metadata (or True if `silent`).
+        """
+        new_doc = self._key_addressed_doc(key, doc, rev)
+        result = self.db.collection(collection_name).replace(
+            new_doc, check_rev=rev is not None, return_new=return_new, silent=silent
+        )
+        return result['new'] if return_new and not silent else result
+
+    @invalidates_cache
+    def replace_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Dict[str, Any]],
+            check_rev: bool = True,
+            return_new: bool = False,
+            silent: bool = False
+    ):
+        """
+        Replace documents (each with a _key and optionally _rev) in collection with a single request.
+        If check_rev, revisions of documents which include _rev must match.
+        Returns document metadata (or an error) per document, or True if `silent`.
+        """
+        return self.db.collection(collection_name).replace_many(
+            docs, check_rev=check_rev, return_new=return_new, silent=silent
+        )
 
-        return self._cursor_doc_generator(cursor)
+    @invalidates_cache
+    def update_doc(
+            self,
+            collection_name: str,
+            key: str,
+            doc: Dict[str, Any],
+            rev: str = None,
+            return_new: bool = True,
+            silent: bool = False,
+            keep_null: bool = True
+    ):
+        """
+        Update (patch) document identified by `key` in collection with the attributes in `doc`,
+        using the document API.  If `rev` is given, the document's revision must match.
+        Returns the new document if `return_new`; otherwise document metadata (or True if `silent`).
+        """
+        new_doc = self._key_addressed_doc(key, doc, rev)
+        result = self.db.collection(collection_name).update(
+            new_doc, check_rev=rev is not None, keep_none=keep_null, return_new=return_new, silent=silent
+        )
+        return result['new'] if return_new and not silent else result
+
+    @invalidates_cache
+    def update_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Dict[str, Any]],
+            check_rev: bool = True,
+            return_new: bool = False,
+            silent: bool = False,
+            keep_null: bool = True
+    ):
+        """
+        Update (patch) documents (each with a _key and optionally _rev) in collection with a single request.
+        If check_rev, revisions of documents which include _rev must match.
+        Returns document metadata (or an error) per document, or True if `silent`.
+        """
+        return self.db.collection(collection_name).update_many(
+            docs, check_rev=check_rev, keep_none=keep_null, return_new=return_new, silent=silent
+        )
+
+    @invalidates_cache
+    def insert_docs(
+            self,
+            collection_name: str,
+            docs: Iterable[Dict[str, Any]],
+            batch_size: int = 1000,
+            on_duplicate: Literal['error', 'update', 'replace', 'ignore'] = 'error'
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert given documents into collection through the bulk import endpoint, streaming
+        `docs` (any iterable) in chunks of `batch_size`, so memory use is bounded by the chunk size.
+        Documents are imported as given; literal values (e.g., '`DATE_NOW()`') are not evaluated.
+        A chunk containing bad documents does not halt the import; errors are reported instead.
 
+        :param on_duplicate: Action to take on unique key constraint violations: error, update, replace or ignore.
+        :return: A report per chunk, with counts of created, errors, empty, updated and ignored documents.
+        """
+        collection = self.db.collection(collection_name)
+        reports = []
+        for chunk_num, chunk in enumerate(iter_util.chunken(docs, batch_size)):
+            try:
+                result = collection.import_bulk(chunk, halt_on_error=False, details=True, on_duplicate=on_duplicate)
+            except DocumentInsertError as e:
+                result = {'created': 0, 'errors': len(chunk), 'details': [str(e)]}
+
+            report = {k: result.get(k, 0) for k in ['created', 'errors', 'empty', 'updated', 'ignored']}
+            report['chunk'] = chunk_num
+            report['details'] = result.get('details', [])
+            logger.debug(f"Imported chunk {chunk_num} into {collection_name}: {report}")
+            reports.append(report)
+
+        return reports
+
+    @invalidates_cache
     def upsert_doc(
             self,
             collection_name: str,
@@ -233,114 +666,211 @@ class PAODatabase(PAODBBase):
           insert_dict: Dictionary of values to insert only
           update_dict: Dictionary of values to update only
         """
-        if update_dict is None:
-            update_dict = {}
-        if insert_dict is None:
-            insert_dict = {}
-        lookup_key_dict = {k: v for (k, v) in doc.items() if k in lookup_keys}
-
-        new_doc = self.__autogen_keys(collection_name, doc)
-        new_doc.update(insert_dict)
-        update_doc = {k: v for (k, v) in doc.items() if k not in lookup_keys}
-        update_doc.update(update_dict)
-
-        # Create key:val pairs (dictionary without braces):
-        key_attrs = self._format_query_attrs(lookup_key_dict)  # str(lookup_key_dict)[1:-1]
-        insert_attrs = self._format_query_attrs(new_doc)  # str(new_doc)[1:-1]
-        update_attrs = self._format_query_attrs(update_doc)  # str(update_attrs)[1:-1]
-
-        logger.debug(f"key_attrs: {key_attrs}")
-        logger.debug(f"insert_attrs: {insert_attrs}")
-        logger.debug(f"update_attrs: {update_attrs}")
-
-        upsert = PAOQueries.AQL_UPSERT_DOC.format(
-            key_attrs=key_attrs,
-            insert_attrs=insert_attrs,
-            update_attrs=update_attrs)
-
-        logger.debug(f"UPSERT QUERY: {upsert}")
-        upserted_docs = self.db.aql.execute(upsert, count=True, bind_vars={'@collection': collection_name})
-        logger.debug(f"upserted_docs: {upserted_docs.count()}")
-        if not upserted_docs.count():
+        lookup_key_dict, insert_doc, update_doc, key_addressed = self._prepare_upsert(
+            collection_name, doc, lookup_keys, insert_dict, update_dict
+        )
+        if key_addressed:
+            # Key-addressed upsert; no need to search; use the document API:
+            result = self.db.collection(collection_name).insert(
+                dict(doc, **update_doc), overwrite_mode='update', keep_none=False, return_new=True
+            )
+            return result['new']
+
+        query = self._compile_upsert_doc(collection_name, lookup_key_dict, insert_doc, update_doc)
+        logger.debug(f"UPSERT QUERY: {query.aql}")
+        upserted_doc = self._first_doc(query)
+        if upserted_doc is None:
             raise RuntimeError(f"Error: collection_name document {doc} was not upserted.")
 
-        return upserted_docs.next()
+        return upserted_doc
 
-    def _format_sort(self, sort_list: Dict[str, str]) -> str:
-        """
-          Format a lookup filter from keys and values in lookup_key_dict
-          Returns string in format "doc.active == true AND doc.gender == 'f'"
+    @invalidates_cache
+    def upsert_docs(
+            self,
+            collection_name: str,
+            docs: Iterable[Dict[str, Any]],
+            lookup_keys: Sequence[str],
+            insert_dict: Dict[str, Any] = None,
+            update_dict: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            new_doc_callback: Callable[[Dict[str, Any]], Any] = None
+    ) -> Dict[str, int]:
         """
-        result = ''
-        if sort_list and len(sort_list):
-            sorts = []
-            for k, v in sort_list.items():
-                if v not in self.VALID_SORT_VALUES:
-                    raise ValueError(f"Sort value for {k} is should be one of {self.VALID_SORT_VALUES}")
-                sorts.append(f"doc.{k} {v}")
+        Upsert given documents (any iterable) in collection, using given lookup_keys;
+        sending each chunk of `batch_size` documents as a single query.
 
-            sort_by = " ,".join(sorts)
-            result = f"SORT {sort_by}" if sort_by else ""
-        return result
-
-    def _format_lookup_filter(self, lookup_key_dict: Dict):
+        :param insert_dict: Dictionary of values to insert only
+        :param update_dict: Dictionary of values to update only
+        :param new_doc_callback: If given, called with each new (inserted or updated) document.
+        :return: Dictionary with counts of inserted and updated documents.
+        """
+        counts = {'inserted': 0, 'updated': 0}
+        for batch in iter_util.chunken(docs, batch_size):
+            query = self._compile_upsert_docs(
+                collection_name, batch, lookup_keys, insert_dict, update_dict, return_new=bool(new_doc_callback)
+            )
+            logger.debug(f"UPSERT batch of {len(batch)} into {collection_name}")
+            for result in self._query_docs(query):
+                if new_doc_callback:
+                    counts['inserted' if result['inserted'] else 'updated'] += 1
+                    new_doc_callback(result['doc'])
+                else:
+                    counts['inserted' if result['inserted'] else 'updated'] += result['count']
+
+        return counts
+
+    def explain(self, query: CompiledQuery) -> Dict[str, Any]:
+        """ Return the optimizer's plan for compiled query, without executing it """
+        return self.db.aql.explain(query.aql, bind_vars=query.bind_vars)
+
+    def add_query_hook(self, hook: Callable[[QueryProfile], Any]):
+        """ Register hook, called with a QueryProfile of each executed query """
+        self.query_profiler.add_hook(hook)
+
+    def remove_query_hook(self, hook: Callable[[QueryProfile], Any]):
+        self.query_profiler.remove_hook(hook)
+
+    def _execute(self, query: CompiledQuery, db: StandardDatabase = None, **options):
         """
-          Format a lookup filter from keys and values in lookup_key_dict
-          Returns string in format "doc.active == true AND doc.gender == 'f'"
+        Execute compiled query (in db, default is this database's, or its active transaction) with given
+        cursor options (count, batch_size, etc.); opting into the server's query plan cache when so configured.
+        Read-only queries outside transactions are retried with backoff on overload and server errors.
         """
-        result = ''
-        if lookup_key_dict and len(lookup_key_dict) > 0:
-            attrs = {f"doc.{k} == {self.__format_query_value(v)}" for (k, v) in lookup_key_dict.items()}
-            filter_by = " AND ".join(attrs)
-            result = f"FILTER {filter_by}" if filter_by else ""
+        if self.use_plan_cache:
+            options['use_plan_cache'] = True
+        db = db or self.db
+        if query.read_only and not isinstance(db, TransactionDatabase):
+            for delay in self.connection_config.retry_delays():
+                try:
+                    return db.aql.execute(query.aql, bind_vars=query.bind_vars, **options)
+                except AQLQueryExecuteError as e:
+                    if e.http_code not in RETRY_STATUS_CODES:
+                        raise
+                    logger.warning(f"Retrying query in {delay}s after HTTP {e.http_code}: {e.error_message}")
+                    time.sleep(delay)
+        return db.aql.execute(query.aql, bind_vars=query.bind_vars, **options)
+
+    def _first_doc(self, query: CompiledQuery) -> Optional[Dict[str, Any]]:
+        """ Execute compiled query, returning its first document (or None) """
+        docs = self._query_docs(query, {'batch_size': 1})
+        result = next(docs, None)
+        docs.close()
         return result
 
-    def _format_query_attrs(self, doc: Dict) -> str:
+    def _query_docs(self, query: CompiledQuery, cursor_options: Union[CursorOptions, Dict[str, Any]] = None):
         """
-          Format keys and values for query, allowing for literals.
-          Returns a string with format:
-            'key1':'val1', 'key2':'val2", 'key3': literal_expression...
+        Return a generator of documents of compiled query; prefetching batches if so configured.
+        The query is executed when the generator is first advanced (in the transaction active now, if any),
+        and profiled once the generator is exhausted or closed; so an unconsumed generator holds no server cursor.
         """
-        attrs = {f"'{k}': {self.__format_query_value(v)}" for (k, v) in doc.items()}
-        return ", ".join(attrs)
-
-    @staticmethod
-    def _cursor_doc_generator(cursor):
-        while True:
-            # batch_items = cursor.batch()
-            # logger.debug(f"batch_items", batch_items)
-            for doc in cursor.batch():
-                yield doc
-            if not cursor.has_more():
-                break
-            cursor.next()
-
-    def __format_query_values(self, doc: Dict[str, Any]):
-        return {k: self.__format_query_value(v) for k, v in doc.items()}
-
-    @staticmethod
-    def __format_query_value(value: Any):
-        """ Format value, allowing for literals """
-        if isinstance(value, str):
-            if value.startswith('`') and value.endswith('`'):
-                # Literal, no quotes:
-                query_expression = value.replace('`', '')
-            else:
-                # Non-literal; quote it:
-                query_expression = f"'{value}'"
+        return self._profiled_docs(query, self.db, self._cursor_options(cursor_options))
+
+    def _profiled_docs(self, query: CompiledQuery, db: StandardDatabase, options: Dict[str, Any]):
+        prefetch = options.pop('prefetch')
+        run = self.query_profiler.start(query)
+        start_time = time.perf_counter()
+        cursor = self._execute(query, db, **options)
+        run.add_time(start_time)
+        if prefetch:
+            docs = self._prefetch_doc_generator(cursor, prefetch, run)
         else:
-            query_expression = value
-
-        return query_expression
+            docs = self._cursor_doc_generator(cursor, run)
+        try:
+            yield from docs
+        finally:
+            docs.close()
+            self._finish_query(run, cursor.statistics())
+
+    def _finish_query(self, run: QueryRun, stats: Dict[str, Any] = None):
+        """ Profile finished query run; logging it with its plan if it was slow """
+        profile = self.query_profiler.finish(run, stats)
+        if self.query_profiler.is_slow(profile):
+            plan = None
+            if self.query_profiler.needs_plan(profile):
+                try:
+                    plan = self.explain(run.query)
+                except AQLQueryExplainError as e:
+                    logger.warning(f"Could not explain slow query: {e}")
+            self.query_profiler.log_slow_query(profile, plan)
 
-    def __autogen_keys(self, collection_name: str, doc: dict):
-        """ Autogenerate key & id using UUID.  Can probably be changed to a DB function.  """
-        new_doc = dict(doc)
-        new_doc["_key"] = self.__new_uuid()
-        new_doc["_id"] = f"{collection_name}/{new_doc['_key']}"
-        return new_doc
+    @staticmethod
+    def _cursor_doc_generator(cursor, run: QueryRun = None):
+        """
+        Yield documents from cursor, fetching further batches as they are consumed.  If the consumer
+        stops early (the generator is closed or garbage collected), the server cursor is closed.
+        """
+        try:
+            while True:
+                batch = cursor.batch()
+                if run:
+                    run.add_batch(len(batch))
+                while batch:
+                    yield batch.popleft()
+                if not cursor.has_more():
+                    break
+                start_time = time.perf_counter()
+                cursor.fetch()
+                if run:
+                    run.add_time(start_time)
+        finally:
+            if cursor.has_more():
+                cursor.close(ignore_missing=True)
 
     @staticmethod
-    def __new_uuid():
-        """ Return a new UUID  """
-        return str(uuid.uuid1())
+    def _prefetch_doc_generator(cursor, depth: int, run: QueryRun = None):
+        """
+        Yield documents from cursor, while a worker thread fetches up to `depth` batches ahead.
+        Errors in the worker are raised to the consumer.  If the consumer stops early, the worker
+        stops and the server cursor is closed.
+        """
+        batches = queue.Queue(maxsize=depth)
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            # Wait for room in the queue, unless the consumer has stopped:
+            while not stopped.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fetch_batches():
+            try:
+                while True:
+                    batch = list(cursor.batch())
+                    cursor.batch().clear()
+                    if run:
+                        run.add_batch(len(batch))
+                    if batch and not put(batch):
+                        return
+                    if not cursor.has_more():
+                        break
+                    start_time = time.perf_counter()
+                    cursor.fetch()
+                    if run:
+                        run.add_time(start_time)
+                put(PREFETCH_DONE)
+            except Exception as e:
+                put(e)
+            finally:
+                if cursor.has_more():
+                    try:
+                        cursor.close(ignore_missing=True)
+                    except Exception as e:
+                        logger.warning(f"Error closing prefetched cursor: {e}")
+
+        worker = threading.Thread(target=fetch_batches, name='pao-prefetch', daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is PREFETCH_DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield from item
+        finally:
+            stopped.set()
+            worker.join()
@@ -1,8 +1,121 @@
+import functools
+import inspect
+import os
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Sequence
+from contextvars import ContextVar
+from enum import StrEnum, auto
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+)
+
+from python_arango_ogm.db.pao_query_cache import CACHE_MISS, PAOLRUQueryCache, PAOQueryCache
+from python_arango_ogm.db.pao_query_compiler import PAOQueryCompiler
+from python_arango_ogm.db.pao_query_profiler import PAOQueryProfiler
+from python_arango_ogm.db.pao_query_shapes import PAOQueryShapeLog
+
+
+# Attributes kept by every projection, so projected documents can still be identified and updated:
+SYSTEM_ATTRIBUTES = ('_id', '_key', '_rev')
+
+
+# Stream transaction active in the current context (thread or task), as (database, transaction handle):
+ACTIVE_TRANSACTION: ContextVar[Optional[Tuple[Any, Any]]] = ContextVar('pao_active_transaction', default=None)
+
+
+class CursorOptions(NamedTuple):
+    """
+    Options for cursors over query results.  By default, the server streams results
+    in batches, without materializing the full result to count it.  If `prefetch` is given,
+    up to that many batches are fetched in the background while results are consumed.
+    """
+    batch_size: int = 1000
+    stream: bool = True
+    ttl: int = None
+    count: bool = False
+    prefetch: int = 0
+
+
+class Page(NamedTuple):
+    """ A page of documents (or records), and an opaque token for the page after it; None on the last page """
+    items: List[Any]
+    next_token: Optional[str]
+
+
+class TraversalDirectionEnum(StrEnum):
+    """
+    Direction in which edges are followed by a traversal:
+    """
+    OUTBOUND = auto()
+    INBOUND = auto()
+    ANY = auto()
+
+
+class TraversalResultEnum(StrEnum):
+    """
+    What a traversal returns for each vertex it reaches; the vertex, the edge to it, or the whole path:
+    """
+    VERTICES = auto()
+    EDGES = auto()
+    PATHS = auto()
+
+
+class AggregateEnum(StrEnum):
+    """
+    Aggregate functions for metrics of `aggregate`; AVG is the average of (non-null) values:
+    """
+    COUNT = auto()
+    SUM = auto()
+    MIN = auto()
+    MAX = auto()
+    AVG = auto()
+
+    def aql_function(self) -> str:
+        return 'AVERAGE' if self == AggregateEnum.AVG else self.upper()
+
+
+def invalidates_cache(method: Callable) -> Callable:
+    """
+    Decorate a database write method (taking collection_name as its first argument),
+    so cached query results for the collection are invalidated once it returns or raises.
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, collection_name: str, *args, **kwargs):
+            try:
+                return await method(self, collection_name, *args, **kwargs)
+            finally:
+                self._invalidate_cache(collection_name)
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, collection_name: str, *args, **kwargs):
+        try:
+            return method(self, collection_name, *args, **kwargs)
+        finally:
+            self._invalidate_cache(collection_name)
+
+    return wrapper
 
 
 class PAODBBase(ABC):
+    """
+    Base class for databases; defining the contract implemented by databases, along with the caching,
+    profiling and transaction state they share.  Query building is in `PAOQueryBuilder`.
+    """
+    query_compiler: PAOQueryCompiler = None
+    query_cache: PAOQueryCache = None
+    query_profiler: PAOQueryProfiler = None
+    query_shape_log: PAOQueryShapeLog = None
+    DEFAULT_CURSOR_OPTIONS = CursorOptions()
+
+    def __init__(self, query_cache: PAOQueryCache = None, slow_query_ms: float = None):
+        """ Set up this database's own query compiler, result cache, profiler and query shape log """
+        self.query_compiler = PAOQueryCompiler(cache_size=int(os.getenv('PAO_QUERY_CACHE_SIZE', 256)))
+        self.query_cache = query_cache or self._query_cache_from_env()
+        self.query_profiler = PAOQueryProfiler(slow_query_ms or self._slow_query_ms_from_env())
+        self.query_shape_log = self._query_shape_log_from_env()
+
     @abstractmethod
     def setup_app_database(self, delete_db):
         """
@@ -13,7 +126,13 @@ class PAODBBase(ABC):
         """
         pass
 
-    def get_related_edges(self, collection_name: str, association_collection_name: str, lookup_key_dict: Dict):
+    def get_related_edges(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None
+    ):
         """
         Gets `association_collection_name` edges of `collection_name`;
         looking up by the keys and values in `lookup_key_dict`:
@@ -21,10 +140,59 @@ class PAODBBase(ABC):
         pass
 
     @abstractmethod
-    def get_related_vertices(self, collection_name: str, association_collection_name: str, lookup_key_dict: Dict):
+    def get_related_vertices(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ):
         """
         Lookup associated vertices (`association_collection_name`) through edges,
-        from given collection_name, using keys and values in lookup_key_dict:
+        from given collection_name, using keys and values in lookup_key_dict;
+        projected to only (or all but exclude) attributes, if given:
+        """
+        pass
+
+    @abstractmethod
+    def get_related_vertices_by_parent(
+            self,
+            edge_collection_name: str,
+            parent_ids: Sequence[str],
+            limit: int = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lookup vertices associated through edge_collection_name with each of parent_ids (document _ids),
+        with a single query; returning lists of up to `limit` vertices (projected, if only or exclude is given),
+        by parent _id.
+        """
+        pass
+
+    @abstractmethod
+    def traverse(
+            self,
+            start_id: str,
+            edge_collection_names: Sequence[str] = None,
+            depth: Tuple[int, int] = (1, 1),
+            direction: TraversalDirectionEnum = TraversalDirectionEnum.OUTBOUND,
+            prune: Dict[str, Any] = None,
+            edge_filter: Dict[str, Any] = None,
+            vertex_filter: Dict[str, Any] = None,
+            result: TraversalResultEnum = TraversalResultEnum.VERTICES,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None
+    ):
+        """
+        Traverse from vertex start_id (a document _id), between depth[0] and depth[1] hops, on the server;
+        streaming back vertices, edges or paths (see TraversalResultEnum).
+
+        :param edge_collection_names: Edge collections to follow; defaults to all edges of the PAO_GRAPH_NAME graph.
+        :param prune: Attributes of vertices past which not to walk
+        :param edge_filter: Attributes every edge on a path must have
+        :param vertex_filter: Attributes of vertices to return
         """
         pass
 
@@ -39,14 +207,40 @@ class PAODBBase(ABC):
         pass
 
     @abstractmethod
-    def find_by_key(self, collection_name: str, key: Any):
+    def find_by_key(
+            self,
+            collection_name: str,
+            key: Any,
+            rev: str = None,
+            cache_ttl: float = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ):
         """
-          Find document on collection by given key value:
+          Find document on collection by given key value (and revision, if given);
+          caching the result for cache_ttl seconds, if given and the database has a query_cache.
+          If only (or exclude) is given, the document is projected by a query instead, returning None
+          (rather than raising) if the revision doesn't match.
         """
         pass
 
     @abstractmethod
-    def find_by_attributes(self, collection_name: str, lookup_key_dict: Dict = None):
+    def find_by_keys(
+            self,
+            collection_name: str,
+            keys: Sequence[str],
+            chunk_size: int = 500,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+          Find documents by given keys (or _id strings), in chunked requests (projected, if only or exclude is given);
+          returning documents in the order of given keys, with None for missing keys.
+        """
+        pass
+
+    @abstractmethod
+    def find_by_attributes(self, collection_name: str, lookup_key_dict: Dict = None, cache_ttl: float = None):
         """
           Find a single document by given collection_name,
           looking up by the keys and values in lookup_key_dict:
@@ -54,8 +248,19 @@ class PAODBBase(ABC):
         pass
 
     @abstractmethod
-    def remove_by_key(self, collection_name: str, key: str):
-        """ Remove a document identified by `key` from collection """
+    def remove_by_key(self, collection_name: str, key: str, rev: str = None, silent: bool = False):
+        """ Remove a document identified by `key` (and revision, if given) from collection """
+        pass
+
+    @abstractmethod
+    def remove_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Union[str, Dict[str, Any]]],
+            check_rev: bool = True,
+            silent: bool = False
+    ):
+        """ Remove documents (keys or documents with _key and optionally _rev) from collection """
         pass
 
     @abstractmethod
@@ -63,7 +268,11 @@ class PAODBBase(ABC):
             self,
             collection_name: str,
             lookup_key_dict: Dict = None,
-            sort_key_dict: Dict[str, str] = None
+            sort_key_dict: Dict[str, str] = None,
+            cursor_options: Union[CursorOptions, Dict[str, Any]] = None,
+            cache_ttl: float = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
     ):
         """
           Gets documents from given collection_name, looking up by the keys and values
@@ -73,6 +282,84 @@ class PAODBBase(ABC):
           :param lookup_key_dict: A dictionary of keys and corresponding values used to query this collection
           values (ASC, DESC):
           :param sort_key_dict: A dictionary of keys by which to sort documents.  Values specify direction (ASC, DESC, '')
+          :param cursor_options: CursorOptions, or a dictionary overriding some of DEFAULT_CURSOR_OPTIONS
+          :param cache_ttl: Seconds to cache results for, if the database has a query_cache
+          :param only: Attributes to return (along with _id, _key and _rev); with an index storing them
+          (see `Index.stored_values`), documents needn't be read at all.
+          :param exclude: Attributes not to return
+        """
+        pass
+
+    @abstractmethod
+    def transaction(
+            self,
+            write: Sequence[str] = None,
+            read: Sequence[str] = None,
+            exclusive: Sequence[str] = None,
+            lock_timeout: int = None,
+            max_size: int = None,
+            sync: bool = None,
+            allow_implicit: bool = True
+    ):
+        """
+          Context manager running a stream transaction; every call on this database (and so on models) within it,
+          in the same thread or task, joins the transaction.  It is committed when the block exits, or aborted
+          if the block raises.  Nested blocks join the enclosing transaction.
+
+          :param write: Collections written in the transaction
+          :param read: Collections read in the transaction (others may also be read, if allow_implicit)
+          :param exclusive: Collections written exclusively
+          :param lock_timeout: Seconds to wait for collection locks (0 waits forever)
+          :param max_size: Maximum size of the transaction in bytes
+          :param sync: Whether the commit waits for data to be synced to disk
+        """
+        pass
+
+    @abstractmethod
+    def count(self, collection_name: str, lookup_key_dict: Dict[str, Any] = None, cache_ttl: float = None) -> int:
+        """
+          Count documents in collection_name matching the keys and values in lookup_key_dict, on the server;
+          using the collection's count (rather than a scan) if there is no lookup.
+        """
+        pass
+
+    @abstractmethod
+    def aggregate(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            group_by: Sequence[str] = None,
+            metrics: Dict[str, Tuple[str, str]] = None,
+            cache_ttl: float = None
+    ) -> List[Dict[str, Any]]:
+        """
+          Aggregate documents in collection_name matching the keys and values in lookup_key_dict, on the server;
+          returning only a row per group.
+
+          :param group_by: Attributes to group by; each row has the group's values of them.  Without group_by,
+          a single row aggregates all matching documents.
+          :param metrics: Metrics to compute per group, by name, as (AggregateEnum, attribute); e.g.,
+          {'total': ('sum', 'price')}.  Rows also have the "count" of documents in the group.
+          :param cache_ttl: Seconds to cache results for, if the database has a query_cache
+        """
+        pass
+
+    @abstractmethod
+    def get_page(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict = None,
+            sort_key_dict: Dict[str, str] = None,
+            page_size: int = 100,
+            after: str = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Page:
+        """
+          Gets a page of documents from given collection_name, looking up by the keys and values in
+          lookup_key_dict, sorted by sort_key_dict and then _key.  Pages are seeked from the sort values of the
+          previous page's last document (given by its next_token, as `after`); so with an index on the lookup and
+          sort keys, each page costs the same regardless of its position.
         """
         pass
 
@@ -85,15 +372,94 @@ class PAODBBase(ABC):
         pass
 
     @abstractmethod
-    def insert_doc(self, collection_name: str, doc: Dict):
+    def insert_edges(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            pairs: Iterable[Tuple[str, str]],
+            attrs: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            on_duplicate: str = 'error'
+    ) -> List[Dict[str, Any]]:
+        """
+          Insert edges between (from_key, to_key) pairs (keys, or _id strings) from any iterable through the bulk
+          import endpoint, in chunks of `batch_size`; each edge with the given attrs.  With a unique index on
+          (_from, _to) (see `PAOEdgeDef.unique`), on_duplicate='ignore' skips existing edges on the server.
+          Returns a report per chunk.
+        """
+        pass
+
+    @abstractmethod
+    def insert_doc(self, collection_name: str, doc: Dict, return_new: bool = True, silent: bool = False):
         """
           Insert a new doc in collection:
         """
         pass
 
     @abstractmethod
-    def insert_docs(self, collection_name: str, docs: Sequence[dict[str, Any]]):
-        """ Insert given documents into collection with a single query"""
+    def replace_doc(
+            self,
+            collection_name: str,
+            key: str,
+            doc: Dict[str, Any],
+            rev: str = None,
+            return_new: bool = True,
+            silent: bool = False
+    ):
+        """ Replace document identified by `key` (and revision, if given) in collection """
+        pass
+
+    @abstractmethod
+    def replace_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Dict[str, Any]],
+            check_rev: bool = True,
+            return_new: bool = False,
+            silent: bool = False
+    ):
+        """ Replace documents (each with a _key and optionally _rev) in collection """
+        pass
+
+    @abstractmethod
+    def update_doc(
+            self,
+            collection_name: str,
+            key: str,
+            doc: Dict[str, Any],
+            rev: str = None,
+            return_new: bool = True,
+            silent: bool = False,
+            keep_null: bool = True
+    ):
+        """ Update (patch) document identified by `key` (and revision, if given) in collection """
+        pass
+
+    @abstractmethod
+    def update_docs(
+            self,
+            collection_name: str,
+            docs: Sequence[Dict[str, Any]],
+            check_rev: bool = True,
+            return_new: bool = False,
+            silent: bool = False,
+            keep_null: bool = True
+    ):
+        """ Update (patch) documents (each with a _key and optionally _rev) in collection """
+        pass
+
+    @abstractmethod
+    def insert_docs(
+            self,
+            collection_name: str,
+            docs: Iterable[Dict[str, Any]],
+            batch_size: int = 1000,
+            on_duplicate: str = 'error'
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert given documents into collection through the bulk import endpoint,
+        in chunks of `batch_size`; returning a report per chunk.
+        """
         pass
 
     @abstractmethod
@@ -114,3 +480,122 @@ class PAODBBase(ABC):
           update_dict: Dictionary of values to update only
         """
         pass
+
+    @abstractmethod
+    def upsert_docs(
+            self,
+            collection_name: str,
+            docs: Iterable[Dict[str, Any]],
+            lookup_keys: Sequence[str],
+            insert_dict: Dict[str, Any] = None,
+            update_dict: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            new_doc_callback: Callable[[Dict[str, Any]], Any] = None
+    ) -> Dict[str, int]:
+        """
+          Upsert given documents in collection using given lookup_keys, with a single query per batch.
+          Returns counts of inserted and updated documents; new documents are passed to new_doc_callback.
+        """
+        pass
+
+    def cache_stats(self) -> Dict[str, int]:
+        """ Return query cache counters (hits, misses, evictions, etc.); empty without a query_cache """
+        return self.query_cache.stats() if self.query_cache else {}
+
+    @staticmethod
+    def _slow_query_ms_from_env() -> Optional[float]:
+        slow_query_ms = os.getenv('PAO_SLOW_QUERY_MS')
+        return float(slow_query_ms) if slow_query_ms else None
+
+    @staticmethod
+    def _query_shape_log_from_env() -> Optional[PAOQueryShapeLog]:
+        """ Create query shape log if PAO_QUERY_SHAPE_LOG is set in the environment """
+        path = os.getenv('PAO_QUERY_SHAPE_LOG')
+        return PAOQueryShapeLog(path) if path else None
+
+    @staticmethod
+    def _query_cache_from_env() -> Optional[PAOQueryCache]:
+        """ Create query result cache if PAO_RESULT_CACHE_ENTRIES is set in the environment """
+        max_entries = int(os.getenv('PAO_RESULT_CACHE_ENTRIES', 0))
+        if not max_entries:
+            return None
+        return PAOLRUQueryCache(max_entries, int(os.getenv('PAO_RESULT_CACHE_BYTES', 16 * 1024 * 1024)))
+
+    def _read_through(self, collection_name: str, key: Hashable, cache_ttl: Optional[float], read: Callable[[], Any]):
+        """
+        Return cached result for key; otherwise read it, caching it for cache_ttl seconds.
+        The cache is bypassed within transactions, which may read their own uncommitted writes.
+        """
+        if self.query_cache is None or not cache_ttl or self._transaction_handle() is not None:
+            return read()
+        result = self.query_cache.get(collection_name, key)
+        if result is CACHE_MISS:
+            result = read()
+            self.query_cache.set(collection_name, key, result, cache_ttl)
+        return self._cached_copy(result)
+
+    def _cached_copy(self, result: Any) -> Any:
+        """
+        Return result (read through the query cache) for a caller; shallow copies of its documents, unless the
+        cache already returns copies (a serializing cache also copied the result when storing it).
+        """
+        if self.query_cache.RETURNS_COPIES:
+            return result
+        if isinstance(result, dict):
+            return dict(result)
+        if isinstance(result, list):
+            return [dict(d) if isinstance(d, dict) else d for d in result]
+        return result
+
+    def _invalidate_cache(self, collection_name: str):
+        if self.query_cache is not None:
+            self.query_cache.invalidate(collection_name)
+
+    def _transaction_handle(self) -> Any:
+        """ Return handle of this database's transaction active in the current context, if any """
+        transaction = ACTIVE_TRANSACTION.get()
+        return transaction[1] if transaction is not None and transaction[0] is self else None
+
+    def _transaction_options(
+            self,
+            write: Sequence[str] = None,
+            read: Sequence[str] = None,
+            exclusive: Sequence[str] = None,
+            lock_timeout: int = None,
+            max_size: int = None,
+            sync: bool = None,
+            allow_implicit: bool = True
+    ) -> Dict[str, Any]:
+        """ Return options for beginning a transaction, as keyword arguments of python-arango's begin_transaction """
+        return {
+            'read': list(read or []),
+            'write': list(write or []),
+            'exclusive': list(exclusive or []),
+            'lock_timeout': lock_timeout,
+            'max_size': max_size,
+            'sync': sync,
+            'allow_implicit': allow_implicit
+        }
+
+    def _end_transaction(self, token, options: Dict[str, Any]):
+        """
+        Leave transaction context; invalidating cached results for collections it wrote, which
+        may have been read (and cached) by other contexts after the writes but before the commit.
+        """
+        ACTIVE_TRANSACTION.reset(token)
+        for collection_name in [*options['write'], *options['exclusive']]:
+            self._invalidate_cache(collection_name)
+
+    def _cursor_options(self, cursor_options: Union[CursorOptions, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """ Return cursor options as keyword arguments; a dictionary overrides some of DEFAULT_CURSOR_OPTIONS """
+        if cursor_options is None:
+            cursor_options = self.DEFAULT_CURSOR_OPTIONS
+        elif isinstance(cursor_options, dict):
+            cursor_options = self.DEFAULT_CURSOR_OPTIONS._replace(**cursor_options)
+        return cursor_options._asdict()
+
+    @staticmethod
+    def edge_collection_name(collection_name: str, association_collection_name: str) -> str:
+        """ Name of edge collection from collection_name to association_collection_name """
+        return f"{collection_name}__{association_collection_name}"
+
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import importlib
 import os
-import sys
-from typing import Dict, Any, Union, Sequence, Type
+from typing import Dict, Any, Iterable, Iterator, List, Union, Sequence, Tuple, Type
 import python_arango_ogm.db
 from python_arango_ogm.db.pao_db_base import PAODBBase
 
+# An edge endpoint; a record, or its key:
+EdgeEndpoint = Union[str, 'python_arango_ogm.db.pao_model.PAOModel']
+
 
 class PAOEdgeDef:
+    """
+    Edge definition from one model to another.  If `unique`, migrations add a unique index on (_from, _to),
+    so there is at most one edge between two vertices, and `insert_edges` ignores duplicates on the server.
+    """
     def __init__(self, from_model: [Type[python_arango_ogm.db.pao_model.PAOModel], str],
-                 to_model: [Type[python_arango_ogm.db.pao_model.PAOModel], str]):
+                 to_model: [Type[python_arango_ogm.db.pao_model.PAOModel], str], unique: bool = False):
         self.from_model = from_model
         self.to_model = to_model
+        self.unique = unique
         if self.to_model is None:
             raise ValueError("PAOEdgeDef to_model cannot be None")
 
@@ -28,23 +36,89 @@ class PAOEdgeDef:
             _from: [str, python_arango_ogm.db.pao_model.PAOModel],
             _to: Union[str, python_arango_ogm.db.pao_model.PAOModel]
     ):
-        pass
+        """ Insert an edge between given vertices (records, or their keys) of the from and to models """
+        from_key = _from if isinstance(_from, str) else _from._key
+        to_key = _to if isinstance(_to, str) else _to._key
+        return self.db().insert_edge(
+            self.model_class_from().collection_name(), self.model_class_to().collection_name(), from_key, to_key
+        )
+
+    def insert_edges(
+            self,
+            pairs: Iterable[Tuple[EdgeEndpoint, EdgeEndpoint]],
+            attrs: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            on_duplicate: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert edges between (from, to) pairs of vertices (records, or their keys) from any iterable, streamed
+        through the bulk import endpoint in chunks of batch_size; each edge with given attrs.  Duplicates are
+        ignored on the server for `unique` edge definitions, unless on_duplicate is given.
+        Returns a report per chunk, with counts of created, errors and ignored edges.
+        """
+        return self.db().insert_edges(
+            self.model_class_from().collection_name(),
+            self.model_class_to().collection_name(),
+            self._key_pairs(pairs),
+            attrs,
+            batch_size=batch_size,
+            on_duplicate=on_duplicate or ('ignore' if self.unique else 'error')
+        )
 
-    def associated_edges(self, lookup_key_dict: Dict[str, Any] = None) -> Sequence[PAOEdgeDef]:
+    async def insert_edges_async(
+            self,
+            pairs: Iterable[Tuple[EdgeEndpoint, EdgeEndpoint]],
+            attrs: Dict[str, Any] = None,
+            batch_size: int = 1000,
+            on_duplicate: str = None
+    ) -> List[Dict[str, Any]]:
+        """ Async version of `insert_edges` """
+        return await self.model_class_from().async_db.insert_edges(
+            self.model_class_from().collection_name(),
+            self.model_class_to().collection_name(),
+            self._key_pairs(pairs),
+            attrs,
+            batch_size=batch_size,
+            on_duplicate=on_duplicate or ('ignore' if self.unique else 'error')
+        )
+
+    @staticmethod
+    def _key_pairs(pairs: Iterable[Tuple[EdgeEndpoint, EdgeEndpoint]]) -> Iterator[Tuple[str, str]]:
+        for _from, _to in pairs:
+            yield (_from if isinstance(_from, str) else _from._key), (_to if isinstance(_to, str) else _to._key)
+
+    def edge_collection_name(self) -> str:
+        return PAODBBase.edge_collection_name(
+            self.model_class_from().collection_name(), self.model_class_to().collection_name()
+        )
+
+    def associated_edges(self, lookup_key_dict: Dict[str, Any] = None) -> Iterable[Dict[str, Any]]:
+        """ Edges from vertices matching lookup_key_dict; traversed through the edge index """
         from_model_cls = self.model_class_from()
         to_model_cls = self.model_class_to()
         from_collection_name = from_model_cls.collection_name()
         to_collection_name = to_model_cls.collection_name()
-        return from_model_cls.db.get_edge_associations(from_collection_name, to_collection_name, lookup_key_dict)
+        return from_model_cls.db.get_related_edges(from_collection_name, to_collection_name, lookup_key_dict)
 
-    def associated_vertices(self, lookup_key_dict: Dict[str, Any], marshall=True) -> Sequence[
-        Type[python_arango_ogm.db.pao_model.PAOModel]]:
+    def associated_vertices(
+            self,
+            lookup_key_dict: Dict[str, Any],
+            marshall=True,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> Iterable[Type[python_arango_ogm.db.pao_model.PAOModel]]:
+        """
+        Vertices reached through edges from vertices matching lookup_key_dict; traversed through the edge index.
+        If given, only those fields (or all but exclude fields) of vertices are loaded.
+        """
         from_model_cls = self.model_class_from()
         to_model_cls = self.model_class_to()
         from_collection_name = from_model_cls.collection_name()
         to_collection_name = to_model_cls.collection_name()
-        vertices = from_model_cls.db.get_related_vertices(from_collection_name, to_collection_name, lookup_key_dict)
-        return to_model_cls.marshall_row(vertices, marshall)
+        vertices = from_model_cls.db.get_related_vertices(
+            from_collection_name, to_collection_name, lookup_key_dict, only=only, exclude=exclude
+        )
+        return to_model_cls.marshall_rows(vertices, to_model_cls.unloaded_fields(only, exclude)) if marshall else vertices
 
     def model_class_from(self) -> Type[python_arango_ogm.db.pao_model.PAOModel]:
         return self.get_model_class(self.from_model)
@@ -52,13 +126,13 @@ class PAOEdgeDef:
     def model_class_to(self) -> Type[python_arango_ogm.db.pao_model.PAOModel]:
         return self.get_model_class(self.to_model)
 
-    @staticmethod
     def get_model_class(
+            self,
             model: Union[str, Type[python_arango_ogm.db.pao_model.PAOModel]]
     ) -> Type[python_arango_ogm.db.pao_model.PAOModel]:
         # Get model class, whether it is defined as an actual class or a model:
         if isinstance(model, str):
-            module = sys.modules[self.models_module_name]
+            module = importlib.import_module(self.models_module_name)
             result = getattr(module, model)
         else:
             result = model
@@ -0,0 +1,120 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from loguru import logger
+
+from python_arango_ogm.db.pao_db_base import PAODBBase
+from python_arango_ogm.db.pao_migration_builder import INDENT, PAOMigrationBuilder
+from python_arango_ogm.db.pao_model import PAOModel
+from python_arango_ogm.db.pao_query_shapes import QueryShape
+
+
+class IndexAdvice(NamedTuple):
+    """ Advice for a query shape; from its plan, along with a suggested index if it needs one """
+    shape: QueryShape
+    full_scan: bool
+    in_memory_sort: bool
+    indexes_used: List[str]
+    declared_indexes: List[str]
+    suggested_fields: Optional[List[str]] = None
+    migration: Optional[str] = None
+
+
+class PAOIndexAdvisor:
+    """
+    Checks recorded query shapes against the indexes of a migrated database, by explaining their queries;
+    reporting shapes whose plans do full collection scans or in-memory sorts, and suggesting
+    persistent (composite) indexes to cover them, as migration snippets.
+
+    :param pao_db: Database with migrations applied
+    :param model_hash: Models by name, as discovered by PAOModelDiscovery
+    """
+
+    def __init__(self, pao_db: PAODBBase, model_hash: Dict[str, type[PAOModel]]):
+        self.pao_db = pao_db
+        self.models = {m.collection_name(): m for m in model_hash.values()}
+
+    def advise(self, shapes: Iterable[QueryShape]) -> List[IndexAdvice]:
+        """ Return advice for each distinct shape """
+        return [self.advise_shape(shape) for shape in dict.fromkeys(shapes)]
+
+    def advise_shape(self, shape: QueryShape) -> IndexAdvice:
+        query = self.pao_db._compile_by_attributes(
+            shape.collection_name, dict.fromkeys(shape.filter_keys), dict(shape.sort_keys), record_shape=False
+        )
+        plan = self.pao_db.explain(query)
+        nodes = plan.get('nodes', [])
+        full_scan = any(n.get('type') == 'EnumerateCollectionNode' for n in nodes)
+        in_memory_sort = any(n.get('type') == 'SortNode' for n in nodes)
+        indexes_used = [i.get('name', i.get('id')) for n in nodes if n.get('type') == 'IndexNode' for i in n['indexes']]
+
+        advice = IndexAdvice(
+            shape=shape,
+            full_scan=full_scan,
+            in_memory_sort=in_memory_sort,
+            indexes_used=indexes_used,
+            declared_indexes=self.covering_indexes(shape)
+        )
+        if full_scan or in_memory_sort:
+            fields = self.suggested_fields(shape)
+            if fields:
+                advice = advice._replace(suggested_fields=fields, migration=self.migration_snippet(shape, fields))
+        return advice
+
+    def covering_indexes(self, shape: QueryShape) -> List[str]:
+        """ Return names of indexes declared on the shape's model that lead with a key it filters (or sorts) by """
+        model = self.models.get(shape.collection_name)
+        if model is None:
+            logger.warning(f"No model found for collection {shape.collection_name}")
+            return []
+        leading_keys = set(shape.filter_keys) or {k for k, _ in shape.sort_keys[:1]}
+        return [name for name, fields in self.declared_indexes(model).items() if fields and fields[0] in leading_keys]
+
+    @staticmethod
+    def declared_indexes(model: type[PAOModel]) -> Dict[str, List[str]]:
+        """ Return fields of indexes declared on model (through fields and Index attributes), by name """
+        indexes = {f.index_name: [n] for n, f in model.get_field_defs().items() if f.index_name}
+        indexes.update({i.name: list(i.fields) for i in model.get_indexes().values()})
+        return indexes
+
+    @staticmethod
+    def suggested_fields(shape: QueryShape) -> List[str]:
+        """
+        Return fields of a persistent index covering shape; equality filters first, then sort keys.
+        Sort keys are only included if sorted in a single direction, as an index can't serve mixed ones.
+        """
+        fields = list(shape.filter_keys)
+        if len({d for _, d in shape.sort_keys}) == 1:
+            fields.extend(k for k, _ in shape.sort_keys if k not in fields)
+        return fields
+
+    @staticmethod
+    def migration_snippet(shape: QueryShape, fields: List[str]) -> str:
+        """ Return lines adding a persistent index on fields, for the up() function of a migration """
+        coll_var = f"{shape.collection_name}_collection"
+        return "\n".join([
+            f"{INDENT}{coll_var}=db.collection('{shape.collection_name}')",
+            PAOMigrationBuilder.ADD_PERSISTENT_INDEX_STR.format(
+                indent=INDENT,
+                coll_var=coll_var,
+                idx_name=f"{'_'.join(fields)}_idx",
+                fields=fields,
+                unique=False,
+                options=""
+            )
+        ])
+
+    @staticmethod
+    def format_report(advice: Iterable[IndexAdvice]) -> str:
+        """ Format advice as a report, with migration snippets for suggested indexes """
+        lines = []
+        for a in advice:
+            problems = [p for p, found in (('full collection scan', a.full_scan), ('in-memory sort', a.in_memory_sort)) if found]
+            sort = ', '.join(f"{k} {d}" for k, d in a.shape.sort_keys)
+            lines.append(
+                f"{a.shape.collection_name}: filter [{', '.join(a.shape.filter_keys)}] sort [{sort}]: "
+                f"{'; '.join(problems) or 'ok'} (indexes used: {a.indexes_used or 'none'}; "
+                f"declared: {a.declared_indexes or 'none'})"
+            )
+            if a.migration:
+                lines.append(a.migration)
+        return "\n".join(lines)
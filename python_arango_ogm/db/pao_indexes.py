@@ -7,19 +7,27 @@ class IndexTypeEnum(StrEnum):
     Field Type Enum, used to specify field type in certain situations:
     """
     HASH = auto()
+    PERSISTENT = auto()
     INVERTED = auto()
     GEO = auto()
     TTL = auto()
 
 
 class Index:
-    def __init__(self, fields: Union[Sequence[str], dict[str: any]], index_type: IndexTypeEnum, name, unique=False, expiry_seconds=None):
+    """
+    An index of a model.  PERSISTENT indexes may also store `stored_values` (attributes which aren't indexed),
+    so queries projecting only indexed and stored attributes are answered from the index without reading documents.
+    """
+    def __init__(self, fields: Union[Sequence[str], dict[str: any]], index_type: IndexTypeEnum, name, unique=False, expiry_seconds=None, stored_values: Sequence[str] = None):
         self.fields = fields
         self.index_type = index_type
         self.name = name
         self.expiry_seconds = expiry_seconds
         self.unique = unique
+        self.stored_values = stored_values
         if index_type == IndexTypeEnum.INVERTED and (len(fields) < 2 or not isinstance(fields, dict)):
             raise ValueError('INVERTED indexes must have at least 2 fields in a dictinoary.')
         elif index_type == IndexTypeEnum.TTL and expiry_seconds is None:
             raise ValueError('TTL indexes must also have expiry seconds')
+        elif stored_values and index_type != IndexTypeEnum.PERSISTENT:
+            raise ValueError('Only PERSISTENT indexes may have stored values')
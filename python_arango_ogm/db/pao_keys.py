@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from enum import StrEnum, auto
+from typing import Any, Dict, List
+
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+class KeyStrategyEnum(StrEnum):
+    """
+    Key Strategy Enum, used to specify how document keys of a model are generated.
+    TRADITIONAL, PADDED, AUTOINCREMENT and UUID keys are generated by the server (AUTOINCREMENT is
+    not supported by collections with multiple shards).  ULID and UUID7 keys are time-ordered and
+    generated client-side.  NATURAL keys must be supplied by the caller.
+    """
+    TRADITIONAL = auto()
+    PADDED = auto()
+    AUTOINCREMENT = auto()
+    UUID = auto()
+    ULID = auto()
+    UUID7 = auto()
+    NATURAL = auto()
+
+    def is_server_generated(self) -> bool:
+        return self in SERVER_KEY_STRATEGIES
+
+    def collection_options(self) -> Dict[str, Any]:
+        """ Return keyword arguments for python-arango's `create_collection`, setting the collection's keyOptions """
+        if self.is_server_generated() and self != KeyStrategyEnum.TRADITIONAL:
+            return {'key_generator': str(self)}
+        return {}
+
+
+SERVER_KEY_STRATEGIES = {
+    KeyStrategyEnum.TRADITIONAL, KeyStrategyEnum.PADDED, KeyStrategyEnum.AUTOINCREMENT, KeyStrategyEnum.UUID
+}
+
+
+class PAOKeyGenerator:
+    """
+    Generates time-ordered keys (ULID or UUIDv7) client-side.  Keys are monotonic within a process:
+    keys in the same millisecond continue from a random value, so keys generated in bulk
+    share a single clock read and random draw.
+    """
+    RANDOM_BITS = {KeyStrategyEnum.ULID: 80, KeyStrategyEnum.UUID7: 74}
+
+    def __init__(self, strategy: KeyStrategyEnum):
+        if strategy not in self.RANDOM_BITS:
+            raise ValueError(f"Keys for strategy {strategy} are not generated client-side")
+        self.strategy = strategy
+        self._random_bits = self.RANDOM_BITS[strategy]
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._counter = 0
+
+    def new_key(self) -> str:
+        return self.new_keys(1)[0]
+
+    def new_keys(self, count: int) -> List[str]:
+        with self._lock:
+            ms = max(time.time_ns() // 1_000_000, self._last_ms)
+            if ms > self._last_ms or self._counter + count >= 1 << self._random_bits:
+                # New millisecond (or exhausted counter); start from a random value, leaving half the range to count:
+                ms = max(ms, self._last_ms + (ms == self._last_ms))
+                self._last_ms = ms
+                self._counter = int.from_bytes(os.urandom(10)) >> (81 - self._random_bits)
+            start = self._counter
+            self._counter += count
+
+        format_key = self._ulid if self.strategy == KeyStrategyEnum.ULID else self._uuid7
+        return [format_key(ms, start + i) for i in range(count)]
+
+    @staticmethod
+    def _ulid(ms: int, random: int) -> str:
+        value = (ms << 80) | random
+        return "".join(CROCKFORD_BASE32[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+    @staticmethod
+    def _uuid7(ms: int, random: int) -> str:
+        value = (ms << 80) | (7 << 76) | ((random >> 62) << 64) | (2 << 62) | (random & ((1 << 62) - 1))
+        h = f"{value:032x}"
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
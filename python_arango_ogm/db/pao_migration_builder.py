@@ -4,7 +4,8 @@ from pathlib import Path
 from typing import Dict, Sequence, List
 
 from python_arango_ogm.db import pao_model
-from python_arango_ogm.db.pao_indexes import Index, IndexTypeEnum
+from python_arango_ogm.db.pao_indexes import IndexTypeEnum
+from python_arango_ogm.db.pao_keys import KeyStrategyEnum
 from python_arango_ogm.db.pao_migration_model import PAOMigrationModel
 from python_arango_ogm.db.pao_model_discovery import PAOModelDiscovery
 from python_arango_ogm.utils import str_util
@@ -22,6 +23,7 @@ INDENT = ' ' * 4
 
 class PAOMigrationBuilder:
     ADD_HASH_INDEX_STR = "{indent}{coll_var}.add_hash_index(name='{idx_name}', fields={fields}, unique={unique}, deduplicate=True)"
+    ADD_PERSISTENT_INDEX_STR = "{indent}{coll_var}.add_persistent_index(name='{idx_name}', fields={fields}, unique={unique}{options})"
     ADD_TTL_INDEX_STR = "{indent}{coll_var}.add_ttl_index({fields}, name='{idx_name}', expiry_time={expiry_time}"
 
     def __init__(self, target_path: str = '.', overwrite: bool = False):
@@ -85,7 +87,8 @@ class PAOMigrationBuilder:
             coll_var=coll_var,
             mod_schema=mod_schema,
             hash_indexes=hash_indexes,
-            other_indexes=other_indexes
+            other_indexes=other_indexes,
+            key_strategy=mod.KEY_STRATEGY
         )
 
         noop = False
@@ -170,19 +173,17 @@ class PAOMigrationBuilder:
 
     def build_migration(self, mod: type[pao_model.PAOModel], model_hash: Dict[str, type[pao_model.PAOModel]]) -> Dict[
         str, any]:
-        indexes = [e for e in dir(mod) if isinstance(getattr(mod, e), Index)]
-
         mod_schema, hash_indexes = self.build_schema(mod)
         graph_edges = self.build_model_edges(mod, model_hash)
         other_indexes = []
-        for oi in indexes:
-            index: Index = getattr(mod, oi)
+        for index in mod.get_indexes().values():
             other_indexes.append({
                 'fields': index.fields,
                 'index_type': index.index_type,
                 'name': index.name,
                 'expiry_seconds': index.expiry_seconds,
                 'unique': index.unique,
+                'stored_values': index.stored_values,
             })
 
         return {
@@ -197,10 +198,7 @@ class PAOMigrationBuilder:
         hash_indexes = []
         properties = {}
 
-        fields = [f for f in dir(mod) if isinstance(getattr(mod, f), pao_model.Field)]
-
-        for f in fields:
-            field: pao_model.Field = getattr(mod, f)
+        for f, field in mod.get_field_defs().items():
             properties[f] = field.build_schema_properties()
             if field.required:
                 required.append(f)
@@ -224,9 +222,7 @@ class PAOMigrationBuilder:
             Sequence[Dict]:
         """ Build model edges and return as a list of dictionaries """
         graph_edges = []
-        edges = [e for e in dir(mod) if isinstance(getattr(mod, e), pao_model.PAOEdgeDef)]
-        for e in edges:
-            edge: pao_model.PAOEdgeDef = getattr(mod, e)
+        for edge in mod.get_edge_defs().values():
             to_model: type[pao_model.PAOModel] = model_hash[edge.to_model] if isinstance(edge.to_model,
                                                                                          str) else edge.to_model
             from_name = mod.collection_name()
@@ -235,7 +231,8 @@ class PAOMigrationBuilder:
             graph_edges.append({
                 'edge_collection': edge_name,
                 'from_vertex_collections': [from_name],
-                'to_vertex_collections': [to_name]
+                'to_vertex_collections': [to_name],
+                'unique': edge.unique
             })
         return graph_edges
 
@@ -246,7 +243,8 @@ class PAOMigrationBuilder:
             mod_schema: dict,
             hash_indexes: Sequence,
             other_indexes: Sequence,
-            prepare_collection_txt: str = None
+            prepare_collection_txt: str = None,
+            key_strategy: KeyStrategyEnum = KeyStrategyEnum.TRADITIONAL
     ) -> tuple[str, str]:
         up_migration = []
         down_migration = []
@@ -255,7 +253,8 @@ class PAOMigrationBuilder:
         if prepare_collection_txt:
             up_migration.append(prepare_collection_txt)
         else:
-            up_migration.append(f"\n{INDENT}{coll_var}=db.create_collection('{coll_name}', {schema_var})")
+            key_options = "".join(f", {k}={v!r}" for k, v in key_strategy.collection_options().items())
+            up_migration.append(f"\n{INDENT}{coll_var}=db.create_collection('{coll_name}', {schema_var}{key_options})")
             up_migration.append(f"{INDENT}{coll_var}.configure(schema={schema_var})")
         down_migration.append(f"{coll_var}=db.collections('{coll_name}')")
 
@@ -306,17 +305,39 @@ class PAOMigrationBuilder:
                     fields=idx['fields'],
                     unique=idx['unique'],
                 ))
+            elif idx_type == IndexTypeEnum.PERSISTENT:
+                up_migration.append(self.ADD_PERSISTENT_INDEX_STR.format(
+                    indent=INDENT,
+                    coll_var=coll_var,
+                    idx_name=idx_name,
+                    fields=list(idx['fields']),
+                    unique=idx['unique'],
+                    options=f", storedValues={list(idx['stored_values'])}" if idx.get('stored_values') else "",
+                ))
             # Add down migration for index:
             down_migration.append(f"{INDENT}{coll_var}.delete_index('{idx_name}')")
 
     def _build_graph_migration_text(self, graph_edges, graph_name):
         delete_graph_str = f"db.delete_graph('{graph_name}', ignore_missing=True)"
-        graph_json = self._fix_python_json(json.dumps(graph_edges, indent=4)[2:-2])
+        edge_definitions = [{k: v for k, v in e.items() if k != 'unique'} for e in graph_edges]
+        graph_json = self._fix_python_json(json.dumps(edge_definitions, indent=4)[2:-2])
         graph_mig = []
         graph_mig.append(delete_graph_str)
         graph_mig.append(f"{INDENT}db.create_graph('{graph_name}', [")
         graph_mig.append(str_util.indent(graph_json, 2))
         graph_mig.append(f"{INDENT}])")
+        # Unique edges have a unique index on (_from, _to), so duplicate edges are rejected (or ignored) on insert:
+        for edge in graph_edges:
+            if edge.get('unique'):
+                edge_collection = edge['edge_collection']
+                graph_mig.append(self.ADD_PERSISTENT_INDEX_STR.format(
+                    indent=INDENT,
+                    coll_var=f"db.collection('{edge_collection}')",
+                    idx_name=f"{edge_collection}_from_to_idx",
+                    fields=['_from', '_to'],
+                    unique=True,
+                    options="",
+                ))
         mig_up = "\n".join(graph_mig)
         mig_down = delete_graph_str
         mig_text = MIGRATION_FILE_TEMPLATE.format(migration_up=mig_up, migration_down=mig_down)
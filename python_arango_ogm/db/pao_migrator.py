@@ -65,7 +65,7 @@ class PAOMigrator():
     def __create_migration_record(self, migration_filename):
         migration_number, migration_name = migration_filename.split('_', 1)
         PAOMigrationModel.insert({
-            "migration_number": f"`{int(migration_number)}`",
+            "migration_number": int(migration_number),
             "migration_name": migration_name,
             "migration_filename": migration_filename,
         })
@@ -4,13 +4,23 @@ import copy
 import sys
 from abc import ABC, abstractmethod
 from enum import StrEnum, auto
-from functools import partialmethod
-from typing import Any, Dict, Sequence, Type, Union
+from functools import partial, partialmethod
+from types import MappingProxyType
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, NamedTuple,
+    Sequence, Tuple, Type, Union
+)
 
 from python_arango_ogm.db.pao_edges import PAOEdgeDef
 from python_arango_ogm.db.pao_fields import Field, FloatField
-from python_arango_ogm.utils import str_util
-from python_arango_ogm.db.pao_db_base import PAODBBase
+from python_arango_ogm.db.pao_indexes import Index
+from python_arango_ogm.db.pao_keys import KeyStrategyEnum, PAOKeyGenerator
+from python_arango_ogm.db.pao_record import PAORecord, compile_record_class
+from python_arango_ogm.db.pao_result_set import PAOResultSet
+from python_arango_ogm.utils import iter_util, str_util, time_util
+from python_arango_ogm.db.pao_db_base import (
+    AggregateEnum, Page, PAODBBase, TraversalDirectionEnum, TraversalResultEnum
+)
 
 class LevelEnum(StrEnum):
     """
@@ -22,116 +32,887 @@ class LevelEnum(StrEnum):
     MODERATE = auto()
     STRICT = auto()
 
+# Client-side key generators, by key strategy; keys of a strategy are monotonic across models:
+KEY_GENERATORS: Dict[KeyStrategyEnum, PAOKeyGenerator] = {}
+
+# Fields maintained by `add_timestamps`:
+TIMESTAMP_FIELDS = ('created_at', 'updated_at')
+
+
+class Prefetch(NamedTuple):
+    """ Edge definition path (e.g., "bar_edge.qux_edge") to eagerly load, with up to limit vertices per record """
+    path: str
+    limit: int = None
+
+
 class PAOModel(ABC):
     LEVEL = LevelEnum.STRICT
     ADDITIONAL_PROPERTIES = False
     SCHEMA_NAME = None
+    CURSOR_OPTIONS:Dict[str, Any] = None
+    CACHE_TTL:float = None
+    KEY_STRATEGY:KeyStrategyEnum = KeyStrategyEnum.TRADITIONAL
+    _unloaded_fields:FrozenSet[str] = frozenset()
+    # Registry of the model's declarations; built by `_register` when the model class is created:
+    _field_defs:Mapping[str, Field] = MappingProxyType({})
+    _edge_defs:Mapping[str, PAOEdgeDef] = MappingProxyType({})
+    _all_fields:Mapping[str, Union[Field, PAOEdgeDef]] = MappingProxyType({})
+    _indexes:Mapping[str, Index] = MappingProxyType({})
+    _timestamp_fields:FrozenSet[str] = frozenset()
+    _collection_name:str = None
+    # Models by collection name, for marshalling documents addressed by _id; shared by all models:
+    _collection_models:Dict[str, Type[PAOModel]] = {}
     db:PAODBBase = None
+    async_db:PAODBBase = None
 
     def __init__(self):
         super().__init__()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._register()
+
+    @classmethod
+    def _register(cls):
+        """
+        Record the model's fields, edge definitions, indexes (by attribute name) and collection name, as immutable
+        mappings; so they're looked up, rather than scanned for, on each call.
+        """
+        attrs = {n: getattr(cls, n) for n in dir(cls) if not n.startswith('_')}
+        cls._field_defs = MappingProxyType({n: a for n, a in attrs.items() if isinstance(a, Field)})
+        cls._edge_defs = MappingProxyType({n: a for n, a in attrs.items() if isinstance(a, PAOEdgeDef)})
+        cls._all_fields = MappingProxyType({n: a for n, a in attrs.items() if isinstance(a, (Field, PAOEdgeDef))})
+        cls._indexes = MappingProxyType({n: a for n, a in attrs.items() if isinstance(a, Index)})
+        cls._timestamp_fields = frozenset(n for n in TIMESTAMP_FIELDS if n in cls._field_defs)
+        cls._collection_name = cls.SCHEMA_NAME or str_util.snake_text(cls.__name__.split('Model')[0])
+        cls._record_class = None
+        PAOModel._collection_models[cls._collection_name] = cls
+
     @classmethod
     def is_field(cls, attribute_name: str) -> bool:
-        attr = getattr(cls, attribute_name)
-        return ((not attribute_name.startswith('_')) and
-                (issubclass(type(attr), Field) or issubclass(type(attr), PAOEdgeDef)))
+        return attribute_name in cls._all_fields
 
     @classmethod
-    def all(cls, sort_fields:Dict[str, str], marshall=True) -> str:
-        records = cls.db.get_by_attributes(cls.collection_name(), sort_key_dict=sort_fields)
-        return cls.marshall_rows(records) if marshall else records
+    def all(
+            cls,
+            sort_fields:Dict[str, str],
+            marshall=True,
+            cursor_options:Dict[str, Any]=None,
+            prefetch_related:Sequence[Union[str, Prefetch]]=None,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ) -> Union[PAOResultSet, Iterable[Dict[str, Any]]]:
+        """
+        Return all records as a lazy result set (see `PAOResultSet`), sorted by sort_fields; eagerly loading
+        prefetch_related edges (see `prefetch`).  If given, only those fields (or all but exclude fields) are
+        loaded; see `is_loaded`.
+        """
+        records = cls.db.get_by_attributes(
+            cls.collection_name(),
+            sort_key_dict=sort_fields,
+            cursor_options=cls.cursor_options(cursor_options),
+            cache_ttl=cls.CACHE_TTL,
+            only=only,
+            exclude=exclude
+        )
+        if marshall:
+            return cls.result_set(records, None, cursor_options, prefetch_related, cls.unloaded_fields(only, exclude))
+        return cls.prefetch(records, prefetch_related) if prefetch_related else records
 
     @classmethod
-    def insert(cls, attributes:Dict[str, Any]):
-        # TODO: See if we have timestamp fields (created_at, updated_at) and add accordingly
-        doc = cls.add_timestamps(attributes, created=True, updated=True)
-        return cls.db.insert_doc(cls.collection_name(), doc)
+    def cursor_options(cls, cursor_options:Dict[str, Any]=None) -> Dict[str, Any]:
+        """
+        Return cursor options (batch_size, stream, ttl, count) for queries on this model;
+        the model's CURSOR_OPTIONS, overridden by given cursor_options.
+        """
+        return {**(cls.CURSOR_OPTIONS or {}), **(cursor_options or {})}
+
     @classmethod
-    def upsert(cls, attributes:Dict[str, Any], insert_attrs:Dict[str, Any], update_attrs:Dict[str, Any]):
-        insert_doc = cls.add_timestamps(insert_attrs, created=True, updated=True)
-        update_doc = cls.add_timestamps(update_attrs, updated=True)
-        return cls.db.upsert_doc(cls.collection_name(), attributes, insert_doc, update_doc)
+    def insert(cls, attributes:Dict[str, Any], return_new:bool=True, silent:bool=False):
+        """
+        Insert a single record through the document API; timestamps are set client-side.
+        Returns the new document if `return_new`; otherwise document metadata (or True if `silent`).
+        """
+        doc = cls.add_key(cls.add_timestamps(attributes, created=True, updated=True, server_time=False))
+        return cls.db.insert_doc(cls.collection_name(), doc, return_new=return_new, silent=silent)
 
     @classmethod
-    def find_by_key(cls, key, marshall:bool=True) -> Union[Dict[str, Any], Type[PAOModel]]:
-        """ Find a single record by given key and return """
-        record = cls.db.find_by_key(cls.collection_name(), key)
-        return cls.marshall_row(record) if marshall and record else record
+    def replace(cls, key, attributes:Dict[str, Any], rev:str=None, return_new:bool=True, silent:bool=False):
+        """
+        Replace the record with given key (and revision, if given) through the document API.
+        Returns the new document if `return_new`; otherwise document metadata (or True if `silent`).
+        """
+        doc = cls.add_timestamps(attributes, updated=True, server_time=False)
+        return cls.db.replace_doc(cls.collection_name(), key, doc, rev=rev, return_new=return_new, silent=silent)
+
+    @classmethod
+    def replace_many(cls, docs:Sequence[Dict[str, Any]], return_new:bool=False, silent:bool=False):
+        """ Replace records (each with a _key, and optionally _rev to check) with a single request """
+        new_docs = [cls.add_timestamps(d, updated=True, server_time=False) for d in docs]
+        return cls.db.replace_docs(cls.collection_name(), new_docs, return_new=return_new, silent=silent)
+
+    @classmethod
+    def update(cls, key, attributes:Dict[str, Any], rev:str=None, return_new:bool=True, silent:bool=False):
+        """
+        Update (patch) the record with given key (and revision, if given) through the document API.
+        Returns the new document if `return_new`; otherwise document metadata (or True if `silent`).
+        """
+        doc = cls.add_timestamps(attributes, updated=True, server_time=False)
+        return cls.db.update_doc(cls.collection_name(), key, doc, rev=rev, return_new=return_new, silent=silent)
+
+    @classmethod
+    def update_many(cls, docs:Sequence[Dict[str, Any]], return_new:bool=False, silent:bool=False):
+        """ Update (patch) records (each with a _key, and optionally _rev to check) with a single request """
+        new_docs = [cls.add_timestamps(d, updated=True, server_time=False) for d in docs]
+        return cls.db.update_docs(cls.collection_name(), new_docs, return_new=return_new, silent=silent)
+
+    @classmethod
+    def insert_many(
+            cls,
+            attributes_iter: Iterable[Dict[str, Any]],
+            batch_size: int = 1000,
+            on_duplicate: str = 'error'
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert documents from any iterable through the bulk import endpoint, in chunks of `batch_size`.
+        Timestamps are set client-side, as the import endpoint does not evaluate expressions.
+        Returns a report per chunk, with counts of created, errors, empty, updated and ignored documents.
+        """
+        docs = cls.add_keys(cls.add_timestamps(a, created=True, updated=True, server_time=False) for a in attributes_iter)
+        return cls.db.insert_docs(cls.collection_name(), docs, batch_size=batch_size, on_duplicate=on_duplicate)
+
+    @classmethod
+    def upsert(
+            cls,
+            attributes:Dict[str, Any],
+            insert_attrs:Dict[str, Any] = None,
+            update_attrs:Dict[str, Any] = None,
+            lookup_keys:Sequence[str] = None
+    ):
+        """ Upsert a single record, looking it up by lookup_keys (default is _key) """
+        insert_doc = cls.add_timestamps(insert_attrs or {}, created=True, updated=True)
+        if '_key' not in attributes:
+            insert_doc = cls.add_key(insert_doc)
+        update_doc = cls.add_timestamps(update_attrs or {}, updated=True)
+        return cls.db.upsert_doc(cls.collection_name(), attributes, lookup_keys, insert_doc, update_doc)
+
+    @classmethod
+    def upsert_many(
+            cls,
+            docs:Iterable[Dict[str, Any]],
+            lookup_keys:Sequence[str],
+            insert_attrs:Dict[str, Any] = None,
+            update_attrs:Dict[str, Any] = None,
+            batch_size:int = 1000,
+            new_doc_callback:Callable[[Any], Any] = None,
+            marshall:bool = True
+    ) -> Dict[str, int]:
+        """
+        Upsert records from any iterable, looking them up by lookup_keys, with one query per batch.
+        Records without a _key get one by the model's KEY_STRATEGY, used only if they're inserted.
+        Returns counts of inserted and updated records.  If new_doc_callback is given, it is called
+        with each new record (marshalled if `marshall`) as batches are processed.
+        """
+        insert_doc = cls.add_timestamps(insert_attrs or {}, created=True, updated=True)
+        update_doc = cls.add_timestamps(update_attrs or {}, updated=True)
+        callback = new_doc_callback
+        if new_doc_callback and marshall:
+            callback = lambda doc: new_doc_callback(cls.marshall_row(doc))
+
+        return cls.db.upsert_docs(
+            cls.collection_name(),
+            cls.add_keys(docs, chunk_size=batch_size),
+            lookup_keys,
+            insert_dict=insert_doc,
+            update_dict=update_doc,
+            batch_size=batch_size,
+            new_doc_callback=callback
+        )
+
+    @classmethod
+    def find_by_key(
+            cls,
+            key,
+            marshall:bool=True,
+            rev:str=None,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ) -> Union[Dict[str, Any], Type[PAOModel]]:
+        """ Find a single record by given key (and revision, if given) and return; loading only (or all but exclude) fields """
+        record = cls.db.find_by_key(
+            cls.collection_name(), key, rev=rev, cache_ttl=cls.CACHE_TTL, only=only, exclude=exclude
+        )
+        return cls.marshall_row(record, cls.unloaded_fields(only, exclude)) if marshall and record else record
+
+    @classmethod
+    def find_by_keys(
+            cls,
+            keys:Sequence[str],
+            marshall:bool=True,
+            chunk_size:int=500,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ) -> List[Union[Dict[str, Any], Type[PAOModel], None]]:
+        """
+        Find records by given keys (or _id strings, e.g., edge endpoints) with chunked multi-document requests;
+        loading only (or all but exclude) fields, if given.
+        Records are returned in the order of given keys, with None for keys that were not found.  Documents of
+        other collections (found by _id) are marshalled by the model of their collection, if there is one.
+        """
+        records = cls.db.find_by_keys(cls.collection_name(), keys, chunk_size=chunk_size, only=only, exclude=exclude)
+        return cls._marshall_documents(records, only, exclude) if marshall else records
 
     @classmethod
     def find_by_attributes(cls, attributes:Dict[str, Any], marshall:bool=True):
         """ Find a single record by given attributes and return """
-        records = cls.db.find_by_attributes(cls.collection_name(), {'_key': key})
-        return cls.marshall_rows(records) if marshall else records
+        record = cls.db.find_by_attributes(cls.collection_name(), attributes, cache_ttl=cls.CACHE_TTL)
+        return cls.marshall_row(record) if marshall and record else record
+
+    @classmethod
+    def get_by_attributes(
+            cls,
+            attributes:Dict[str, Any],
+            sort_keys: Dict[str, str] = None,
+            marshall:bool=True,
+            cursor_options:Dict[str, Any]=None,
+            prefetch_related:Sequence[Union[str, Prefetch]]=None,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ):
+        """
+        Find records by given attributes, sorting by sort_keys and return them as a lazy result set (see
+        `PAOResultSet`); eagerly loading prefetch_related edges (see `prefetch`), and loading only (or all but
+        exclude) fields
+        """
+        records = cls.db.get_by_attributes(
+            cls.collection_name(),
+            attributes,
+            sort_keys,
+            cursor_options=cls.cursor_options(cursor_options),
+            cache_ttl=cls.CACHE_TTL,
+            only=only,
+            exclude=exclude
+        )
+        if marshall:
+            return cls.result_set(
+                records, attributes, cursor_options, prefetch_related, cls.unloaded_fields(only, exclude)
+            )
+        return cls.prefetch(records, prefetch_related) if prefetch_related else records
+
+    @classmethod
+    def count(cls, attributes:Dict[str, Any]=None) -> int:
+        """ Count records matching given attributes (or all records) on the server """
+        return cls.db.count(cls.collection_name(), attributes, cache_ttl=cls.CACHE_TTL)
+
+    @classmethod
+    def aggregate(
+            cls,
+            attributes:Dict[str, Any]=None,
+            group_by:Sequence[str]=None,
+            metrics:Dict[str, Tuple[Union[AggregateEnum, str], str]]=None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate records matching given attributes on the server, returning a row (dictionary) per group_by
+        values, with the group's "count" and each of metrics, given as (AggregateEnum, field); e.g.,
+        `BarModel.aggregate(group_by=['field_str'], metrics={'max_int': (AggregateEnum.MAX, 'field_int')})`
+        """
+        return cls.db.aggregate(cls.collection_name(), attributes, group_by, metrics, cache_ttl=cls.CACHE_TTL)
+
+    @classmethod
+    def paginate(
+            cls,
+            attributes:Dict[str, Any] = None,
+            sort_keys:Dict[str, str] = None,
+            page_size:int = 100,
+            after:str = None,
+            marshall:bool = True
+    ) -> Page:
+        """
+        Return a page of records with given attributes, sorted by sort_keys (and then _key); continuing after
+        the page whose next_token is given as `after`.  Pages are seeked rather than offset, so each page costs
+        the same, given an index on the attributes and sort keys.
+        """
+        page = cls.db.get_page(cls.collection_name(), attributes, sort_keys, page_size, after)
+        return page._replace(items=cls.marshall_rows(page.items)) if marshall else page
+
+    @classmethod
+    def iter_pages(
+            cls,
+            attributes:Dict[str, Any] = None,
+            sort_keys:Dict[str, str] = None,
+            page_size:int = 100,
+            marshall:bool = True
+    ) -> Iterator[Page]:
+        """ Yield pages of records (see `paginate`) until the last """
+        after = None
+        while True:
+            page = cls.paginate(attributes, sort_keys, page_size, after, marshall)
+            yield page
+            if page.next_token is None:
+                break
+            after = page.next_token
+
+    @classmethod
+    def prefetch(cls, records:Iterable, prefetch_related:Sequence[Union[str, Prefetch]]) -> List:
+        """
+        Eagerly load vertices related to records through edge definitions named in prefetch_related, with one
+        query per edge definition; attaching a list of them to each record as an attribute (or key, for
+        unmarshalled documents) named after the edge definition.  Paths may be nested, e.g., "bar_edge.qux_edge",
+        and given as a Prefetch with a limit of vertices per record.
+        """
+        records = list(records)
+        tree = {}
+        for spec in prefetch_related:
+            spec = spec if isinstance(spec, Prefetch) else Prefetch(spec)
+            node = tree
+            parts = spec.path.split('.')
+            for i, part in enumerate(parts):
+                limit, children = node.get(part, (None, {}))
+                node[part] = (spec.limit if i == len(parts) - 1 else limit, children)
+                node = children
+        cls._attach_related(records, tree)
+        return records
+
+    @classmethod
+    def _attach_related(cls, records:List, tree:Dict[str, Tuple[int, Dict]]):
+        edge_defs = cls.get_edge_defs()
+        for edge_name, (limit, children) in tree.items():
+            edge_def = edge_defs.get(edge_name)
+            if edge_def is None:
+                raise ValueError(f"{cls.__name__} has no edge definition named {edge_name}")
+            to_model = edge_def.model_class_to()
+            parent_ids = [r['_id'] if isinstance(r, dict) else r._id for r in records]
+            related = cls.db.get_related_vertices_by_parent(
+                edge_def.edge_collection_name(), list(dict.fromkeys(parent_ids)), limit
+            ) if records else {}
+
+            related_records = []
+            for record, parent_id in zip(records, parent_ids):
+                docs = related.get(parent_id, [])
+                if isinstance(record, dict):
+                    record[edge_name] = docs
+                else:
+                    docs = to_model.marshall_rows(docs)
+                    setattr(record, edge_name, docs)
+                related_records.extend(docs)
+
+            if children:
+                to_model._attach_related(related_records, children)
+
+    @classmethod
+    def remove_by_key(cls, key, rev:str=None, silent:bool=False):
+        """ Remove the record with given key (and revision, if given) through the document API """
+        return cls.db.remove_by_key(cls.collection_name(), key, rev=rev, silent=silent)
+
+    @classmethod
+    def remove_many(cls, keys:Sequence[Union[str, Dict[str, Any]]], silent:bool=False):
+        """ Remove records by keys (or documents with _key, and optionally _rev to check) with a single request """
+        return cls.db.remove_docs(cls.collection_name(), keys, silent=silent)
+
+    @classmethod
+    async def all_async(
+            cls,
+            sort_fields:Dict[str, str] = None,
+            marshall:bool=True,
+            cursor_options:Dict[str, Any]=None,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ) -> AsyncIterator:
+        """ Async version of `all`; returns an async iterator of records: `async for r in await Foo.all_async()` """
+        cursor = await cls.async_db.get_by_attributes(
+            cls.collection_name(),
+            sort_key_dict=sort_fields,
+            cursor_options=cls.cursor_options(cursor_options),
+            cache_ttl=cls.CACHE_TTL,
+            only=only,
+            exclude=exclude
+        )
+        return cls.marshall_rows_async(cursor, cls.unloaded_fields(only, exclude)) if marshall else cursor
+
+    @classmethod
+    async def paginate_async(
+            cls,
+            attributes:Dict[str, Any] = None,
+            sort_keys:Dict[str, str] = None,
+            page_size:int = 100,
+            after:str = None,
+            marshall:bool = True
+    ) -> Page:
+        """ Async version of `paginate` """
+        page = await cls.async_db.get_page(cls.collection_name(), attributes, sort_keys, page_size, after)
+        return page._replace(items=cls.marshall_rows(page.items)) if marshall else page
+
+    @classmethod
+    async def iter_pages_async(
+            cls,
+            attributes:Dict[str, Any] = None,
+            sort_keys:Dict[str, str] = None,
+            page_size:int = 100,
+            marshall:bool = True
+    ) -> AsyncIterator[Page]:
+        """ Async version of `iter_pages`: `async for page in Foo.iter_pages_async()` """
+        after = None
+        while True:
+            page = await cls.paginate_async(attributes, sort_keys, page_size, after, marshall)
+            yield page
+            if page.next_token is None:
+                break
+            after = page.next_token
+
+    @classmethod
+    async def get_by_attributes_async(
+            cls,
+            attributes:Dict[str, Any],
+            sort_keys:Dict[str, str] = None,
+            marshall:bool=True,
+            cursor_options:Dict[str, Any]=None,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ) -> AsyncIterator:
+        """ Async version of `get_by_attributes`; returns an async iterator of records """
+        cursor = await cls.async_db.get_by_attributes(
+            cls.collection_name(),
+            attributes,
+            sort_keys,
+            cursor_options=cls.cursor_options(cursor_options),
+            cache_ttl=cls.CACHE_TTL,
+            only=only,
+            exclude=exclude
+        )
+        return cls.marshall_rows_async(cursor, cls.unloaded_fields(only, exclude)) if marshall else cursor
 
     @classmethod
-    def get_by_attributes(cls, attributes:Dict[str, Any], sort_keys: Dict[str, str], marshall:bool=True):
-        """ Find records by given attributes, sorting by sort_keys and return """
-        cls.db.get_by_attributes(cls.collection_name(), {'_key': key})
+    async def count_async(cls, attributes:Dict[str, Any]=None) -> int:
+        """ Async version of `count` """
+        return await cls.async_db.count(cls.collection_name(), attributes, cache_ttl=cls.CACHE_TTL)
 
     @classmethod
-    def remove_by_key(cls, key):
-        cls.db.remove_by_key(cls.collection_name(), key)
+    async def aggregate_async(
+            cls,
+            attributes:Dict[str, Any]=None,
+            group_by:Sequence[str]=None,
+            metrics:Dict[str, Tuple[Union[AggregateEnum, str], str]]=None
+    ) -> List[Dict[str, Any]]:
+        """ Async version of `aggregate` """
+        return await cls.async_db.aggregate(
+            cls.collection_name(), attributes, group_by, metrics, cache_ttl=cls.CACHE_TTL
+        )
 
     @classmethod
-    def get_fields(cls) -> Dict[str, Union[Field, PAOEdgeDef]]:
-        model_fields = {f:getattr(cls, f) for f in dir(cls) if cls.is_field(f)}
-        return model_fields
+    async def find_by_attributes_async(cls, attributes:Dict[str, Any], marshall:bool=True):
+        """ Async version of `find_by_attributes` """
+        record = await cls.async_db.find_by_attributes(cls.collection_name(), attributes, cache_ttl=cls.CACHE_TTL)
+        return cls.marshall_row(record) if marshall and record else record
+
+    @classmethod
+    async def find_by_key_async(
+            cls,
+            key,
+            marshall:bool=True,
+            rev:str=None,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ):
+        """ Async version of `find_by_key` """
+        record = await cls.async_db.find_by_key(
+            cls.collection_name(), key, rev=rev, cache_ttl=cls.CACHE_TTL, only=only, exclude=exclude
+        )
+        return cls.marshall_row(record, cls.unloaded_fields(only, exclude)) if marshall and record else record
+
+    @classmethod
+    async def find_by_keys_async(
+            cls,
+            keys:Sequence[str],
+            marshall:bool=True,
+            chunk_size:int=500,
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None,
+            concurrency:int=None
+    ):
+        """ Async version of `find_by_keys`; chunks are requested concurrently, at most `concurrency` at once """
+        records = await cls.async_db.find_by_keys(
+            cls.collection_name(), keys, chunk_size=chunk_size, only=only, exclude=exclude, concurrency=concurrency
+        )
+        return cls._marshall_documents(records, only, exclude) if marshall else records
+
+    @classmethod
+    async def insert_async(cls, attributes:Dict[str, Any], return_new:bool=True, silent:bool=False):
+        """ Async version of `insert` """
+        doc = cls.add_key(cls.add_timestamps(attributes, created=True, updated=True, server_time=False))
+        return await cls.async_db.insert_doc(cls.collection_name(), doc, return_new=return_new, silent=silent)
+
+    @classmethod
+    async def insert_many_async(
+            cls,
+            attributes_iter:Iterable[Dict[str, Any]],
+            batch_size:int = 1000,
+            on_duplicate:str = 'error'
+    ) -> List[Dict[str, Any]]:
+        """ Async version of `insert_many` """
+        docs = cls.add_keys(cls.add_timestamps(a, created=True, updated=True, server_time=False) for a in attributes_iter)
+        return await cls.async_db.insert_docs(
+            cls.collection_name(), docs, batch_size=batch_size, on_duplicate=on_duplicate
+        )
+
+    @classmethod
+    async def replace_async(cls, key, attributes:Dict[str, Any], rev:str=None, return_new:bool=True, silent:bool=False):
+        """ Async version of `replace` """
+        doc = cls.add_timestamps(attributes, updated=True, server_time=False)
+        return await cls.async_db.replace_doc(
+            cls.collection_name(), key, doc, rev=rev, return_new=return_new, silent=silent
+        )
+
+    @classmethod
+    async def update_async(cls, key, attributes:Dict[str, Any], rev:str=None, return_new:bool=True, silent:bool=False):
+        """ Async version of `update` """
+        doc = cls.add_timestamps(attributes, updated=True, server_time=False)
+        return await cls.async_db.update_doc(
+            cls.collection_name(), key, doc, rev=rev, return_new=return_new, silent=silent
+        )
+
+    @classmethod
+    async def upsert_async(
+            cls,
+            attributes:Dict[str, Any],
+            insert_attrs:Dict[str, Any] = None,
+            update_attrs:Dict[str, Any] = None,
+            lookup_keys:Sequence[str] = None
+    ):
+        """ Async version of `upsert` """
+        insert_doc = cls.add_timestamps(insert_attrs or {}, created=True, updated=True)
+        if '_key' not in attributes:
+            insert_doc = cls.add_key(insert_doc)
+        update_doc = cls.add_timestamps(update_attrs or {}, updated=True)
+        return await cls.async_db.upsert_doc(cls.collection_name(), attributes, lookup_keys, insert_doc, update_doc)
+
+    @classmethod
+    async def remove_by_key_async(cls, key, rev:str=None, silent:bool=False):
+        """ Async version of `remove_by_key` """
+        return await cls.async_db.remove_by_key(cls.collection_name(), key, rev=rev, silent=silent)
+
+    @classmethod
+    def traverse(
+            cls,
+            start:Union[str, PAOModel],
+            depth:Tuple[int, int]=(1, 1),
+            direction:TraversalDirectionEnum=TraversalDirectionEnum.OUTBOUND,
+            prune:Dict[str, Any]=None,
+            edge_filter:Dict[str, Any]=None,
+            vertex_filter:Dict[str, Any]=None,
+            result:TraversalResultEnum=TraversalResultEnum.VERTICES,
+            edge_defs:Sequence[PAOEdgeDef]=None,
+            marshall:bool=True,
+            cursor_options:Dict[str, Any]=None
+    ) -> Iterator:
+        """
+        Walk the graph on the server from start (a key of this model, a document _id or a record), between
+        depth[0] and depth[1] hops; streaming back vertices (marshalled, if marshall), edges or paths.
+        Follows given edge_defs, or all edges of the PAO_GRAPH_NAME graph.  See `PAODBBase.traverse`.
+        """
+        rows = cls.db.traverse(
+            cls._start_id(start),
+            [e.edge_collection_name() for e in edge_defs] if edge_defs else None,
+            depth, direction, prune, edge_filter, vertex_filter, result,
+            cursor_options=cls.cursor_options(cursor_options)
+        )
+        if marshall and result.lower() == TraversalResultEnum.VERTICES:
+            return (cls.marshall_row(row) for row in rows)
+        return rows
+
+    @classmethod
+    async def traverse_async(
+            cls,
+            start:Union[str, PAOModel],
+            depth:Tuple[int, int]=(1, 1),
+            direction:TraversalDirectionEnum=TraversalDirectionEnum.OUTBOUND,
+            prune:Dict[str, Any]=None,
+            edge_filter:Dict[str, Any]=None,
+            vertex_filter:Dict[str, Any]=None,
+            result:TraversalResultEnum=TraversalResultEnum.VERTICES,
+            edge_defs:Sequence[PAOEdgeDef]=None,
+            marshall:bool=True,
+            cursor_options:Dict[str, Any]=None
+    ) -> AsyncIterator:
+        """ Async version of `traverse`; returns an async iterator """
+        cursor = await cls.async_db.traverse(
+            cls._start_id(start),
+            [e.edge_collection_name() for e in edge_defs] if edge_defs else None,
+            depth, direction, prune, edge_filter, vertex_filter, result,
+            cursor_options=cls.cursor_options(cursor_options)
+        )
+        if marshall and result.lower() == TraversalResultEnum.VERTICES:
+            return cls.marshall_rows_async(cursor)
+        return cursor
+
+    @classmethod
+    def _start_id(cls, start:Union[str, PAOModel]) -> str:
+        """ Document _id of a traversal start; given as a key of this model, an _id or a record """
+        if isinstance(start, PAOModel):
+            return start._id if getattr(start, '_id', None) else f"{cls.collection_name()}/{start._key}"
+        return start if '/' in str(start) else f"{cls.collection_name()}/{start}"
+
+    @classmethod
+    def get_fields(cls) -> Mapping[str, Union[Field, PAOEdgeDef]]:
+        """ Return the model's fields and edge definitions, by name """
+        return cls._all_fields
+
+    @classmethod
+    def get_field_defs(cls) -> Mapping[str, Field]:
+        """ Return the model's fields (without edge definitions), by name """
+        return cls._field_defs
+
+    @classmethod
+    def get_edge_defs(cls) -> Mapping[str, PAOEdgeDef]:
+        return cls._edge_defs
 
     @classmethod
-    def get_edge_defs(cls) -> Dict[str, PAOEdgeDef]:
-        return {e:getattr(cls, e) for e in dir(cls) if isinstance(getattr(cls, e), PAOEdgeDef)}
+    def get_indexes(cls) -> Mapping[str, Index]:
+        """ Return the model's Index declarations, by attribute name """
+        return cls._indexes
 
     def get_edges(self, edge_def:PAOEdgeDef) -> Sequence[PAOEdgeDef]:
         if not self._key:
             raise AttributeError("_key field is not present (this model instance hasn't been obtained from a marshalling method).")
 
-        return edge_def.associated_edges({"key": self._key})
+        return edge_def.associated_edges({"_key": self._key})
 
     def insert_edge(self, edge_def:PAOEdgeDef, to: Union[str, PAOModel]) -> Sequence[PAOEdgeDef]:
         if not self._key:
             raise AttributeError("_key field is not present (this model instance hasn't been obtained from a marshalling method).")
 
-        return edge_def.insert_edge({"from": self._key, "to": to})
+        return edge_def.insert_edge(self, to)
+
+    def save(self, check_rev:bool=False) -> bool:
+        """
+        Save the record's changes (see `PAORecord.changes`) as a patch addressed by its _key, with updated_at set
+        client-side; if check_rev, only if the stored document is still at the record's _rev.
+        Returns whether there were changes to save.
+        """
+        doc = self._save_doc(check_rev)
+        if doc is None:
+            return False
+        rev = doc.pop('_rev', None)
+        result = self.db.update_doc(self.collection_name(), self._key, doc, rev=rev, return_new=False)
+        self._saved(doc, result)
+        return True
+
+    async def save_async(self, check_rev:bool=False) -> bool:
+        """ Async version of `save` """
+        doc = self._save_doc(check_rev)
+        if doc is None:
+            return False
+        rev = doc.pop('_rev', None)
+        result = await self.async_db.update_doc(self.collection_name(), self._key, doc, rev=rev, return_new=False)
+        self._saved(doc, result)
+        return True
+
+    @classmethod
+    def save_all(cls, records:Iterable[PAOModel], check_rev:bool=False) -> Dict[str, List]:
+        """
+        Save changes of records (of any models) with one bulk update per collection; see `save`.
+        Returns update results (document metadata, or an error) by collection name.  Records whose update
+        failed keep their changes.
+        """
+        results = {}
+        for collection_name, (model, records, docs) in cls._save_batches(records, check_rev).items():
+            result = model.db.update_docs(collection_name, docs, check_rev=check_rev, return_new=False)
+            results[collection_name] = cls._saved_all(records, docs, result)
+        return results
+
+    @classmethod
+    async def save_all_async(cls, records:Iterable[PAOModel], check_rev:bool=False) -> Dict[str, List]:
+        """ Async version of `save_all` """
+        results = {}
+        for collection_name, (model, records, docs) in cls._save_batches(records, check_rev).items():
+            result = await model.async_db.update_docs(collection_name, docs, check_rev=check_rev, return_new=False)
+            results[collection_name] = cls._saved_all(records, docs, result)
+        return results
+
+    def _save_doc(self, check_rev:bool) -> Union[Dict[str, Any], None]:
+        """ Return patch of the record's changes (keyed, and with _rev if check_rev), or None if unchanged """
+        changes = self.changes()
+        if not changes:
+            return None
+        if not self._key:
+            raise AttributeError("_key field is not present (this model instance hasn't been obtained from a marshalling method).")
+        doc = self.add_timestamps(changes, updated=True, server_time=False)
+        return {**doc, '_key': self._key, '_rev': self._rev} if check_rev else {**doc, '_key': self._key}
+
+    def _saved(self, doc:Dict[str, Any], result:Dict[str, Any]):
+        """ Apply a saved patch (for timestamps) and the new revision to the record, and forget its changes """
+        for name in self._timestamp_fields.intersection(doc):
+            setattr(self, name, doc[name])
+        self._rev = result['_rev']
+        self.mark_clean()
+
+    @classmethod
+    def _save_batches(cls, records:Iterable[PAOModel], check_rev:bool) -> Dict[str, Tuple[type, List, List]]:
+        """ Group changed records, and their patches, by collection name """
+        batches = {}
+        for record in records:
+            doc = record._save_doc(check_rev)
+            if doc is not None:
+                model = record.model if isinstance(record, PAORecord) else type(record)
+                _, batch_records, docs = batches.setdefault(record.collection_name(), (model, [], []))
+                batch_records.append(record)
+                docs.append(doc)
+        return batches
+
+    @staticmethod
+    def _saved_all(records:List[PAOModel], docs:List[Dict[str, Any]], result:Sequence) -> List:
+        for record, doc, doc_result in zip(records, docs, result):
+            if isinstance(doc_result, dict) and not doc_result.get('error'):
+                record._saved(doc, doc_result)
+        return result
 
     @classmethod
     def collection_name(cls) -> str:
-        if cls.SCHEMA_NAME:
-            coll_name = cls.SCHEMA_NAME
-        else:
-            coll_name = str_util.snake_text(cls.__name__.split('Model')[0])
-        return coll_name
+        return cls._collection_name
 
     @classmethod
-    def add_timestamps(cls, field_dict:Dict[str, Any], created:bool=False, updated:bool=False) -> Dict[str, Any]:
-        fields = cls.get_fields()
+    def add_key(cls, field_dict:Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return field_dict with a key generated by the model's KEY_STRATEGY, unless it has one; server
+        strategies leave the key to the server.  NATURAL keys must be given.
+        """
+        if field_dict.get('_key') or cls.KEY_STRATEGY.is_server_generated():
+            return field_dict
+        if cls.KEY_STRATEGY == KeyStrategyEnum.NATURAL:
+            raise ValueError(f"{cls.__name__} uses natural keys; _key must be given")
+        return {**field_dict, '_key': cls.key_generator().new_key()}
+
+    @classmethod
+    def add_keys(cls, field_dicts:Iterable[Dict[str, Any]], chunk_size:int=1000) -> Iterator[Dict[str, Any]]:
+        """ Bulk version of `add_key`; generating keys for chunks of documents at once """
+        if cls.KEY_STRATEGY.is_server_generated():
+            yield from field_dicts
+            return
+        for chunk in iter_util.chunken(field_dicts, chunk_size):
+            missing = [d for d in chunk if not d.get('_key')]
+            if missing and cls.KEY_STRATEGY == KeyStrategyEnum.NATURAL:
+                raise ValueError(f"{cls.__name__} uses natural keys; _key must be given")
+            keys = iter(cls.key_generator().new_keys(len(missing)) if missing else [])
+            for d in chunk:
+                yield d if d.get('_key') else {**d, '_key': next(keys)}
+
+    @classmethod
+    def key_generator(cls) -> PAOKeyGenerator:
+        """ Return generator for client-side keys (shared by models with the same KEY_STRATEGY) """
+        if cls.KEY_STRATEGY not in KEY_GENERATORS:
+            KEY_GENERATORS[cls.KEY_STRATEGY] = PAOKeyGenerator(cls.KEY_STRATEGY)
+        return KEY_GENERATORS[cls.KEY_STRATEGY]
+
+    @classmethod
+    def add_timestamps(
+            cls,
+            field_dict:Dict[str, Any],
+            created:bool=False,
+            updated:bool=False,
+            server_time:bool=True
+    ) -> Dict[str, Any]:
+        """
+        Add created_at and/or updated_at timestamps, if the model has those fields.
+        If server_time, timestamps are set by the server (DATE_NOW()); otherwise by the client.
+        """
+        fields = cls._timestamp_fields
+        if not fields:
+            return field_dict
         doc = copy.copy(field_dict)
+        now = '`DATE_NOW()`' if server_time else time_util.epoch_millis()
         if created and 'created_at' in fields:
-            doc['created_at'] = '`DATE_NOW()`'
+            doc['created_at'] = now
         if updated and 'updated_at' in fields:
-            doc['updated_at'] = '`DATE_NOW()`'
+            doc['updated_at'] = now
         return doc
 
     @classmethod
-    def marshall_row(cls, field_dict:Dict[str, Any]) -> Type[PAOModel]:
-        model = PAOModel()
-        for k, v in field_dict.items():
-            setattr(model, k, v)
+    def unloaded_fields(cls, only:Sequence[str]=None, exclude:Sequence[str]=None) -> FrozenSet[str]:
+        """ Return names of this model's fields which aren't loaded by a projection to only (or all but exclude) fields """
+        if only:
+            return frozenset(n for n in cls._field_defs if n not in only)
+        return frozenset(exclude or ())
+
+    def is_loaded(self, field_name:str) -> bool:
+        """ Return whether field_name was loaded; False for fields left out of the projection this record was read with """
+        return field_name not in self._unloaded_fields
+
+    @classmethod
+    def record_class(cls) -> type:
+        """
+        Return the record class rows of this model are marshalled into; compiled from the model's fields and edge
+        definitions on first use.  See `compile_record_class`.
+        """
+        record_class = cls.__dict__.get('_record_class')
+        if record_class is None:
+            record_class = compile_record_class(cls, tuple(cls._field_defs), tuple(cls._edge_defs))
+            cls._record_class = record_class
+        return record_class
 
-        # edge_defs = cls.get_edge_defs()
-        # for edge_def in edge_defs.values():
-        #     to_model = edge_def.model_class_to()
-        #     def edge_accessor(self):
-        #         self.get_edges(self.key, edge)
-        #
-        #     # edge_accessor = partialmethod(get_edges, edge_def=edge_def)
-        #
-        #     setattr(model, f"{to_model.collection_name()}_edges", edge_accessor)
-        return model
+    @classmethod
+    def result_set(
+            cls,
+            rows:Iterable[Dict[str, Any]],
+            attributes:Dict[str, Any]=None,
+            cursor_options:Dict[str, Any]=None,
+            prefetch_related:Sequence[Union[str, Prefetch]]=None,
+            unloaded_fields:FrozenSet[str]=frozenset()
+    ) -> PAOResultSet:
+        """
+        Return a lazy result set of rows, marshalled as they're consumed; with prefetch_related edges loaded
+        per cursor batch.  Its length is a server count of records matching attributes.
+        """
+        batch_size = cls.cursor_options(cursor_options).get('batch_size')
+        return PAOResultSet(
+            rows,
+            partial(cls.record_class().from_row, unloaded_fields=unloaded_fields),
+            count=lambda: cls.count(attributes),
+            prepare_chunk=(lambda records: cls.prefetch(records, prefetch_related)) if prefetch_related else None,
+            chunk_size=batch_size or PAODBBase.DEFAULT_CURSOR_OPTIONS.batch_size
+        )
 
     @classmethod
-    def marshall_rows(cls, rows:Sequence[Dict[str, Any]]) -> Sequence[Type[PAOModel]]:
-        return [cls.marshall_row(row) for row in rows]
+    def marshall_row(cls, field_dict:Dict[str, Any], unloaded_fields:FrozenSet[str]=frozenset()) -> PAOModel:
+        return cls.record_class().from_row(field_dict, unloaded_fields)
 
+    @classmethod
+    def marshall_rows(
+            cls,
+            rows:Sequence[Dict[str, Any]],
+            unloaded_fields:FrozenSet[str]=frozenset()
+    ) -> Sequence[PAOModel]:
+        from_row = cls.record_class().from_row
+        return [from_row(row, unloaded_fields) for row in rows]
 
+    @classmethod
+    def _marshall_documents(
+            cls,
+            docs:Iterable[Dict[str, Any]],
+            only:Sequence[str]=None,
+            exclude:Sequence[str]=None
+    ) -> List[Union[Dict[str, Any], PAOModel, None]]:
+        """
+        Marshall documents, which may come from any collection, by the models of their collections (per _id);
+        documents of collections without a model are returned as is.
+        """
+        unloaded = {}
+        records = []
+        for doc in docs:
+            collection_name = doc['_id'].split('/', 1)[0] if doc and '_id' in doc else cls._collection_name
+            model = cls if collection_name == cls._collection_name else cls._collection_models.get(collection_name)
+            if not doc or model is None:
+                records.append(doc)
+                continue
+            if model not in unloaded:
+                unloaded[model] = model.unloaded_fields(only, exclude)
+            records.append(model.marshall_row(doc, unloaded[model]))
+        return records
+
+    @classmethod
+    async def marshall_rows_async(
+            cls,
+            rows:AsyncIterable[Dict[str, Any]],
+            unloaded_fields:FrozenSet[str]=frozenset()
+    ) -> AsyncIterator[PAOModel]:
+        from_row = cls.record_class().from_row
+        async for row in rows:
+            yield from_row(row, unloaded_fields)
@@ -7,6 +7,27 @@ class PAOQueries:
         RETURN NEW
     """
 
+    # Upsert a batch of documents, counting inserted and updated documents; a document's _key is only inserted:
+    AQL_UPSERT_DOCS = """
+        FOR d IN @batch
+          UPSERT {{ {key_attrs} }}
+          INSERT MERGE(d, {{ {insert_attrs} }})
+          UPDATE MERGE(UNSET(d, APPEND(@lookup_keys, '_key')), {{ {update_attrs} }})
+          IN @@collection OPTIONS {{ keepNull: false }}
+          COLLECT inserted = OLD == null WITH COUNT INTO count
+          RETURN {{ inserted, count }}
+    """
+
+    # Upsert a batch of documents, returning the new documents; a document's _key is only inserted:
+    AQL_UPSERT_DOCS_RETURN_NEW = """
+        FOR d IN @batch
+          UPSERT {{ {key_attrs} }}
+          INSERT MERGE(d, {{ {insert_attrs} }})
+          UPDATE MERGE(UNSET(d, APPEND(@lookup_keys, '_key')), {{ {update_attrs} }})
+          IN @@collection OPTIONS {{ keepNull: false }}
+          RETURN {{ inserted: OLD == null, doc: NEW }}
+    """
+
     # INSERT AQL with created_at set:
     # attrs and keyattrs in format "KEY1:VAL1, KEY2:VAL2..."
     AQL_INSERT_DOC="""
@@ -14,45 +35,87 @@ class PAOQueries:
         RETURN NEW
     """
 
-    AQL_INSERT_DOCS = """
-        FOR doc IN @docs
-            INSERT doc INTO @@collection 
-    """
-
-    AQL_REMOVE_BY_ATTRS="""
-        FOR doc in @@collection
-            {lookup_filter}
-            REMOVE doc IN @@collection
-    """
     AQL_QUERY_ALL="""
         FOR doc in @@collection
           SORT {sort_attrs}
           RETURN doc
     """
 
+    # Documents matching a lookup filter, sorted; returning a projection of each (or the whole document):
     AQL_QUERY_BY_ATTRS="""
         FOR doc in @@collection
           {lookup_filter}
           {sort_by}
-          RETURN doc
+          RETURN {projection}
+    """
+
+    # Count of documents matching a lookup filter (counted while filtering, without returning documents):
+    AQL_COUNT = """
+        FOR doc in @@collection
+          {lookup_filter}
+          COLLECT WITH COUNT INTO count
+          RETURN count
+    """
+
+    # Aggregates of documents matching a lookup filter; a row per group (see `PAOQueryCompiler._format_aggregate`):
+    AQL_AGGREGATE = """
+        FOR doc in @@collection
+          {lookup_filter}
+          {aggregate}
+    """
+
+    # Documents by their handles (_id strings), through the primary index; returning a projection of each:
+    AQL_QUERY_BY_HANDLES = """
+        FOR doc IN DOCUMENT(@handles)
+          RETURN {projection}
+    """
+
+    # A page of documents after a seek position, in sort order (which ends with _key); one extra
+    # document is fetched to tell whether there are further pages:
+    AQL_QUERY_PAGE = """
+        FOR doc in @@collection
+          {lookup_filter}
+          {seek_filter}
+          {sort_by}
+          LIMIT @limit
+          RETURN {projection}
     """
 
-    # Lookup associated edges:
+    # Lookup associated edges; traversing through the edge index:
     AQL_QUERY_RELATED_EDGES = """
         FOR doc IN @@collection
           {lookup_filter}
-          FOR edge IN @@edge_collection
-            FILTER edge._from == doc._id
+          FOR rel_doc, edge IN 1..1 OUTBOUND doc @@edge_collection
             RETURN edge
     """
 
-    # Lookup associated vertices through edges:
+    # Lookup associated vertices through edges; traversing through the edge index:
     AQL_QUERY_RELATED_VERTICES = """
         FOR doc IN @@collection
           {lookup_filter}
-          FOR edge IN @@edge_collection
-            FILTER edge._from == doc._id
-            FOR rel_doc IN @@association_collection
-              FILTER rel_doc._id == edge._to
-                RETURN rel_doc
+          FOR rel_doc IN 1..1 OUTBOUND doc @@edge_collection
+            RETURN {projection}
+    """
+
+    # Lookup associated vertices of many parent vertices (by _id) with a single query; grouped by parent.
+    # limit is formatted (as "LIMIT @limit", or nothing) before compiling:
+    AQL_QUERY_RELATED_VERTICES_BY_PARENT = """
+        FOR parent_id IN @parent_ids
+          LET related = (
+            FOR rel_doc IN 1..1 OUTBOUND parent_id @@edge_collection
+              {limit}
+              RETURN {{projection}}
+          )
+          RETURN {{{{ parent_id, related }}}}
+    """
+
+    # Multi-hop traversal from a start vertex, over a named graph or edge collections.
+    # direction, edge_collections and result are formatted before compiling; the rest are clauses:
+    AQL_TRAVERSE = """
+        FOR v, e, p IN @min_depth..@max_depth {direction} @start {edge_collections}
+          {{prune}}
+          OPTIONS {{{{ uniqueVertices: "path" }}}}
+          {{edge_filter}}
+          {{vertex_filter}}
+          RETURN {result}
     """
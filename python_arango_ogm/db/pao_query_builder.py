@@ -0,0 +1,379 @@
+import base64
+import binascii
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from python_arango_ogm.db.pao_db_base import (
+    SYSTEM_ATTRIBUTES, AggregateEnum, Page, TraversalDirectionEnum, TraversalResultEnum
+)
+from python_arango_ogm.db.pao_queries import PAOQueries
+from python_arango_ogm.db.pao_query_compiler import Clause, ClauseTypeEnum, CompiledQuery, PAOQueryCompiler
+from python_arango_ogm.db.pao_query_shapes import PAOQueryShapeLog
+
+
+class PAOQueryBuilder:
+    """
+    Query-building helpers shared by the sync and async databases: compiling AQL for the `PAODBBase`
+    operations, paging, upsert preparation, and edge and handle bookkeeping.  Mixed in ahead of
+    `PAODBBase`, whose `query_compiler` and `query_shape_log` it uses.
+    """
+    query_compiler: PAOQueryCompiler
+    query_shape_log: Optional[PAOQueryShapeLog]
+
+    def _compile_related_edges(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict
+    ) -> CompiledQuery:
+        edge_collection_name = self.edge_collection_name(collection_name, association_collection_name)
+        return self.query_compiler.compile(
+            PAOQueries.AQL_QUERY_RELATED_EDGES,
+            bind_vars={'@collection': collection_name, '@edge_collection': edge_collection_name},
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup_key_dict)
+        )
+
+    def _compile_related_vertices(
+            self,
+            collection_name: str,
+            association_collection_name: str,
+            lookup_key_dict: Dict,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> CompiledQuery:
+        return self.query_compiler.compile(
+            PAOQueries.AQL_QUERY_RELATED_VERTICES,
+            bind_vars={
+                '@collection': collection_name,
+                '@edge_collection': self.edge_collection_name(collection_name, association_collection_name)
+            },
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup_key_dict),
+            projection=self._projection(only, exclude, 'rel_doc')
+        )
+
+    def _compile_page(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            sort_key_dict: Dict[str, str] = None,
+            page_size: int = 100,
+            after: str = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> CompiledQuery:
+        sort = self._page_sort(sort_key_dict)
+        seek = {}
+        if after:
+            values = self._decode_page_token(after)
+            if len(values) != len(sort):
+                raise ValueError("Page token does not match sort keys")
+            seek = {k: (direction, v) for (k, direction), v in zip(sort.items(), values)}
+        return self.query_compiler.compile(
+            PAOQueries.AQL_QUERY_PAGE,
+            bind_vars={'@collection': collection_name, 'limit': page_size + 1},
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup_key_dict),
+            seek_filter=Clause(ClauseTypeEnum.SEEK, seek),
+            sort_by=Clause(ClauseTypeEnum.SORT, sort),
+            projection=self._projection(only, exclude)
+        )
+
+    def _page(self, docs: Iterable[Dict[str, Any]], sort_key_dict: Dict[str, str], page_size: int) -> Page:
+        """ Return page of docs (fetched with one extra document); with a token for the next page, if any """
+        docs = list(docs)
+        if len(docs) <= page_size:
+            return Page(docs, None)
+        docs = docs[:page_size]
+        values = [self._attribute_value(docs[-1], k) for k in self._page_sort(sort_key_dict)]
+        return Page(docs, base64.urlsafe_b64encode(json.dumps(values).encode()).decode())
+
+    @staticmethod
+    def _page_sort(sort_key_dict: Dict[str, str] = None) -> Dict[str, str]:
+        """ Return sort keys and directions for pages; ending with _key (in the direction of the last key) """
+        sort_key_dict = sort_key_dict or {}
+        sort = {k: (d or 'ASC').upper() for k, d in sort_key_dict.items() if k != '_key'}
+        sort['_key'] = (sort_key_dict.get('_key') or (list(sort.values())[-1] if sort else 'ASC')).upper()
+        return sort
+
+    @staticmethod
+    def _decode_page_token(token: str) -> List[Any]:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError(f"Invalid page token: {token}")
+        if not isinstance(values, list):
+            raise ValueError(f"Invalid page token: {token}")
+        return values
+
+    @staticmethod
+    def _attribute_value(doc: Dict[str, Any], attribute_name: str) -> Any:
+        """ Value of (possibly nested, dot-separated) attribute of doc; None if missing, as in AQL """
+        value = doc
+        for part in attribute_name.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    def _compile_related_vertices_by_parent(
+            self,
+            edge_collection_name: str,
+            parent_ids: Sequence[str],
+            limit: int = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> CompiledQuery:
+        bind_vars = {'@edge_collection': edge_collection_name, 'parent_ids': list(parent_ids)}
+        if limit is not None:
+            bind_vars['limit'] = limit
+        template = PAOQueries.AQL_QUERY_RELATED_VERTICES_BY_PARENT.format(
+            limit="" if limit is None else "LIMIT @limit"
+        )
+        return self.query_compiler.compile(
+            template, bind_vars=bind_vars, projection=self._projection(only, exclude, 'rel_doc')
+        )
+
+    def _compile_traversal(
+            self,
+            start_id: str,
+            edge_collection_names: Sequence[str] = None,
+            depth: Tuple[int, int] = (1, 1),
+            direction: TraversalDirectionEnum = TraversalDirectionEnum.OUTBOUND,
+            prune: Dict[str, Any] = None,
+            edge_filter: Dict[str, Any] = None,
+            vertex_filter: Dict[str, Any] = None,
+            result: TraversalResultEnum = TraversalResultEnum.VERTICES
+    ) -> CompiledQuery:
+        """
+        Compile traversal from start_id over given edge collections; or over the PAO_GRAPH_NAME graph if none given.
+        prune stops walking past vertices matching its attributes, edge_filter must match every edge on the
+        path and vertex_filter must match the vertex reached.
+        """
+        bind_vars = {'start': start_id, 'min_depth': depth[0], 'max_depth': depth[1]}
+        if edge_collection_names:
+            edge_vars = [f"edge_collection_{i}" for i in range(len(edge_collection_names))]
+            bind_vars.update({f"@{v}": c for v, c in zip(edge_vars, edge_collection_names)})
+            edge_collections = ", ".join(f"@@{v}" for v in edge_vars)
+        else:
+            bind_vars['graph'] = os.getenv('PAO_GRAPH_NAME')
+            if not bind_vars['graph']:
+                raise ValueError("PAO_GRAPH_NAME must be defined in the environment to traverse without edge collections")
+            edge_collections = "GRAPH @graph"
+
+        template = PAOQueries.AQL_TRAVERSE.format(
+            direction=TraversalDirectionEnum(direction.lower()).upper(),
+            edge_collections=edge_collections,
+            result={'vertices': 'v', 'edges': 'e', 'paths': 'p'}[TraversalResultEnum(result.lower())]
+        )
+        return self.query_compiler.compile(
+            template,
+            bind_vars=bind_vars,
+            prune=Clause(ClauseTypeEnum.PRUNE, prune, 'v'),
+            edge_filter=Clause(ClauseTypeEnum.ALL_FILTER, edge_filter, 'p.edges'),
+            vertex_filter=Clause(ClauseTypeEnum.FILTER, vertex_filter, 'v')
+        )
+
+    def _compile_by_attributes(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            sort_key_dict: Dict[str, str] = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None,
+            record_shape: bool = True
+    ) -> CompiledQuery:
+        """ Compile query by attributes; recording its shape in the query shape log, unless record_shape is False """
+        if record_shape and self.query_shape_log is not None:
+            self.query_shape_log.record(collection_name, lookup_key_dict, sort_key_dict)
+        return self.query_compiler.compile(
+            PAOQueries.AQL_QUERY_BY_ATTRS,
+            bind_vars={'@collection': collection_name},
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup_key_dict),
+            sort_by=Clause(ClauseTypeEnum.SORT, sort_key_dict),
+            projection=self._projection(only, exclude)
+        )
+
+    def _compile_count(self, collection_name: str, lookup_key_dict: Dict[str, Any]) -> CompiledQuery:
+        if self.query_shape_log is not None:
+            self.query_shape_log.record(collection_name, lookup_key_dict)
+        return self.query_compiler.compile(
+            PAOQueries.AQL_COUNT,
+            bind_vars={'@collection': collection_name},
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup_key_dict)
+        )
+
+    def _compile_aggregate(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            group_by: Sequence[str] = None,
+            metrics: Dict[str, Tuple[str, str]] = None
+    ) -> CompiledQuery:
+        group_by = group_by or []
+        metrics = metrics or {}
+        if 'count' in metrics or 'count' in group_by:
+            raise ValueError("'count' is the count of each group, and can't be used as a group or metric name")
+        if set(group_by) & set(metrics):
+            raise ValueError(f"Metric names clash with group_by attributes: {set(group_by) & set(metrics)}")
+        if self.query_shape_log is not None:
+            self.query_shape_log.record(collection_name, lookup_key_dict)
+        aggregate = {k: (None, k) for k in group_by}
+        aggregate.update({
+            name: (AggregateEnum(function.lower()).aql_function(), attribute_name)
+            for name, (function, attribute_name) in metrics.items()
+        })
+        return self.query_compiler.compile(
+            PAOQueries.AQL_AGGREGATE,
+            bind_vars={'@collection': collection_name},
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup_key_dict),
+            aggregate=Clause(ClauseTypeEnum.AGGREGATE, aggregate)
+        )
+
+    def _compile_by_key(
+            self,
+            collection_name: str,
+            key: Any,
+            rev: str = None,
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> CompiledQuery:
+        """ Compile a projected lookup of a document by key (and revision, if given), through the primary index """
+        lookup_key_dict = {'_key': key} if rev is None else {'_key': key, '_rev': rev}
+        return self.query_compiler.compile(
+            PAOQueries.AQL_QUERY_BY_ATTRS,
+            bind_vars={'@collection': collection_name},
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup_key_dict),
+            sort_by=Clause(ClauseTypeEnum.SORT, None),
+            projection=self._projection(only, exclude)
+        )
+
+    def _compile_by_handles(
+            self,
+            handles: Sequence[str],
+            only: Sequence[str] = None,
+            exclude: Sequence[str] = None
+    ) -> CompiledQuery:
+        return self.query_compiler.compile(
+            PAOQueries.AQL_QUERY_BY_HANDLES,
+            bind_vars={'handles': list(handles)},
+            projection=self._projection(only, exclude)
+        )
+
+    @staticmethod
+    def _projection(only: Sequence[str] = None, exclude: Sequence[str] = None, var_name: str = 'doc') -> Clause:
+        """
+        Return projection clause keeping only the (top-level) attributes in `only`, along with the system
+        attributes (_id, _key and _rev); or keeping all attributes but those in `exclude`.
+        """
+        if only and exclude:
+            raise ValueError("Specify attributes to keep (only) or to remove (exclude), not both")
+        if only:
+            return Clause(ClauseTypeEnum.PROJECTION, dict.fromkeys([*SYSTEM_ATTRIBUTES, *only], True), var_name)
+        return Clause(ClauseTypeEnum.PROJECTION, dict.fromkeys(exclude or [], False), var_name)
+
+    def _compile_insert_doc(self, collection_name: str, doc: Dict[str, Any]) -> CompiledQuery:
+        return self.query_compiler.compile(
+            PAOQueries.AQL_INSERT_DOC,
+            bind_vars={'@collection': collection_name},
+            insert_attrs=Clause(ClauseTypeEnum.ATTRS, doc)
+        )
+
+    def _compile_upsert_doc(
+            self,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any],
+            insert_doc: Dict[str, Any],
+            update_doc: Dict[str, Any]
+    ) -> CompiledQuery:
+        return self.query_compiler.compile(
+            PAOQueries.AQL_UPSERT_DOC,
+            bind_vars={'@collection': collection_name},
+            key_attrs=Clause(ClauseTypeEnum.ATTRS, lookup_key_dict),
+            insert_attrs=Clause(ClauseTypeEnum.ATTRS, insert_doc),
+            update_attrs=Clause(ClauseTypeEnum.ATTRS, update_doc)
+        )
+
+    def _compile_upsert_docs(
+            self,
+            collection_name: str,
+            batch: Sequence[Dict[str, Any]],
+            lookup_keys: Sequence[str],
+            insert_dict: Dict[str, Any] = None,
+            update_dict: Dict[str, Any] = None,
+            return_new: bool = False
+    ) -> CompiledQuery:
+        return self.query_compiler.compile(
+            PAOQueries.AQL_UPSERT_DOCS_RETURN_NEW if return_new else PAOQueries.AQL_UPSERT_DOCS,
+            bind_vars={'@collection': collection_name, 'batch': batch, 'lookup_keys': list(lookup_keys)},
+            key_attrs=Clause(ClauseTypeEnum.KEYS, dict.fromkeys(lookup_keys), 'd'),
+            insert_attrs=Clause(ClauseTypeEnum.ATTRS, insert_dict),
+            update_attrs=Clause(ClauseTypeEnum.ATTRS, update_dict)
+        )
+
+    def _prepare_upsert(
+            self,
+            collection_name: str,
+            doc: Dict,
+            lookup_keys: Sequence[str] = None,
+            insert_dict: Dict[str, Any] = None,
+            update_dict: Dict[str, Any] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], bool]:
+        """
+        Split doc into lookup, insert and update documents for an upsert.  Also returns whether the
+        upsert is addressed by key only and has no literals; so it can be done through the document API.
+        """
+        if lookup_keys is None:
+            lookup_keys = ['_key']
+        insert_dict = insert_dict or {}
+        lookup_key_dict = {k: v for (k, v) in doc.items() if k in lookup_keys}
+
+        # Keys not given are generated by the server, or by models (see KeyStrategyEnum):
+        insert_doc = dict(doc)
+        insert_doc.update(insert_dict)
+        update_doc = {k: v for (k, v) in doc.items() if k not in lookup_keys}
+        update_doc.update(update_dict or {})
+
+        key_addressed = list(lookup_keys) == ['_key'] and '_key' in doc and not insert_dict and not any(
+            PAOQueryCompiler.is_literal(v) for v in update_doc.values()
+        )
+        return lookup_key_dict, insert_doc, update_doc, key_addressed
+
+    @classmethod
+    def _edge_docs(
+            cls,
+            collection_name: str,
+            association_collection_name: str,
+            pairs: Iterable[Tuple[str, str]],
+            attrs: Dict[str, Any] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """ Generate edge documents between (from_key, to_key) pairs, each with given attrs """
+        attrs = attrs or {}
+        for from_key, to_key in pairs:
+            yield {
+                **attrs,
+                '_from': cls._handle(collection_name, from_key),
+                '_to': cls._handle(association_collection_name, to_key)
+            }
+
+    @staticmethod
+    def _handle(collection_name: str, key: str) -> str:
+        """ Document handle (_id) of key in collection; keys that are already handles are returned as is """
+        return key if '/' in key else f"{collection_name}/{key}"
+
+    @staticmethod
+    def _group_handles(collection_name: str, keys: Sequence[str]) -> Tuple[List[str], Dict[str, List[str]]]:
+        """
+        Return document handles (_id) for given keys (or handles), along with unique keys grouped by collection
+        """
+        handles = [key if '/' in str(key) else f"{collection_name}/{key}" for key in keys]
+        collection_keys: Dict[str, List[str]] = {}
+        for handle in dict.fromkeys(handles):
+            coll_name, key = handle.split('/', 1)
+            collection_keys.setdefault(coll_name, []).append(key)
+        return handles, collection_keys
+
+    @staticmethod
+    def _key_addressed_doc(key: str, doc: Dict[str, Any], rev: str = None) -> Dict[str, Any]:
+        """ Return copy of doc addressed by given key (and rev, if given) """
+        new_doc = dict(doc, _key=key)
+        if rev is not None:
+            new_doc["_rev"] = rev
+        return new_doc
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Set, Tuple
+
+from python_arango_ogm.db.pao_query_compiler import CompiledQuery
+
+# Returned by `PAOQueryCache.get` for keys that are not cached (None may be a cached result):
+CACHE_MISS = object()
+
+
+class CacheEntry(NamedTuple):
+    """ A cached, serialized query result """
+    collection_name: str
+    value: str
+    expires_at: float
+
+
+class PAOQueryCache(ABC):
+    """
+    Base class for query result caches; databases consult their cache for reads on models with a CACHE_TTL,
+    and invalidate a collection's entries when it is written through the database.
+    Caches which store results by reference leave `RETURNS_COPIES` False; databases then hand callers
+    copies of cached documents, so callers' changes don't leak into later hits.
+    """
+    RETURNS_COPIES = False
+
+    @abstractmethod
+    def get(self, collection_name: str, key: Hashable) -> Any:
+        """ Return cached result for key, or CACHE_MISS """
+        pass
+
+    @abstractmethod
+    def set(self, collection_name: str, key: Hashable, value: Any, ttl: float):
+        """ Cache result for key, expiring after ttl seconds """
+        pass
+
+    @abstractmethod
+    def invalidate(self, collection_name: str):
+        """ Remove all entries for given collection """
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """ Remove all entries """
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """ Return counters; e.g., hits, misses and evictions """
+        pass
+
+    @staticmethod
+    def query_key(query: CompiledQuery) -> Tuple[str, str]:
+        """ Return cache key for compiled query; its text and bind vars """
+        return query.aql, json.dumps(query.bind_vars, sort_keys=True, default=str)
+
+
+class PAOLRUQueryCache(PAOQueryCache):
+    """
+    In-process, thread-safe query result cache, bounded by entry count and (serialized) bytes; evicting
+    least recently used entries.  Results are stored serialized, so callers get their own copy.
+
+    :param max_entries: Maximum number of cached results
+    :param max_bytes: Maximum total size of cached results; results larger than this are not cached.
+    """
+
+    RETURNS_COPIES = True
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._collection_keys: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, collection_name: str, key: Hashable) -> Any:
+        cache_key = (collection_name, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return CACHE_MISS
+            if entry.expires_at <= time.monotonic():
+                self._remove(cache_key)
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return CACHE_MISS
+            self._entries.move_to_end(cache_key)
+            self._counters['hits'] += 1
+            value = entry.value
+        return json.loads(value)
+
+    def set(self, collection_name: str, key: Hashable, value: Any, ttl: float):
+        serialized = json.dumps(value, default=str)
+        if len(serialized) > self.max_bytes:
+            return
+
+        cache_key = (collection_name, key)
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = CacheEntry(collection_name, serialized, time.monotonic() + ttl)
+            self._collection_keys.setdefault(collection_name, set()).add(cache_key)
+            self._bytes += len(serialized)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def invalidate(self, collection_name: str):
+        with self._lock:
+            cache_keys = self._collection_keys.pop(collection_name, set())
+            for cache_key in cache_keys:
+                self._remove(cache_key)
+            self._counters['invalidations'] += len(cache_keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._collection_keys.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), bytes=self._bytes)
+
+    def _remove(self, cache_key: Hashable):
+        entry = self._entries.pop(cache_key)
+        self._bytes -= len(entry.value)
+        collection_keys = self._collection_keys.get(entry.collection_name)
+        if collection_keys:
+            collection_keys.discard(cache_key)
@@ -0,0 +1,274 @@
+import json
+import re
+from enum import StrEnum, auto
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Tuple
+
+RE_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+RE_MODIFICATION = re.compile(r"\b(INSERT|UPDATE|REPLACE|REMOVE|UPSERT)\b")
+
+
+class ClauseTypeEnum(StrEnum):
+    """
+    Clause Type Enum, used to specify how a clause placeholder in an AQL template is compiled:
+    """
+
+    FILTER = auto()
+    ALL_FILTER = auto()
+    PRUNE = auto()
+    ATTRS = auto()
+    KEYS = auto()
+    SORT = auto()
+    SEEK = auto()
+    PROJECTION = auto()
+    AGGREGATE = auto()
+
+
+class Clause(NamedTuple):
+    """ A clause to compile into an AQL template placeholder """
+    clause_type: ClauseTypeEnum
+    values: Dict[str, Any]
+    var_name: str = 'doc'
+
+
+class CompiledQuery(NamedTuple):
+    """ A compiled AQL template and the bind variables used to execute it """
+    aql: str
+    bind_vars: Dict[str, Any]
+
+    @property
+    def read_only(self) -> bool:
+        """ Whether the query only reads; i.e., it has no data-modification operation """
+        return RE_MODIFICATION.search(self.aql) is None
+
+
+class PAOQueryCompiler:
+    """
+    Compiles AQL templates (see `PAOQueries`) into stable query text, passing all values through bind variables.
+
+    The query text only depends on the template, the attribute names and the sort spec; so the same lookup
+    always produces the same AQL, regardless of the values being looked up.  Compiled templates are
+    memoized in a bounded LRU cache.  Values specified as literals (surrounded by backticks, e.g.,
+    '`DATE_NOW()`') are AQL expressions and become part of the template.
+    """
+    VALID_SORT_VALUES = ["ASC", "DESC", ""]
+
+    def __init__(self, cache_size: int = 256):
+        self._compile_template = lru_cache(maxsize=cache_size)(self._build_template)
+
+    def compile(self, template: str, bind_vars: Dict[str, Any] = None, **clauses: Clause) -> CompiledQuery:
+        """
+        Compile given template, formatting each placeholder from the given clauses.
+
+        :param template: AQL template with a placeholder for each clause, e.g., `PAOQueries.AQL_QUERY_BY_ATTRS`
+        :param bind_vars: Additional bind variables, e.g., {'@collection': 'foo'}
+        :param clauses: Clause for each placeholder, keyed by placeholder name.
+        """
+        query_vars = dict(bind_vars) if bind_vars else {}
+        shapes = []
+        for name in sorted(clauses):
+            clause = clauses[name]
+            shape, clause_vars = self._split_clause(name, clause)
+            shapes.append((name, clause.clause_type, clause.var_name, shape))
+            query_vars.update(clause_vars)
+
+        aql = self._compile_template(template, tuple(shapes))
+        return CompiledQuery(aql, query_vars)
+
+    def cache_info(self):
+        """ Return hits, misses, maxsize and currsize of the template cache """
+        return self._compile_template.cache_info()
+
+    def clear_cache(self):
+        """ Clear the template cache """
+        self._compile_template.cache_clear()
+
+    @staticmethod
+    def is_literal(value: Any) -> bool:
+        """ Return whether value is a literal AQL expression (surrounded by backticks) """
+        return isinstance(value, str) and len(value) > 1 and value.startswith('`') and value.endswith('`')
+
+    @staticmethod
+    def literal_expression(value: str) -> str:
+        """ Return AQL expression from a literal value """
+        return value.replace('`', '')
+
+    @classmethod
+    def attribute_path(cls, var_name: str, attribute_name: str) -> str:
+        """
+        Format access to (possibly nested, dot-separated) attribute of given variable;
+        e.g., `doc.field_str` or `doc["some field"]`
+        """
+        path = [var_name]
+        for part in attribute_name.split('.'):
+            path.append(f".{part}" if RE_IDENTIFIER.match(part) else f"[{json.dumps(part)}]")
+        return "".join(path)
+
+    def _split_clause(self, name: str, clause: Clause) -> Tuple[tuple, Dict[str, Any]]:
+        """
+        Split clause values into a shape (used as the template cache key) and bind variables
+        """
+        if not clause.values:
+            return (), {}
+
+        if clause.clause_type == ClauseTypeEnum.KEYS:
+            return tuple(sorted(clause.values)), {}
+
+        if clause.clause_type == ClauseTypeEnum.SORT:
+            for k, v in clause.values.items():
+                if v not in self.VALID_SORT_VALUES:
+                    raise ValueError(f"Sort value for {k} is should be one of {self.VALID_SORT_VALUES}")
+            return tuple(clause.values.items()), {}
+
+        if clause.clause_type == ClauseTypeEnum.PROJECTION:
+            # Values are True for attributes to keep, or False for attributes to unset:
+            if len(set(clause.values.values())) > 1:
+                raise ValueError("A projection may either keep or unset attributes, not both")
+            return tuple(sorted(clause.values.items())), {}
+
+        if clause.clause_type == ClauseTypeEnum.AGGREGATE:
+            # Values are (AQL aggregate function, attribute) for each metric, or (None, attribute) to group by:
+            for k, (function, _) in clause.values.items():
+                if function is not None and not RE_IDENTIFIER.match(function):
+                    raise ValueError(f"Invalid aggregate function for {k}: {function}")
+            return tuple(clause.values.items()), {}
+
+        if clause.clause_type == ClauseTypeEnum.SEEK:
+            # Values are (direction, value) for each sort key, in sort order:
+            shape = tuple((k, direction) for k, (direction, _) in clause.values.items())
+            return shape, {self._var_name(name, i): v for i, (_, v) in enumerate(clause.values.values())}
+
+        shape = []
+        clause_vars = {}
+        for i, k in enumerate(sorted(clause.values)):
+            v = clause.values[k]
+            if self.is_literal(v):
+                shape.append((k, self.literal_expression(v)))
+            else:
+                shape.append((k, None))
+                clause_vars[self._var_name(name, i)] = v
+        return tuple(shape), clause_vars
+
+    def _build_template(self, template: str, shapes: tuple) -> str:
+        """ Build query text from template and clause shapes; memoized by the LRU cache """
+        formatted = {}
+        for name, clause_type, var_name, shape in shapes:
+            if clause_type == ClauseTypeEnum.FILTER:
+                formatted[name] = self._format_filter(name, var_name, shape)
+            elif clause_type == ClauseTypeEnum.ALL_FILTER:
+                formatted[name] = self._format_filter(name, f"{var_name}[*]", shape, comparison="ALL ==")
+            elif clause_type == ClauseTypeEnum.PRUNE:
+                formatted[name] = self._format_filter(name, var_name, shape, keyword="PRUNE")
+            elif clause_type == ClauseTypeEnum.ATTRS:
+                formatted[name] = self._format_attrs(name, shape)
+            elif clause_type == ClauseTypeEnum.KEYS:
+                formatted[name] = self._format_keys(var_name, shape)
+            elif clause_type == ClauseTypeEnum.SORT:
+                formatted[name] = self._format_sort(var_name, shape)
+            elif clause_type == ClauseTypeEnum.SEEK:
+                formatted[name] = self._format_seek(name, var_name, shape)
+            elif clause_type == ClauseTypeEnum.PROJECTION:
+                formatted[name] = self._format_projection(var_name, shape)
+            elif clause_type == ClauseTypeEnum.AGGREGATE:
+                formatted[name] = self._format_aggregate(var_name, shape)
+            else:
+                raise ValueError(f"Unknown clause type: {clause_type}")
+        return template.format(**formatted)
+
+    def _format_filter(
+            self,
+            name: str,
+            var_name: str,
+            shape: tuple,
+            keyword: str = "FILTER",
+            comparison: str = "=="
+    ) -> str:
+        """
+        Format a lookup filter (or traversal PRUNE condition) from attribute names;
+        Returns string in format "FILTER doc.active == @lookup_filter_0 AND doc.gender == @lookup_filter_1"
+        For ALL_FILTER clauses, every element of an array must match; e.g., "FILTER p.edges[*].active ALL == @f_0"
+        """
+        conditions = []
+        for i, (k, literal) in enumerate(shape):
+            value = literal if literal is not None else f"@{self._var_name(name, i)}"
+            conditions.append(f"{self.attribute_path(var_name, k)} {comparison} {value}")
+        return f"{keyword} {' AND '.join(conditions)}" if conditions else ""
+
+    def _format_attrs(self, name: str, shape: tuple) -> str:
+        """
+        Format keys and bind variables for an object literal, allowing for literals.
+        Returns a string with format:
+          "key1": @insert_attrs_0, "key2": @insert_attrs_1, "key3": literal_expression...
+        """
+        attrs = []
+        for i, (k, literal) in enumerate(shape):
+            value = literal if literal is not None else f"@{self._var_name(name, i)}"
+            attrs.append(f"{json.dumps(k)}: {value}")
+        return ", ".join(attrs)
+
+    def _format_keys(self, var_name: str, shape: tuple) -> str:
+        """
+        Format attribute names as an object literal copying those attributes from a variable.
+        Returns a string with format:
+          "key1": d.key1, "key2": d.key2...
+        """
+        return ", ".join([f"{json.dumps(k)}: {self.attribute_path(var_name, k)}" for k in shape])
+
+    def _format_sort(self, var_name: str, shape: tuple) -> str:
+        """ Format a sort clause; Returns string in format "SORT doc.name ASC, doc.age DESC" """
+        sorts = [f"{self.attribute_path(var_name, k)} {v}".rstrip() for k, v in shape]
+        return f"SORT {', '.join(sorts)}" if sorts else ""
+
+    def _format_seek(self, name: str, var_name: str, shape: tuple) -> str:
+        """
+        Format a seek predicate, matching documents after the given values in sort order;
+        Returns string in format "FILTER (doc.a > @seek_0) OR (doc.a == @seek_0 AND doc._key > @seek_1)"
+        """
+        disjuncts = []
+        for i, (k, direction) in enumerate(shape):
+            conditions = [f"{self.attribute_path(var_name, pk)} == @{self._var_name(name, j)}" for j, (pk, _) in
+                          enumerate(shape[:i])]
+            operator = '<' if direction == 'DESC' else '>'
+            conditions.append(f"{self.attribute_path(var_name, k)} {operator} @{self._var_name(name, i)}")
+            disjuncts.append(f"({' AND '.join(conditions)})")
+        return f"FILTER {' OR '.join(disjuncts)}" if disjuncts else ""
+
+    def _format_projection(self, var_name: str, shape: tuple) -> str:
+        """
+        Format a projection of a variable, for a RETURN clause; Returns the variable if there is no projection,
+        an object literal of kept attributes, e.g., '{ "_id": doc._id, "name": doc.name }', or an UNSET of
+        removed attributes, e.g., 'UNSET(doc, "bio")'.  Kept attributes are accessed individually, so the
+        optimizer can read them from index storedValues (or a projection of the document) instead of whole documents.
+        """
+        if not shape:
+            return var_name
+        if shape[0][1]:
+            return f"{{ {self._format_keys(var_name, tuple(k for k, _ in shape))} }}"
+        return f"UNSET({var_name}, {', '.join(json.dumps(k) for k, _ in shape)})"
+
+    def _format_aggregate(self, var_name: str, shape: tuple) -> str:
+        """
+        Format a COLLECT grouping by, and aggregating, attributes; returning a row per group with its "count".
+        Returns string in format:
+          COLLECT group_0 = doc.kind AGGREGATE metric_0 = SUM(doc.price), count = LENGTH(1)
+          RETURN { "kind": group_0, "total": metric_0, "count": count }
+        """
+        groups = []
+        aggregates = []
+        results = []
+        for i, (k, (function, attribute_name)) in enumerate(shape):
+            path = self.attribute_path(var_name, attribute_name)
+            if function is None:
+                groups.append(f"group_{i} = {path}")
+                results.append(f"{json.dumps(k)}: group_{i}")
+            else:
+                aggregates.append(f"metric_{i} = {function}({path})")
+                results.append(f"{json.dumps(k)}: metric_{i}")
+        aggregates.append("count = LENGTH(1)")
+        results.append('"count": count')
+        collect = f"COLLECT {', '.join(groups)} AGGREGATE" if groups else "COLLECT AGGREGATE"
+        return f"{collect} {', '.join(aggregates)}\n          RETURN {{ {', '.join(results)} }}"
+
+    @staticmethod
+    def _var_name(name: str, index: int) -> str:
+        return f"{name}_{index}"
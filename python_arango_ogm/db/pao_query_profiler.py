@@ -0,0 +1,132 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from loguru import logger
+
+from python_arango_ogm.db.pao_query_compiler import CompiledQuery
+
+
+class QueryProfile(NamedTuple):
+    """
+    Profile of an executed query, passed to query hooks once its cursor is exhausted or closed.
+    wall_time is the time (in seconds) spent executing the query and fetching its batches, excluding
+    time spent by the consumer.  Server stats are None if the server did not report them.
+    """
+    aql: str
+    bind_var_shape: Dict[str, str]
+    wall_time: float
+    execution_time: Optional[float]
+    scanned_full: Optional[int]
+    scanned_index: Optional[int]
+    filtered: Optional[int]
+    peak_memory: Optional[int]
+    batches: int
+    rows: int
+
+
+class QueryRun:
+    """ Tracks a query from execution until its cursor is exhausted or closed """
+
+    def __init__(self, query: CompiledQuery):
+        self.query = query
+        self.wall_time = 0.0
+        self.batches = 0
+        self.rows = 0
+
+    def add_batch(self, size: int):
+        self.batches += 1
+        self.rows += size
+
+    def add_time(self, start_time: float):
+        """ Add time elapsed since start_time (from time.perf_counter) to wall time """
+        self.wall_time += time.perf_counter() - start_time
+
+
+class PAOQueryProfiler:
+    """
+    Profiles executed queries; calling registered hooks with a QueryProfile of each query, and logging queries
+    slower than slow_query_ms along with the optimizer's plan (explained once per query text).
+
+    :param slow_query_ms: Wall time threshold of the slow query log, in milliseconds; None disables it.
+    :param plan_cache_size: Number of explained plans to keep, so each slow query is explained once.
+    """
+
+    def __init__(self, slow_query_ms: float = None, plan_cache_size: int = 128):
+        self.slow_query_ms = slow_query_ms
+        self.plan_cache_size = plan_cache_size
+        self._hooks: List[Callable[[QueryProfile], Any]] = []
+        self._plans: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+
+    def add_hook(self, hook: Callable[[QueryProfile], Any]):
+        """ Register hook, called with a QueryProfile of each executed query """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[QueryProfile], Any]):
+        self._hooks.remove(hook)
+
+    def start(self, query: CompiledQuery) -> QueryRun:
+        return QueryRun(query)
+
+    def finish(self, run: QueryRun, stats: Dict[str, Any] = None) -> QueryProfile:
+        """ Build profile of finished query run from its server stats, and call hooks with it """
+        stats = stats or {}
+        profile = QueryProfile(
+            aql=run.query.aql,
+            bind_var_shape=self.bind_var_shape(run.query.bind_vars),
+            wall_time=run.wall_time,
+            execution_time=self._stat(stats, 'execution_time', 'executionTime'),
+            scanned_full=self._stat(stats, 'scanned_full', 'scannedFull'),
+            scanned_index=self._stat(stats, 'scanned_index', 'scannedIndex'),
+            filtered=stats.get('filtered'),
+            peak_memory=self._stat(stats, 'peak_memory_usage', 'peakMemoryUsage'),
+            batches=run.batches,
+            rows=run.rows
+        )
+        for hook in self._hooks:
+            try:
+                hook(profile)
+            except Exception as e:
+                logger.exception(f"Query hook {hook} failed: {e}")
+        return profile
+
+    def is_slow(self, profile: QueryProfile) -> bool:
+        return self.slow_query_ms is not None and profile.wall_time * 1000 >= self.slow_query_ms
+
+    def needs_plan(self, profile: QueryProfile) -> bool:
+        """ Return whether profiled query is slow, and its plan has not yet been explained """
+        return self.is_slow(profile) and profile.aql not in self._plans
+
+    def log_slow_query(self, profile: QueryProfile, plan: Dict[str, Any] = None):
+        """ Log slow query with a summary of its plan (given, or explained previously) """
+        if plan is not None:
+            self._plans[profile.aql] = plan
+            while len(self._plans) > self.plan_cache_size:
+                self._plans.popitem(last=False)
+        plan = self._plans.get(profile.aql) or {}
+        nodes = plan.get('nodes', [])
+        full_scans = [n.get('collection') for n in nodes if n.get('type') == 'EnumerateCollectionNode']
+        indexes = [
+            f"{n.get('collection')}.{i.get('name', i.get('id'))}"
+            for n in nodes if n.get('type') == 'IndexNode'
+            for i in n.get('indexes', [])
+        ]
+        logger.warning(
+            f"Slow query ({profile.wall_time * 1000:.1f}ms; server {profile.execution_time}s; "
+            f"{profile.rows} rows in {profile.batches} batches; scanned full {profile.scanned_full}, "
+            f"index {profile.scanned_index}): {profile.aql} "
+            f"BIND {profile.bind_var_shape} "
+            f"PLAN cost {plan.get('estimatedCost')}, full collection scans {full_scans}, indexes {indexes}"
+        )
+
+    @staticmethod
+    def bind_var_shape(bind_vars: Dict[str, Any]) -> Dict[str, str]:
+        """ Return types of bind variables; collection bind parameters (e.g., @@collection) keep their values """
+        return {
+            k: v if k.startswith('@') else type(v).__name__
+            for k, v in (bind_vars or {}).items()
+        }
+
+    @staticmethod
+    def _stat(stats: Dict[str, Any], name: str, server_name: str):
+        return stats.get(name, stats.get(server_name))
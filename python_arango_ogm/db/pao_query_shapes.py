@@ -0,0 +1,55 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Set, Tuple
+
+
+class QueryShape(NamedTuple):
+    """ Shape of an attribute query; the keys it filters on, and the keys (and directions) it sorts by """
+    collection_name: str
+    filter_keys: Tuple[str, ...] = ()
+    sort_keys: Tuple[Tuple[str, str], ...] = ()
+
+    @classmethod
+    def from_lookup(
+            cls,
+            collection_name: str,
+            lookup_key_dict: Dict[str, Any] = None,
+            sort_key_dict: Dict[str, str] = None
+    ) -> 'QueryShape':
+        return cls(
+            collection_name,
+            tuple(sorted(lookup_key_dict or {})),
+            tuple((k, (d or 'ASC').upper()) for k, d in (sort_key_dict or {}).items())
+        )
+
+
+class PAOQueryShapeLog:
+    """
+    Records the distinct shapes of attribute queries (get_by_attributes, find_by_attributes and all),
+    appending each new shape to a JSON lines file, for `pao-migrate advise`.  Set PAO_QUERY_SHAPE_LOG
+    to a path to have databases record their queries.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._shapes: Set[QueryShape] = set(self.load(path)) if self.path.exists() else set()
+
+    def record(self, collection_name: str, lookup_key_dict: Dict[str, Any] = None, sort_key_dict: Dict[str, str] = None):
+        shape = QueryShape.from_lookup(collection_name, lookup_key_dict, sort_key_dict)
+        with self._lock:
+            if shape in self._shapes:
+                return
+            self._shapes.add(shape)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(shape._asdict()) + "\n")
+
+    @staticmethod
+    def load(path: str) -> List[QueryShape]:
+        """ Load query shapes recorded in given file """
+        with open(path) as f:
+            return [
+                QueryShape(d['collection_name'], tuple(d['filter_keys']), tuple(tuple(s) for s in d['sort_keys']))
+                for d in (json.loads(line) for line in f if line.strip())
+            ]
@@ -0,0 +1,134 @@
+import inspect
+from typing import Any, Dict, Tuple
+
+from python_arango_ogm.db.pao_db_base import SYSTEM_ATTRIBUTES
+
+# Values of PAORecord's bookkeeping slots until they're set:
+SLOT_DEFAULTS = {'_unloaded_fields': frozenset(), '_extra': None, '_dirty': None, '_loaded': False}
+
+
+class PAORecord:
+    """
+    Base of the record classes compiled for models by `compile_record_class`.  A record keeps its document's
+    system attributes and its model's declared fields in slots, and any other attributes of the document
+    (ADDITIONAL_PROPERTIES) in an overflow mapping; both read as attributes.  Attributes a record doesn't
+    have fall back to its model, so class attributes and edge definitions resolve as on model instances.
+    Once loaded, records track which attributes are set (other than system attributes and prefetched edges);
+    see `changes`.
+    """
+    __slots__ = ('_unloaded_fields', '_extra', '_dirty', '_loaded')
+    model: type = None
+    field_names: Tuple[str, ...] = ()
+    edge_names: Tuple[str, ...] = ()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for names without a value in a slot or on the class; bookkeeping slots are left unset
+        # by `from_row` until needed:
+        if name in SLOT_DEFAULTS:
+            return SLOT_DEFAULTS[name]
+        if not name.startswith('__'):
+            extra = self._extra
+            if extra and name in extra:
+                return extra[name]
+            if self.model is not None and hasattr(self.model, name):
+                return getattr(self.model, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name: str, value: Any):
+        if name.startswith('_') or name in self.edge_names:
+            object.__setattr__(self, name, value)
+            return
+        if name in self.field_names:
+            object.__setattr__(self, name, value)
+        elif self._extra is None:
+            object.__setattr__(self, '_extra', {name: value})
+        else:
+            self._extra[name] = value
+        if not self._loaded:
+            return
+        if self._dirty is None:
+            object.__setattr__(self, '_dirty', {name})
+        else:
+            self._dirty.add(name)
+
+    def changes(self) -> Dict[str, Any]:
+        """ Return attributes set since the record was loaded (or last saved), with their values """
+        return {n: getattr(self, n) for n in self._dirty} if self._dirty else {}
+
+    def mark_clean(self):
+        """ Forget changes; e.g., once they're saved """
+        object.__setattr__(self, '_dirty', None)
+
+    def is_loaded(self, field_name: str) -> bool:
+        """ Return whether field_name was loaded; False for fields left out of the projection this record was read with """
+        return field_name not in self._unloaded_fields
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ Return the record's document; its system attributes, declared fields and additional properties """
+        doc = {n: getattr(self, n) for n in self.field_names}
+        return {**doc, **self._extra} if self._extra else doc
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def compile_record_class(model: type, field_names: Tuple[str, ...], edge_names: Tuple[str, ...]) -> type:
+    """
+    Return a new record class for model, with slots for system attributes, field_names and edge_names (set when
+    edges are prefetched), and a `from_row` constructor generated for its fields.  Instance methods and
+    properties of model (and its bases) are copied to the record class, which is registered as a virtual
+    subclass of model; so records pass isinstance checks against their models.
+    """
+    field_names = tuple(dict.fromkeys(SYSTEM_ATTRIBUTES + tuple(field_names)))
+    slots = field_names + tuple(n for n in edge_names if n not in field_names)
+    namespace = {'__slots__': slots, 'model': model, 'field_names': field_names, 'edge_names': tuple(edge_names)}
+    for klass in reversed(model.__mro__):
+        for name, value in vars(klass).items():
+            if name.startswith('__') or name in slots or hasattr(PAORecord, name):
+                continue
+            if inspect.isfunction(value) or isinstance(value, property):
+                namespace[name] = value
+
+    record_class = type(f"{model.__name__}Record", (PAORecord,), namespace)
+    record_class.from_row = staticmethod(_compile_from_row(record_class, field_names))
+    model.register(record_class)
+    return record_class
+
+
+def _compile_from_row(record_class: type, field_names: Tuple[str, ...]):
+    """
+    Generate from_row(row, unloaded_fields) for record_class; assigning each of field_names from the row in
+    straight-line code.  Rows with exactly those attributes take the fast path; otherwise missing fields are
+    None and other attributes of the row go to the overflow mapping.  Slots are set through their descriptors,
+    bypassing change tracking, and the record is flagged as loaded once filled.
+    """
+    setters = {f"set_{i}": getattr(record_class, n).__set__ for i, n in enumerate(field_names)}
+    lines = [
+        "def from_row(row, unloaded_fields=EMPTY):",
+        "    record = new(record_class)",
+        "    try:",
+        *(f"        set_{i}(record, row[{n!r}])" for i, n in enumerate(field_names)),
+        "        complete = len(row) == FIELD_COUNT",
+        "    except KeyError:",
+        "        get = row.get",
+        *(f"        set_{i}(record, get({n!r}))" for i, n in enumerate(field_names)),
+        "        complete = False",
+        "    if not complete:",
+        "        extra = {k: v for k, v in row.items() if k not in names}",
+        "        if extra:",
+        "            set_extra(record, extra)",
+        "    if unloaded_fields:",
+        "        set_unloaded_fields(record, unloaded_fields)",
+        "    set_loaded(record, True)",
+        "    return record",
+    ]
+    namespace = {
+        'new': object.__new__, 'record_class': record_class, 'names': frozenset(field_names),
+        'FIELD_COUNT': len(field_names), 'EMPTY': frozenset(),
+        'set_extra': PAORecord._extra.__set__,
+        'set_unloaded_fields': PAORecord._unloaded_fields.__set__,
+        'set_loaded': PAORecord._loaded.__set__,
+        **setters
+    }
+    exec("\n".join(lines), namespace)
+    return namespace['from_row']
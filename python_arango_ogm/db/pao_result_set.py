@@ -0,0 +1,124 @@
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from python_arango_ogm.utils import iter_util
+
+
+class PAOResultSet:
+    """
+    Lazy result of a model query.  Documents are marshalled as they're consumed from the cursor, so walking
+    a large result holds about a cursor batch of documents at a time.  Results are consumed once; indexing
+    (or `to_list`) loads the remaining results into a list, which later reads use.
+    `count` counts matching documents on the server, once and only when called, unless results were loaded;
+    `len` (like `list`) loads the results, so it never sends a count query.
+    If `prepare_chunk` is given, records are passed to it in chunks of chunk_size (e.g., to prefetch edges).
+    """
+
+    def __init__(
+            self,
+            rows: Iterable[Dict[str, Any]],
+            marshall: Callable[[Dict[str, Any]], Any] = None,
+            count: Callable[[], int] = None,
+            prepare_chunk: Callable[[List], List] = None,
+            chunk_size: int = 1000
+    ):
+        self._rows = iter(rows)
+        self._marshall = marshall
+        self._count = count
+        self._prepare_chunk = prepare_chunk
+        self.chunk_size = chunk_size
+        self._peeked: List[Dict[str, Any]] = []
+        self._consumed = False
+        self._loaded: Optional[List] = None
+        self._length: Optional[int] = None
+        self._nonempty = False
+
+    def __iter__(self) -> Iterator:
+        return iter(self._loaded) if self._loaded is not None else self._records()
+
+    def __getitem__(self, index):
+        return self.to_list()[index]
+
+    def __len__(self) -> int:
+        return len(self.to_list())
+
+    def __bool__(self) -> bool:
+        if self._loaded is None and self._consumed:
+            return self._nonempty
+        return self.exists()
+
+    def __repr__(self) -> str:
+        state = f"{len(self._loaded)} loaded" if self._loaded is not None else "consumed" if self._consumed else "pending"
+        return f"<{type(self).__name__} ({state})>"
+
+    def count(self) -> int:
+        """ Return the number of matching documents; counted on the server (once), unless results were loaded """
+        if self._loaded is not None:
+            return len(self._loaded)
+        if self._count is None:
+            return len(self.to_list())
+        if self._length is None:
+            self._length = self._count()
+        return self._length
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[List]:
+        """ Yield lists of up to chunk_size records """
+        return iter_util.chunken(self, chunk_size)
+
+    def first(self) -> Any:
+        """ Return the first record (or None, if there are none); closing the cursor, unless results were loaded """
+        if self._loaded is not None:
+            return self._loaded[0] if self._loaded else None
+        self._check_unconsumed()
+        self._consumed = True
+        rows = self._peeked or list(islice(self._rows, 1))
+        self._nonempty = bool(rows)
+        self.close()
+        return next(self._prepare(rows), None)
+
+    def exists(self) -> bool:
+        """ Return whether there are any records; reading ahead by one document at most """
+        if self._loaded is not None:
+            return bool(self._loaded)
+        self._check_unconsumed()
+        if not self._peeked:
+            self._peeked = list(islice(self._rows, 1))
+        return bool(self._peeked)
+
+    def to_list(self) -> List:
+        """ Load the (remaining) records into a list, kept for later reads, and return it """
+        if self._loaded is None:
+            self._loaded = list(self._records())
+        return self._loaded
+
+    def close(self):
+        """ Stop consuming rows; closing their cursor, if it's a generator """
+        close = getattr(self._rows, 'close', None)
+        if close:
+            close()
+
+    def _records(self) -> Iterator:
+        if self._loaded is not None:
+            # Loaded after this iterator was created; e.g., by `list` asking for a length:
+            yield from self._loaded
+            return
+        self._check_unconsumed()
+        self._consumed = True
+        if not self._peeked:
+            self._peeked = list(islice(self._rows, 1))
+        self._nonempty = bool(self._peeked)
+        rows = chain(self._peeked, self._rows)
+        self._peeked = []
+        if self._prepare_chunk is None:
+            yield from (map(self._marshall, rows) if self._marshall else rows)
+        else:
+            for chunk in iter_util.chunken(rows, self.chunk_size):
+                yield from self._prepare(chunk)
+
+    def _prepare(self, rows: List[Dict[str, Any]]) -> Iterator:
+        records = [self._marshall(r) for r in rows] if self._marshall else rows
+        return iter(self._prepare_chunk(records) if self._prepare_chunk and records else records)
+
+    def _check_unconsumed(self):
+        if self._consumed:
+            raise RuntimeError("Result set was already consumed; use to_list() to read its records more than once")
@@ -0,0 +1,108 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Literal, NamedTuple, Optional
+
+from loguru import logger
+
+from python_arango_ogm.db.pao_db_base import PAODBBase
+
+# Session active in the current context (thread or task):
+ACTIVE_SESSION: ContextVar[Optional['PAOSession']] = ContextVar('pao_active_session', default=None)
+
+
+class FlushReport(NamedTuple):
+    """ Result of flushing a collection's buffered documents with a bulk import """
+    collection_name: str
+    docs: int
+    created: int
+    errors: int
+    seconds: float
+    details: List[str]
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.docs / self.seconds if self.seconds else float(self.docs)
+
+
+class PAOSession:
+    """
+    Unit of work buffering document (and edge) inserts per collection; each collection's buffer is flushed
+    as one bulk import once `flush_every` documents are buffered, once `flush_interval` seconds have passed
+    since the last flush (checked as documents are buffered), and when the session ends.  Vertex collections
+    are flushed before edge collections, so edge endpoints exist before their edges.
+    Bulk imports don't halt on bad documents; each flush's report has counts and details of failed documents.
+    """
+
+    def __init__(
+            self,
+            pao_db: PAODBBase,
+            flush_every: int = 5000,
+            flush_interval: float = None,
+            on_duplicate: Literal['error', 'update', 'replace', 'ignore'] = 'error'
+    ):
+        self.pao_db = pao_db
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.on_duplicate = on_duplicate
+        self.reports: List[FlushReport] = []
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._edge_collections = set()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def pending(self) -> int:
+        """ Number of buffered documents """
+        return self._pending
+
+    @property
+    def errors(self) -> List[FlushReport]:
+        """ Reports of flushes with failed documents """
+        return [r for r in self.reports if r.errors]
+
+    def insert(self, collection_name: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """ Buffer doc for insertion into collection_name (as an edge, if it has _from); flushing if due """
+        self._buffers.setdefault(collection_name, []).append(doc)
+        if '_from' in doc:
+            self._edge_collections.add(collection_name)
+        self._pending += 1
+        if self._pending >= self.flush_every or self._interval_elapsed():
+            self.flush()
+        return doc
+
+    def flush(self) -> List[FlushReport]:
+        """ Flush buffered documents; one bulk import per collection, vertex collections first """
+        buffers, self._buffers = self._buffers, {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        names = sorted(buffers, key=lambda n: n in self._edge_collections)
+        reports = [self._flush_collection(name, buffers[name]) for name in names]
+        self.reports.extend(reports)
+        return reports
+
+    def discard(self):
+        """ Discard buffered documents """
+        self._buffers = {}
+        self._pending = 0
+
+    def _flush_collection(self, collection_name: str, docs: List[Dict[str, Any]]) -> FlushReport:
+        start_time = time.perf_counter()
+        chunk_reports = self.pao_db.insert_docs(
+            collection_name, docs, batch_size=len(docs), on_duplicate=self.on_duplicate
+        )
+        report = FlushReport(
+            collection_name,
+            len(docs),
+            sum(r['created'] for r in chunk_reports),
+            sum(r['errors'] for r in chunk_reports),
+            time.perf_counter() - start_time,
+            [d for r in chunk_reports for d in r['details']]
+        )
+        logger.debug(
+            f"Flushed {report.docs} docs into {collection_name} in {report.seconds:.3f}s "
+            f"({report.docs_per_second:.0f} docs/s, {report.errors} errors)"
+        )
+        return report
+
+    def _interval_elapsed(self) -> bool:
+        return self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval
@@ -0,0 +1,69 @@
+"""
+Benchmark of marshalling rows into compiled record classes, against marshalling by setattr on PAOModel
+instances (as before record classes).  Run with: python -m python_arango_ogm.db.tests.bench_pao_records
+Times are the best of several repeats, interleaved between implementations and with garbage collection
+disabled; so machine noise affects both alike.
+"""
+import gc
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from python_arango_ogm.db.pao_model import PAOModel
+from python_arango_ogm.db.tests.models import FooModel
+
+ROWS = 10_000
+NUMBER = 5
+REPEAT = 9
+
+
+def setattr_marshall_row(field_dict: Dict[str, Any], unloaded_fields=frozenset()) -> PAOModel:
+    model = PAOModel()
+    model._unloaded_fields = unloaded_fields
+    for k, v in field_dict.items():
+        setattr(model, k, v)
+    return model
+
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    return [
+        {'_id': f"foo/{i}", '_key': str(i), '_rev': f"_r{i}", 'field_int': i, 'field_str': f"foo_{i}"}
+        for i in range(count)
+    ]
+
+
+def best_times(implementations: Dict[str, Callable[[List], list]], rows: List[Dict[str, Any]]) -> Dict[str, float]:
+    """ Return the best time (seconds per row) of each implementation, over REPEAT interleaved rounds """
+    for marshall_rows in implementations.values():
+        marshall_rows(rows[:1000])  # warm up (and compile the record class)
+    best = {name: float('inf') for name in implementations}
+    gc.disable()
+    try:
+        for _ in range(REPEAT):
+            for name, marshall_rows in implementations.items():
+                seconds = timeit.timeit(lambda: marshall_rows(rows), number=NUMBER) / NUMBER
+                best[name] = min(best[name], seconds / len(rows))
+    finally:
+        gc.enable()
+    return best
+
+
+def bytes_per_row(marshall_rows: Callable[[List], list], rows: List[Dict[str, Any]]) -> float:
+    tracemalloc.start()
+    records = marshall_rows(rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size / len(rows)
+
+
+if __name__ == '__main__':
+    bench_rows = make_rows(ROWS)
+    implementations = {
+        'setattr': lambda rows: [setattr_marshall_row(r) for r in rows],
+        'record': FooModel.marshall_rows,
+    }
+    times = best_times(implementations, bench_rows)
+    for impl_name, impl in implementations.items():
+        print(f"{impl_name:>10}: {times[impl_name] * 1e9:7.0f} ns/row, {bytes_per_row(impl, bench_rows):5.0f} bytes/row")
+    print(f"{'speedup':>10}: {times['setattr'] / times['record']:7.2f}x")
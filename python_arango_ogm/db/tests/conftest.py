@@ -0,0 +1,90 @@
+from collections import deque
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from arango import CursorNextError
+
+from python_arango_ogm.db.pao_async_database import AsyncPAODatabase
+from python_arango_ogm.db.pao_connection import PAOConnectionConfig
+from python_arango_ogm.db.pao_database import PAODatabase
+from python_arango_ogm.db.pao_query_compiler import PAOQueryCompiler
+from python_arango_ogm.db.pao_query_profiler import PAOQueryProfiler
+
+
+class FakeCursor:
+    """ Cursor serving given batches, as python-arango's cursor does """
+
+    def __init__(self, batches, error_at=None):
+        self._batches = list(batches)
+        self._batch = deque(self._batches.pop(0))
+        self.error_at = error_at
+        self.fetches = 0
+        self.closed = False
+
+    def batch(self):
+        return self._batch
+
+    def has_more(self):
+        return bool(self._batches)
+
+    def fetch(self):
+        self.fetches += 1
+        if self.fetches == self.error_at:
+            raise CursorNextError(MagicMock(error_message="fetch failed"), None)
+        self._batch.extend(self._batches.pop(0))
+
+    def close(self, ignore_missing=False):
+        self.closed = True
+
+    def statistics(self):
+        return {'execution_time': 0.25, 'scanned_full': 5}
+
+
+@pytest.fixture
+def pao_db(mocker) -> PAODatabase:
+    """ PAODatabase built without connecting; its underlying python-arango database is mocked """
+    pao_db = PAODatabase.__new__(PAODatabase)
+    pao_db.db = mocker.MagicMock()
+    pao_db.use_plan_cache = False
+    pao_db.connection_config = PAOConnectionConfig(retries=2, backoff_factor=0)
+    pao_db.query_compiler = PAOQueryCompiler()
+    pao_db.query_profiler = PAOQueryProfiler()
+    return pao_db
+
+
+@pytest.fixture
+def mock_cursor(mocker):
+    """ Factory of mocked python-arango cursors, serving given docs in one batch """
+    def make_cursor(docs, has_more=False):
+        cursor = mocker.MagicMock()
+        cursor.__iter__.return_value = iter(docs)
+        cursor.batch.return_value = deque(docs)
+        cursor.has_more.return_value = has_more
+        cursor.statistics.return_value = {}
+        return cursor
+
+    return make_cursor
+
+
+@pytest.fixture
+def fake_cursor():
+    """ Factory of FakeCursors; cursors serving given batches """
+    return FakeCursor
+
+
+@pytest.fixture
+def mock_async_database():
+    """ Factory of AsyncPAODatabases built without connecting; their requests are passed to given handler """
+    def make_database(handler, hosts: str = "http://arango", host_selection: str = None) -> AsyncPAODatabase:
+        pao_db = AsyncPAODatabase.__new__(AsyncPAODatabase)
+        pao_db.app_db_name = 'test'
+        pao_db.use_plan_cache = False
+        pao_db.query_compiler = PAOQueryCompiler()
+        pao_db.query_profiler = PAOQueryProfiler()
+        pao_db.connection_config = PAOConnectionConfig(hosts=hosts, host_selection=host_selection)
+        pao_db.host_resolver = pao_db.connection_config.create_resolver()
+        pao_db.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return pao_db
+
+    return make_database
@@ -0,0 +1,210 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from python_arango_ogm.db.pao_query_profiler import PAOQueryProfiler
+
+
+def test_cursor_fetches_batches(mock_async_database):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append((request.method, request.url.path))
+        if request.url.path == '/_db/test/_api/cursor':
+            body = json.loads(request.content)
+            assert body['bindVars'] == {'@collection': 'foo', 'lookup_filter_0': 1}
+            return httpx.Response(201, json={'id': 'c1', 'result': [{'n': 0}, {'n': 1}], 'hasMore': True})
+        return httpx.Response(200, json={'id': 'c1', 'result': [{'n': 2}], 'hasMore': False})
+
+    async def run():
+        async with mock_async_database(handler) as pao_db:
+            cursor = await pao_db.get_by_attributes('foo', {'field_int': 1})
+            return [doc['n'] async for doc in cursor]
+
+    assert asyncio.run(run()) == [0, 1, 2]
+    assert requests == [('POST', '/_db/test/_api/cursor'), ('POST', '/_db/test/_api/cursor/c1')]
+
+
+def test_cursor_closed_early(mock_async_database):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append((request.method, request.url.path))
+        if request.method == 'DELETE':
+            return httpx.Response(202, json={})
+        return httpx.Response(201, json={'id': 'c1', 'result': [{'_key': 'k1'}], 'hasMore': True})
+
+    async def run():
+        async with mock_async_database(handler) as pao_db:
+            return await pao_db.find_by_attributes('foo', {'field_int': 1})
+
+    assert asyncio.run(run()) == {'_key': 'k1'}
+    assert requests[-1] == ('DELETE', '/_db/test/_api/cursor/c1')
+
+
+def test_gather_find_by_keys(mock_async_database):
+    def handler(request: httpx.Request):
+        if request.method == 'GET':
+            if request.url.path.endswith('/missing'):
+                return httpx.Response(404, json={'error': True, 'errorNum': 1202})
+            return httpx.Response(200, json={'_key': request.url.path.split('/')[-1]})
+        keys = [d['_key'] for d in json.loads(request.content)]
+        return httpx.Response(200, json=[{'_id': f"foo/{k}", '_key': k} for k in reversed(keys)])
+
+    async def run():
+        async with mock_async_database(handler) as pao_db:
+            return await pao_db.gather(
+                pao_db.find_by_key('foo', 'k1'),
+                pao_db.find_by_key('foo', 'missing'),
+                pao_db.find_by_keys('foo', ['f1', 'f2', 'f3'], chunk_size=2),
+                concurrency=2
+            )
+
+    found, missing, docs = asyncio.run(run())
+    assert found == {'_key': 'k1'}
+    assert missing is None
+    assert [d['_key'] for d in docs] == ['f1', 'f2', 'f3']
+
+
+def test_find_by_keys_bounds_concurrency(mock_async_database):
+    in_flight = {'now': 0, 'peak': 0}
+
+    async def handler(request: httpx.Request):
+        in_flight['now'] += 1
+        in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+        await asyncio.sleep(0.01)
+        in_flight['now'] -= 1
+        keys = [d['_key'] for d in json.loads(request.content)]
+        return httpx.Response(200, json=[{'_id': f"foo/{k}", '_key': k} for k in keys])
+
+    async def run():
+        async with mock_async_database(handler) as pao_db:
+            return await pao_db.find_by_keys('foo', [f"f{i}" for i in range(10)], chunk_size=1, concurrency=3)
+
+    docs = asyncio.run(run())
+    assert [d['_key'] for d in docs] == [f"f{i}" for i in range(10)]
+    assert in_flight['peak'] == 3
+
+
+def test_cursor_pinned_to_host(mock_async_database):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append((request.url.host, request.url.path))
+        if request.url.host == 'down':
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path == '/_db/test/_api/cursor':
+            return httpx.Response(201, json={'id': 'c1', 'result': [1], 'hasMore': True})
+        return httpx.Response(200, json={'id': 'c1', 'result': [2], 'hasMore': False})
+
+    async def run():
+        async with mock_async_database(handler, "http://a,http://b,http://down", 'roundrobin') as pao_db:
+            results = []
+            for i in range(3):
+                results.append(await (await pao_db.get_by_attributes('foo')).to_list())
+            return results, pao_db.connection_stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [[1, 2]] * 3
+    assert [host for host, path in requests] == ['a', 'a', 'b', 'b', 'down', 'a', 'a']
+    assert stats['http://down']['errors'] == 1
+    assert stats['http://a']['requests'] == 4
+
+
+def test_pinned_requests_not_failed_over(mock_async_database):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append((request.url.host, request.url.path))
+        if len(requests) > 1 and request.url.host == 'a':
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(201, json={'id': 'c1', 'result': [1], 'hasMore': request.url.host == 'a'})
+
+    async def run():
+        async with mock_async_database(handler, "http://a,http://b", 'roundrobin') as pao_db:
+            cursor = await pao_db.get_by_attributes('foo')
+            return await cursor.to_list()
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(run())
+    assert requests[:2] == [('a', '/_db/test/_api/cursor'), ('a', '/_db/test/_api/cursor/c1')]
+    assert all(host == 'a' for host, _ in requests)
+
+
+def test_cursor_prefetch(mock_async_database):
+    def handler(request: httpx.Request):
+        if request.url.path == '/_db/test/_api/cursor':
+            return httpx.Response(201, json={'id': 'c1', 'result': [0], 'hasMore': True})
+        if request.method == 'DELETE':
+            return httpx.Response(202, json={})
+        handler.fetches += 1
+        return httpx.Response(200, json={'id': 'c1', 'result': [handler.fetches], 'hasMore': handler.fetches < 5})
+    handler.fetches = 0
+
+    async def run():
+        async with mock_async_database(handler) as pao_db:
+            cursor = await pao_db.get_by_attributes('foo', cursor_options={'prefetch': 2})
+            return await cursor.to_list()
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4, 5]
+
+
+def test_query_hooks_and_slow_query_log(mock_async_database):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request.url.path)
+        if request.url.path == '/_db/test/_api/explain':
+            return httpx.Response(200, json={'plan': {'nodes': [], 'estimatedCost': 3}})
+        if request.url.path == '/_db/test/_api/cursor':
+            return httpx.Response(201, json={'id': 'c1', 'result': [0], 'hasMore': True})
+        return httpx.Response(200, json={
+            'id': 'c1', 'result': [1, 2], 'hasMore': False, 'extra': {'stats': {'executionTime': 0.5, 'scannedIndex': 3}}
+        })
+
+    async def run():
+        async with mock_async_database(handler) as pao_db:
+            pao_db.query_profiler = PAOQueryProfiler(slow_query_ms=0)
+            profiles = []
+            pao_db.add_query_hook(profiles.append)
+            for _ in range(2):
+                await (await pao_db.get_by_attributes('foo')).to_list()
+            return profiles
+
+    profiles = asyncio.run(run())
+    assert [(p.batches, p.rows, p.execution_time, p.scanned_index) for p in profiles] == [(2, 3, 0.5, 3)] * 2
+    assert requests.count('/_db/test/_api/explain') == 1
+
+
+def test_transaction(mock_async_database):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append((request.method, request.url.path, request.headers.get('x-arango-trx-id')))
+        if request.url.path == '/_db/test/_api/transaction/begin':
+            assert json.loads(request.content)['collections']['write'] == ['foo']
+            return httpx.Response(201, json={'result': {'id': 't1', 'status': 'running'}})
+        if request.url.path.startswith('/_db/test/_api/transaction'):
+            return httpx.Response(200, json={'result': {'id': 't1'}})
+        return httpx.Response(202, json={'new': {'_key': 'f1'}})
+
+    async def run():
+        async with mock_async_database(handler, hosts="http://a1,http://a2") as pao_db:
+            async with pao_db.transaction(write=['foo']):
+                await pao_db.insert_doc('foo', {'_key': 'f1'})
+            try:
+                async with pao_db.transaction(write=['foo']):
+                    raise ValueError("rollback")
+            except ValueError:
+                pass
+
+    asyncio.run(run())
+    assert requests == [
+        ('POST', '/_db/test/_api/transaction/begin', None),
+        ('POST', '/_db/test/_api/document/foo', 't1'),
+        ('PUT', '/_db/test/_api/transaction/t1', None),
+        ('POST', '/_db/test/_api/transaction/begin', None),
+        ('DELETE', '/_db/test/_api/transaction/t1', None),
+    ]
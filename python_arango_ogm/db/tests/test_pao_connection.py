@@ -0,0 +1,47 @@
+from arango.resolver import FallbackHostResolver, SingleHostResolver
+
+from python_arango_ogm.db.pao_connection import LeastLoadedHostResolver, PAOConnectionConfig
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv('PAO_DB_HOSTS', 'http://c1:8529/, http://c2:8529')
+    monkeypatch.setenv('PAO_DB_POOL_SIZE', '32')
+    monkeypatch.setenv('PAO_DB_KEEP_ALIVE', 'false')
+    monkeypatch.setenv('PAO_DB_RETRIES', '5')
+    config = PAOConnectionConfig(retries=2)
+
+    assert config.hosts == ['http://c1:8529', 'http://c2:8529']
+    assert config.pool_size == 32
+    assert config.keep_alive is False
+    assert config.retries == 2
+    assert isinstance(config.create_resolver(), FallbackHostResolver)
+
+    client = config.create_client()
+    assert client.hosts == config.hosts
+    assert client._http.stats is config.stats
+    assert all(s.headers['Connection'] == 'close' for s in client._sessions)
+    assert client._sessions[0].get_adapter('http://c1:8529')._pool_maxsize == 32
+
+
+def test_single_host_default(monkeypatch):
+    monkeypatch.delenv('PAO_DB_HOSTS', raising=False)
+    config = PAOConnectionConfig(host_selection='least_loaded')
+    assert config.hosts == ['http://localhost:8529']
+    assert isinstance(config.create_resolver(), SingleHostResolver)
+
+
+def test_least_loaded_stats():
+    config = PAOConnectionConfig(hosts=['http://c1', 'http://c2', 'http://c3'], pool_size=2, host_selection='least_loaded')
+    resolver = config.create_resolver()
+    assert isinstance(resolver, LeastLoadedHostResolver)
+
+    start_times = [config.stats.begin(0), config.stats.begin(0), config.stats.begin(1)]
+    assert resolver.get_host_index() == 2
+    assert resolver.get_host_index({2}) == 1
+    config.stats.end(0, start_times[0], error=True)
+
+    stats = config.stats.as_dict()
+    assert stats['http://c1']['requests'] == 2
+    assert stats['http://c1']['in_flight'] == 1
+    assert stats['http://c1']['errors'] == 1
+    assert stats['http://c1']['saturation'] == 1.0
@@ -0,0 +1,422 @@
+import pytest
+from arango import AQLQueryExecuteError, CursorNextError, DocumentInsertError
+from arango.aql import AQL
+
+from python_arango_ogm.db.pao_database import PAODatabase
+from python_arango_ogm.db.pao_db_base import PAODBBase
+from python_arango_ogm.db.pao_query_cache import CACHE_MISS, PAOLRUQueryCache, PAOQueryCache
+from python_arango_ogm.db.pao_query_profiler import PAOQueryProfiler
+
+
+def test_insert_docs_streams_chunks(mocker, pao_db):
+    collection = pao_db.db.collection.return_value
+    collection.import_bulk.side_effect = [
+        {'created': 2, 'errors': 0, 'empty': 0, 'updated': 0, 'ignored': 0, 'details': []},
+        DocumentInsertError(mocker.MagicMock(), mocker.MagicMock()),
+        {'created': 0, 'errors': 1, 'empty': 0, 'updated': 0, 'ignored': 0, 'details': ['bad doc']},
+    ]
+
+    docs = ({"field_int": i} for i in range(5))
+    reports = pao_db.insert_docs("foo", docs, batch_size=2)
+
+    assert collection.import_bulk.call_count == 3
+    assert [r['created'] for r in reports] == [2, 0, 0]
+    assert [r['errors'] for r in reports] == [0, 2, 1]
+    assert reports[2]['details'] == ['bad doc']
+
+
+def test_upsert_docs_one_query_per_batch(pao_db, mock_cursor):
+    pao_db.db.aql.execute.side_effect = [
+        mock_cursor([{'inserted': True, 'count': 2}, {'inserted': False, 'count': 1}]),
+        mock_cursor([{'inserted': False, 'count': 1}]),
+    ]
+
+    docs = [{"field_str": f"foo_{i}", "field_int": i} for i in range(4)]
+    counts = pao_db.upsert_docs("foo", docs, ["field_str"], update_dict={"updated_at": "`DATE_NOW()`"}, batch_size=3)
+
+    assert counts == {'inserted': 2, 'updated': 2}
+    assert pao_db.db.aql.execute.call_count == 2
+    aql = pao_db.db.aql.execute.call_args.args[0]
+    bind_vars = pao_db.db.aql.execute.call_args.kwargs['bind_vars']
+    assert 'UPSERT { "field_str": d.field_str }' in aql
+    assert '"updated_at": DATE_NOW()' in aql
+    assert bind_vars['batch'] == docs[3:]
+    assert bind_vars['lookup_keys'] == ["field_str"]
+
+
+def test_insert_doc_uses_document_api(pao_db):
+    collection = pao_db.db.collection.return_value
+    collection.insert.return_value = {'_key': 'k1', 'new': {'_key': 'k1', 'field_int': 1}}
+
+    new_doc = pao_db.insert_doc("foo", {"_key": "k1", "field_int": 1})
+
+    assert new_doc == {'_key': 'k1', 'field_int': 1}
+    assert collection.insert.call_args.args[0]['_key'] == 'k1'
+    pao_db.db.aql.execute.assert_not_called()
+
+
+def test_insert_doc_with_literal_uses_aql(pao_db, mock_cursor):
+    pao_db.db.aql.execute.return_value = mock_cursor([{'_key': 'k1'}])
+
+    assert pao_db.insert_doc("foo", {"created_at": "`DATE_NOW()`"}) == {'_key': 'k1'}
+    pao_db.db.collection.return_value.insert.assert_not_called()
+
+
+def test_update_doc_checks_rev(pao_db):
+    collection = pao_db.db.collection.return_value
+
+    pao_db.update_doc("foo", "k1", {"field_int": 2}, rev="_rev1", return_new=False)
+
+    collection.update.assert_called_once()
+    assert collection.update.call_args.args[0] == {"_key": "k1", "_rev": "_rev1", "field_int": 2}
+    assert collection.update.call_args.kwargs['check_rev'] is True
+
+
+def test_find_by_keys_preserves_order(mocker, pao_db):
+    collections = {'foo': mocker.MagicMock(), 'bar': mocker.MagicMock()}
+    pao_db.db.collection.side_effect = lambda name: collections[name]
+    collections['foo'].get_many.side_effect = lambda keys: [
+        {'_id': f"foo/{k}", '_key': k} for k in reversed(keys) if k != 'missing'
+    ]
+    collections['bar'].get_many.return_value = [{'_id': "bar/b1", '_key': 'b1'}]
+
+    docs = pao_db.find_by_keys("foo", ["f1", "missing", "bar/b1", "f2", "f3", "f1"], chunk_size=2)
+
+    assert [d['_id'] if d else None for d in docs] == ["foo/f1", None, "bar/b1", "foo/f2", "foo/f3", "foo/f1"]
+    assert collections['foo'].get_many.call_count == 2
+
+
+def test_get_by_attributes_streams_without_count(pao_db, mock_cursor):
+    pao_db.db.aql.execute.return_value = mock_cursor([{'_key': 'k1'}])
+
+    assert list(pao_db.get_by_attributes("foo", {"field_int": 1}, cursor_options={'ttl': 30})) == [{'_key': 'k1'}]
+    options = pao_db.db.aql.execute.call_args.kwargs
+    assert options['stream'] is True
+    assert options['count'] is False
+    assert options['batch_size'] == 1000
+    assert options['ttl'] == 30
+
+
+def test_cursor_closed_when_consumer_stops(pao_db, mock_cursor):
+    cursor = mock_cursor([{'_key': 'k1'}, {'_key': 'k2'}], has_more=True)
+    pao_db.db.aql.execute.return_value = cursor
+
+    assert pao_db.find_by_attributes("foo", {"field_int": 1}) == {'_key': 'k1'}
+    assert pao_db.db.aql.execute.call_args.kwargs['batch_size'] == 1
+    cursor.close.assert_called_once_with(ignore_missing=True)
+
+
+def test_prefetch_doc_generator(fake_cursor):
+    cursor = fake_cursor([[1, 2], [3, 4], [5]])
+    assert list(PAODatabase._prefetch_doc_generator(cursor, 1)) == [1, 2, 3, 4, 5]
+    assert not cursor.closed
+
+
+def test_prefetch_doc_generator_stops_early(fake_cursor):
+    cursor = fake_cursor([[i] for i in range(100)])
+    docs = PAODatabase._prefetch_doc_generator(cursor, 2)
+    assert [next(docs), next(docs)] == [0, 1]
+    docs.close()
+    assert cursor.closed
+    assert cursor.fetches < 10
+
+
+def test_prefetch_doc_generator_raises_errors(fake_cursor):
+    cursor = fake_cursor([[1], [2], [3]], error_at=2)
+    docs = PAODatabase._prefetch_doc_generator(cursor, 2)
+    assert next(docs) == 1
+    with pytest.raises(CursorNextError):
+        list(docs)
+
+
+def test_read_through_cache_invalidated_by_writes(pao_db, mock_cursor):
+    pao_db.query_cache = PAOLRUQueryCache()
+    pao_db.db.aql.execute.side_effect = lambda *args, **kwargs: mock_cursor([{'_key': 'k1'}])
+    collection = pao_db.db.collection.return_value
+    collection.get.return_value = {'_key': 'k1'}
+
+    for i in range(3):
+        assert list(pao_db.get_by_attributes("foo", {"field_int": 1}, cache_ttl=60)) == [{'_key': 'k1'}]
+        assert pao_db.find_by_key("foo", "k1", cache_ttl=60) == {'_key': 'k1'}
+    assert pao_db.db.aql.execute.call_count == 1
+    assert collection.get.call_count == 1
+
+    pao_db.insert_doc("bar", {"_key": "k2"})
+    list(pao_db.get_by_attributes("foo", {"field_int": 1}, cache_ttl=60))
+    assert pao_db.db.aql.execute.call_count == 1
+
+    pao_db.remove_by_key("foo", "k1")
+    list(pao_db.get_by_attributes("foo", {"field_int": 1}, cache_ttl=60))
+    pao_db.find_by_key("foo", "k1", cache_ttl=60)
+    assert pao_db.db.aql.execute.call_count == 2
+    assert collection.get.call_count == 2
+    assert pao_db.cache_stats()['hits'] == 5
+
+
+class ReferenceQueryCache(PAOQueryCache):
+    """ Cache storing results by reference """
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, collection_name, key):
+        return self.entries.get((collection_name, key), CACHE_MISS)
+
+    def set(self, collection_name, key, value, ttl):
+        self.entries[(collection_name, key)] = value
+
+    def invalidate(self, collection_name):
+        self.entries = {k: v for k, v in self.entries.items() if k[0] != collection_name}
+
+    def clear(self):
+        self.entries = {}
+
+    def stats(self):
+        return {'entries': len(self.entries)}
+
+
+@pytest.mark.parametrize('query_cache', [PAOLRUQueryCache(), ReferenceQueryCache()])
+def test_cached_results_not_shared_with_callers(pao_db, mock_cursor, query_cache):
+    pao_db.query_cache = query_cache
+    pao_db.db.aql.execute.side_effect = lambda *args, **kwargs: mock_cursor([{'_key': 'k1'}])
+    pao_db.db.collection.return_value.get.return_value = {'_key': 'k1'}
+
+    for _ in range(2):
+        docs = list(pao_db.get_by_attributes("foo", {"field_int": 1}, cache_ttl=60))
+        assert docs == [{'_key': 'k1'}]
+        docs[0]['bar_edge'] = ['mutated']
+        doc = pao_db.find_by_key("foo", "k1", cache_ttl=60)
+        assert doc == {'_key': 'k1'}
+        doc['field_int'] = 2
+    assert pao_db.db.aql.execute.call_count == 1
+
+
+def test_query_hooks_and_slow_query_log(pao_db, fake_cursor):
+    pao_db.query_profiler = PAOQueryProfiler(slow_query_ms=0)
+    pao_db.db.aql.execute.side_effect = lambda *args, **kwargs: fake_cursor([[1, 2], [3]])
+    pao_db.db.aql.explain.return_value = {'nodes': [], 'estimatedCost': 3}
+    profiles = []
+    pao_db.add_query_hook(profiles.append)
+
+    assert list(pao_db.get_by_attributes('foo', {'field_int': 1})) == [1, 2, 3]
+    assert list(pao_db.get_by_attributes('foo', {'field_int': 2})) == [1, 2, 3]
+
+    assert [(p.batches, p.rows, p.execution_time, p.scanned_full) for p in profiles] == [(2, 3, 0.25, 5)] * 2
+    assert profiles[0].bind_var_shape == {'@collection': 'foo', 'lookup_filter_0': 'int'}
+    pao_db.db.aql.explain.assert_called_once()
+
+
+def test_query_executes_when_consumed(pao_db, fake_cursor):
+    pao_db.query_profiler = PAOQueryProfiler()
+    pao_db.db.aql.execute.side_effect = lambda *args, **kwargs: fake_cursor([[1, 2], [3]])
+    profiles = []
+    pao_db.add_query_hook(profiles.append)
+
+    docs = pao_db.get_by_attributes('foo', {'field_int': 1})
+    del docs
+    assert not pao_db.db.aql.execute.called and profiles == []
+
+    docs = pao_db.get_by_attributes('foo', {'field_int': 1})
+    assert next(docs) == 1
+    docs.close()
+    assert pao_db.db.aql.execute.call_count == 1 and len(profiles) == 1
+
+
+def test_related_vertices_traverse_edge_index(pao_db, mock_cursor):
+    pao_db.db.aql.execute.return_value = mock_cursor([{'_key': 'b1'}])
+
+    assert list(pao_db.get_related_vertices('foo', 'bar', {'_key': 'f1'})) == [{'_key': 'b1'}]
+    aql = pao_db.db.aql.execute.call_args.args[0]
+    assert 'FOR rel_doc IN 1..1 OUTBOUND doc @@edge_collection' in aql
+    assert pao_db.db.aql.execute.call_args.kwargs['bind_vars'] == {
+        '@collection': 'foo', '@edge_collection': 'foo__bar', 'lookup_filter_0': 'f1'
+    }
+
+
+def test_traverse(pao_db, mock_cursor):
+    pao_db.db.aql.execute.return_value = mock_cursor([{'edges': [], 'vertices': []}])
+
+    paths = pao_db.traverse(
+        'foo/f1', ['foo__bar', 'baz__foo'], depth=(1, 3), direction='any',
+        prune={'field_int': 0}, edge_filter={'active': True}, vertex_filter={'field_str': 'x'}, result='paths'
+    )
+
+    assert list(paths) == [{'edges': [], 'vertices': []}]
+    aql = pao_db.db.aql.execute.call_args.args[0]
+    assert 'FOR v, e, p IN @min_depth..@max_depth ANY @start @@edge_collection_0, @@edge_collection_1' in aql
+    assert 'PRUNE v.field_int == @prune_0' in aql
+    assert 'OPTIONS { uniqueVertices: "path" }' in aql
+    assert 'FILTER p.edges[*].active ALL == @edge_filter_0' in aql
+    assert 'FILTER v.field_str == @vertex_filter_0' in aql
+    assert 'RETURN p' in aql
+    assert pao_db.db.aql.execute.call_args.kwargs['bind_vars'] == {
+        'start': 'foo/f1', 'min_depth': 1, 'max_depth': 3, '@edge_collection_0': 'foo__bar',
+        '@edge_collection_1': 'baz__foo', 'prune_0': 0, 'edge_filter_0': True, 'vertex_filter_0': 'x'
+    }
+
+
+def test_traverse_graph(monkeypatch, pao_db, mock_cursor):
+    monkeypatch.setenv('PAO_GRAPH_NAME', 'test_graph')
+    pao_db.db.aql.execute.return_value = mock_cursor([])
+
+    list(pao_db.traverse('foo/f1'))
+    aql = pao_db.db.aql.execute.call_args.args[0]
+    assert 'OUTBOUND @start GRAPH @graph' in aql
+    assert 'PRUNE' not in aql and 'RETURN v' in aql
+    assert pao_db.db.aql.execute.call_args.kwargs['bind_vars']['graph'] == 'test_graph'
+
+
+def test_related_vertices_by_parent(pao_db, mock_cursor):
+    pao_db.db.aql.execute.return_value = mock_cursor([{'parent_id': 'foo/f1', 'related': [{'_key': 'b1'}]}])
+
+    assert pao_db.get_related_vertices_by_parent('foo__bar', ['foo/f1', 'foo/f2'], limit=2) == {
+        'foo/f1': [{'_key': 'b1'}]
+    }
+    assert 'LIMIT @limit' in pao_db.db.aql.execute.call_args.args[0]
+    assert pao_db.db.aql.execute.call_args.kwargs['bind_vars'] == {
+        '@edge_collection': 'foo__bar', 'parent_ids': ['foo/f1', 'foo/f2'], 'limit': 2
+    }
+
+
+def test_get_page_seeks_after_token(pao_db, mock_cursor):
+    pao_db.db.aql.execute.side_effect = [
+        mock_cursor([{'_key': 'a', 'field_int': 1}, {'_key': 'b', 'field_int': 1}, {'_key': 'c', 'field_int': 2}]),
+        mock_cursor([{'_key': 'c', 'field_int': 2}]),
+    ]
+
+    page = pao_db.get_page('foo', {'field_str': 'x'}, {'field_int': 'ASC'}, page_size=2)
+    assert [d['_key'] for d in page.items] == ['a', 'b']
+    assert pao_db.db.aql.execute.call_args.kwargs['bind_vars']['limit'] == 3
+
+    last_page = pao_db.get_page('foo', {'field_str': 'x'}, {'field_int': 'ASC'}, page_size=2, after=page.next_token)
+    assert [d['_key'] for d in last_page.items] == ['c'] and last_page.next_token is None
+    aql = pao_db.db.aql.execute.call_args.args[0]
+    assert 'FILTER (doc.field_int > @seek_filter_0) OR (doc.field_int == @seek_filter_0 AND doc._key > @seek_filter_1)' in aql
+    assert 'SORT doc.field_int ASC, doc._key ASC' in aql
+    bind_vars = pao_db.db.aql.execute.call_args.kwargs['bind_vars']
+    assert (bind_vars['seek_filter_0'], bind_vars['seek_filter_1']) == (1, 'b')
+
+    with pytest.raises(ValueError):
+        pao_db.get_page('foo', sort_key_dict={'field_int': 'ASC'}, after='not a token')
+
+
+def test_projections(pao_db, mock_cursor):
+    pao_db.db.aql.execute.side_effect = lambda *args, **kwargs: mock_cursor([{'_id': 'foo/f1', '_key': 'f1'}])
+
+    list(pao_db.get_by_attributes('foo', {'field_int': 1}, only=['field_str']))
+    assert ('RETURN { "_id": doc._id, "_key": doc._key, "_rev": doc._rev, "field_str": doc.field_str }'
+            in pao_db.db.aql.execute.call_args.args[0])
+
+    assert pao_db.find_by_key('foo', 'f1', exclude=['field_str']) == {'_id': 'foo/f1', '_key': 'f1'}
+    assert 'RETURN UNSET(doc, "field_str")' in pao_db.db.aql.execute.call_args.args[0]
+    pao_db.db.collection.assert_not_called()
+
+    docs = pao_db.find_by_keys('foo', ['missing', 'f1'], only=['field_int'])
+    assert docs == [None, {'_id': 'foo/f1', '_key': 'f1'}]
+    assert 'DOCUMENT(@handles)' in pao_db.db.aql.execute.call_args.args[0]
+    assert pao_db.db.aql.execute.call_args.kwargs['bind_vars'] == {'handles': ['foo/missing', 'foo/f1']}
+
+    with pytest.raises(ValueError):
+        pao_db.get_by_attributes('foo', only=['field_str'], exclude=['field_int'])
+
+
+def test_count_and_aggregate(pao_db, mock_cursor):
+    pao_db.db.collection.return_value.count.return_value = 42
+    pao_db.db.aql.execute.side_effect = [
+        mock_cursor([3]),
+        mock_cursor([{'field_str': 'a', 'max_int': 5, 'count': 2}]),
+    ]
+
+    assert pao_db.count('foo') == 42
+    pao_db.db.aql.execute.assert_not_called()
+
+    assert pao_db.count('foo', {'field_int': 1}) == 3
+    assert 'COLLECT WITH COUNT INTO count' in pao_db.db.aql.execute.call_args.args[0]
+
+    rows = pao_db.aggregate('foo', {'field_int': 1}, ['field_str'], {'max_int': ('max', 'field_int')})
+    assert rows == [{'field_str': 'a', 'max_int': 5, 'count': 2}]
+    assert 'AGGREGATE metric_1 = MAX(doc.field_int), count = LENGTH(1)' in pao_db.db.aql.execute.call_args.args[0]
+
+    with pytest.raises(ValueError):
+        pao_db.aggregate('foo', metrics={'count': ('count', 'field_int')})
+    with pytest.raises(ValueError):
+        pao_db.aggregate('foo', metrics={'median': ('median', 'field_int')})
+
+
+def test_transaction_commits_or_aborts(pao_db):
+    pao_db.query_cache = PAOLRUQueryCache()
+    base_db = pao_db.db
+    transaction_db = base_db.begin_transaction.return_value
+
+    with pao_db.transaction(write=['foo'], lock_timeout=5) as tx:
+        assert tx is transaction_db and pao_db.db is transaction_db
+        with pao_db.transaction(write=['bar']) as nested:
+            assert nested is transaction_db
+        pao_db.insert_doc('foo', {'_key': 'f1'})
+    transaction_db.collection.assert_called_with('foo')
+    transaction_db.commit_transaction.assert_called_once()
+    assert base_db.begin_transaction.call_count == 1
+    assert base_db.begin_transaction.call_args.kwargs['write'] == ['foo']
+    assert base_db.begin_transaction.call_args.kwargs['lock_timeout'] == 5
+    assert pao_db.db is base_db
+
+    with pytest.raises(ValueError):
+        with pao_db.transaction(write=['foo']):
+            raise ValueError("rollback")
+    transaction_db.abort_transaction.assert_called_once()
+    transaction_db.commit_transaction.assert_called_once()
+    assert pao_db.db is base_db
+
+
+def test_insert_edges_streams_chunks(pao_db):
+    collection = pao_db.db.collection.return_value
+    collection.import_bulk.side_effect = lambda chunk, **kwargs: {'created': len(chunk), 'ignored': 0}
+    pairs = ((f"f{i}", f"bar/b{i}") for i in range(5))
+
+    reports = pao_db.insert_edges('foo', 'bar', pairs, attrs={'weight': 1}, batch_size=2, on_duplicate='ignore')
+
+    assert [r['created'] for r in reports] == [2, 2, 1]
+    pao_db.db.collection.assert_called_with('foo__bar')
+    first_chunk = collection.import_bulk.call_args_list[0].args[0]
+    assert first_chunk[0] == {'weight': 1, '_from': 'foo/f0', '_to': 'bar/b0'}
+    assert collection.import_bulk.call_args.kwargs['on_duplicate'] == 'ignore'
+
+
+def test_execute_passes_options_to_driver(mocker, pao_db):
+    executor = mocker.MagicMock()
+    pao_db.db.aql = AQL(mocker.MagicMock(), executor)
+
+    pao_db._execute(pao_db._compile_count('foo', None), batch_size=10, stream=True)
+
+    request = executor.execute.call_args.args[0]
+    assert request.data['batchSize'] == 10 and request.data['options']['stream'] is True
+    assert 'usePlanCache' not in request.data.get('options', {})
+
+
+def test_plan_cache_requires_driver_support(monkeypatch):
+    for name, value in [('PAO_APP_DB_NAME', 'app'), ('PAO_DB_ROOT_USER', 'root'), ('PAO_DB_ROOT_PASS', 'pass')]:
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv('PAO_DB_USE_PLAN_CACHE', 'true')
+    monkeypatch.setattr('python_arango_ogm.db.pao_database.AQL_PLAN_CACHE_SUPPORTED', False)
+
+    with pytest.raises(ValueError, match='use_plan_cache'):
+        PAODatabase()
+
+
+def test_databases_have_own_profilers():
+    first, second = PAODatabase.__new__(PAODatabase), PAODatabase.__new__(PAODatabase)
+    PAODBBase.__init__(first, slow_query_ms=5)
+    PAODBBase.__init__(second)
+
+    assert first.query_profiler is not second.query_profiler
+    assert first.query_profiler.slow_query_ms == 5 and PAODBBase.query_profiler is None
+
+
+def test_read_only_queries_retried(mocker, pao_db, mock_cursor):
+    unavailable = lambda: AQLQueryExecuteError(mocker.MagicMock(status_code=503), mocker.MagicMock())
+    pao_db.db.aql.execute.side_effect = [unavailable(), unavailable(), mock_cursor([{'_key': 'k1'}])]
+    assert list(pao_db.get_by_attributes('foo', {'field_int': 1})) == [{'_key': 'k1'}]
+    assert pao_db.db.aql.execute.call_count == 3
+
+    pao_db.db.aql.execute.side_effect = [unavailable(), mock_cursor([{'inserted': True, 'count': 1}])]
+    with pytest.raises(AQLQueryExecuteError):
+        pao_db.upsert_docs('foo', [{'field_str': 'a'}], ['field_str'])
@@ -0,0 +1,47 @@
+from python_arango_ogm.db.pao_index_advisor import PAOIndexAdvisor
+from python_arango_ogm.db.pao_query_shapes import PAOQueryShapeLog, QueryShape
+from python_arango_ogm.db.tests.models import BarModel, FooModel
+
+
+def test_query_shape_log(tmp_path):
+    path = tmp_path / "shapes.jsonl"
+    shape_log = PAOQueryShapeLog(str(path))
+    shape_log.record('foo', {'field_str': 'a', 'field_int': 1}, {'created_at': 'desc'})
+    shape_log.record('foo', {'field_int': 2, 'field_str': 'b'}, {'created_at': 'DESC'})
+    shape_log.record('bar')
+
+    assert PAOQueryShapeLog.load(str(path)) == [
+        QueryShape('foo', ('field_int', 'field_str'), (('created_at', 'DESC'),)),
+        QueryShape('bar'),
+    ]
+    # Shapes already in the file are not appended again:
+    PAOQueryShapeLog(str(path)).record('bar')
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_advise_full_scan_and_sort(mocker, pao_db):
+    pao_db.query_shape_log = mocker.MagicMock()
+    pao_db.db.aql.explain.side_effect = [
+        {'nodes': [{'type': 'EnumerateCollectionNode', 'collection': 'foo'}, {'type': 'SortNode'}]},
+        {'nodes': [{'type': 'IndexNode', 'collection': 'bar', 'indexes': [{'name': 'field_int_idx'}]}]},
+    ]
+    advisor = PAOIndexAdvisor(pao_db, {'FooModel': FooModel, 'BarModel': BarModel})
+
+    foo_shape = QueryShape(FooModel.collection_name(), ('field_str',), (('field_int', 'ASC'),))
+    bar_shape = QueryShape(BarModel.collection_name(), ('field_int',))
+    foo_advice, bar_advice = advisor.advise([foo_shape, bar_shape, foo_shape])
+
+    assert foo_advice.full_scan and foo_advice.in_memory_sort
+    assert foo_advice.declared_indexes == ['field_str_idx']
+    assert foo_advice.suggested_fields == ['field_str', 'field_int']
+    assert ".add_persistent_index(name='field_str_field_int_idx', fields=['field_str', 'field_int'], unique=False)" \
+           in foo_advice.migration
+    assert not bar_advice.full_scan and bar_advice.migration is None
+    pao_db.query_shape_log.record.assert_not_called()
+    assert bar_advice.indexes_used == ['field_int_idx']
+    assert 'full collection scan; in-memory sort' in advisor.format_report([foo_advice, bar_advice])
+
+
+def test_suggested_fields_mixed_sort_directions():
+    shape = QueryShape('foo', ('field_int',), (('field_str', 'ASC'), ('created_at', 'DESC')))
+    assert PAOIndexAdvisor.suggested_fields(shape) == ['field_int']
@@ -0,0 +1,87 @@
+import asyncio
+import uuid
+
+import pytest
+
+from python_arango_ogm.db.pao_keys import KeyStrategyEnum, PAOKeyGenerator
+from python_arango_ogm.db.pao_migration_builder import PAOMigrationBuilder
+from python_arango_ogm.db.tests.models import FooModel
+
+
+def test_ulid_keys_are_ordered():
+    generator = PAOKeyGenerator(KeyStrategyEnum.ULID)
+    keys = generator.new_keys(1000) + [generator.new_key() for _ in range(10)]
+    assert len(set(keys)) == len(keys)
+    assert sorted(keys) == keys
+    assert all(len(k) == 26 for k in keys)
+
+
+def test_uuid7_keys_are_ordered():
+    generator = PAOKeyGenerator(KeyStrategyEnum.UUID7)
+    keys = generator.new_keys(100) + generator.new_keys(100)
+    assert sorted(keys) == keys
+    assert {(uuid.UUID(k).version, uuid.UUID(k).variant) for k in keys} == {(7, uuid.RFC_4122)}
+
+
+def test_server_strategies_not_generated():
+    with pytest.raises(ValueError):
+        PAOKeyGenerator(KeyStrategyEnum.PADDED)
+    assert KeyStrategyEnum.PADDED.collection_options() == {'key_generator': 'padded'}
+    assert KeyStrategyEnum.TRADITIONAL.collection_options() == {}
+    assert KeyStrategyEnum.ULID.collection_options() == {}
+
+
+def test_model_add_keys(monkeypatch):
+    docs = [{'_key': 'given'}, {'field_int': 1}, {'field_int': 2}]
+    assert list(FooModel.add_keys(docs)) == docs
+
+    monkeypatch.setattr(FooModel, 'KEY_STRATEGY', KeyStrategyEnum.ULID)
+    keyed = list(FooModel.add_keys(docs, chunk_size=2))
+    assert keyed[0]['_key'] == 'given'
+    assert keyed[1]['_key'] < keyed[2]['_key']
+    assert '_key' not in docs[1]
+
+    monkeypatch.setattr(FooModel, 'KEY_STRATEGY', KeyStrategyEnum.NATURAL)
+    assert FooModel.add_key({'_key': 'k1'}) == {'_key': 'k1'}
+    with pytest.raises(ValueError):
+        FooModel.add_key({'field_int': 1})
+
+
+def test_async_insert_and_upsert_add_keys(mocker, monkeypatch):
+    async_db = mocker.patch.object(FooModel, 'async_db')
+    async_db.insert_doc = mocker.AsyncMock()
+    async_db.upsert_doc = mocker.AsyncMock()
+
+    monkeypatch.setattr(FooModel, 'KEY_STRATEGY', KeyStrategyEnum.ULID)
+    asyncio.run(FooModel.insert_async({'field_int': 1}))
+    asyncio.run(FooModel.upsert_async({'field_int': 1}, lookup_keys=['field_int']))
+    asyncio.run(FooModel.upsert_async({'_key': 'k1'}))
+    assert len(async_db.insert_doc.call_args.args[1]['_key']) == 26
+    upserted = [c.args[3] for c in async_db.upsert_doc.call_args_list]
+    assert len(upserted[0]['_key']) == 26 and '_key' not in upserted[1]
+
+    monkeypatch.setattr(FooModel, 'KEY_STRATEGY', KeyStrategyEnum.NATURAL)
+    with pytest.raises(ValueError):
+        asyncio.run(FooModel.insert_async({'field_int': 1}))
+    with pytest.raises(ValueError):
+        asyncio.run(FooModel.upsert_async({'field_int': 1}, lookup_keys=['field_int']))
+    assert async_db.insert_doc.call_count == 1
+
+
+def test_upsert_many_adds_keys(mocker, monkeypatch):
+    db = mocker.patch.object(FooModel, 'db')
+    db.upsert_docs.side_effect = lambda collection_name, docs, *args, **kwargs: list(docs)
+
+    monkeypatch.setattr(FooModel, 'KEY_STRATEGY', KeyStrategyEnum.ULID)
+    upserted = FooModel.upsert_many([{'field_str': 'a'}, {'_key': 'k1', 'field_str': 'b'}], ['field_str'])
+    assert len(upserted[0]['_key']) == 26 and upserted[1]['_key'] == 'k1'
+
+    monkeypatch.setattr(FooModel, 'KEY_STRATEGY', KeyStrategyEnum.NATURAL)
+    with pytest.raises(ValueError):
+        FooModel.upsert_many([{'field_str': 'a'}], ['field_str'])
+
+
+def test_migration_key_options():
+    builder = PAOMigrationBuilder.__new__(PAOMigrationBuilder)
+    mig_text, _ = builder._build_migration_file_text('foo', 'foo_collection', {}, [], [], key_strategy=KeyStrategyEnum.PADDED)
+    assert "db.create_collection('foo', FOO_SCHEMA, key_generator='padded')" in mig_text
@@ -21,6 +21,21 @@ def test_simple_migration_builder():
         # shutil.rmtree(migrator_builder.migration_pathname)
 
 
+def test_graph_migration_adds_unique_edge_index():
+    migration_builder = PAOMigrationBuilder.__new__(PAOMigrationBuilder)
+    mig_text = migration_builder._build_graph_migration_text([
+        {'edge_collection': 'foo__bar', 'from_vertex_collections': ['foo'], 'to_vertex_collections': ['bar'],
+         'unique': True},
+        {'edge_collection': 'baz__foo', 'from_vertex_collections': ['baz'], 'to_vertex_collections': ['foo'],
+         'unique': False},
+    ], 'test_graph')
+
+    assert "'unique'" not in mig_text
+    assert ("db.collection('foo__bar').add_persistent_index(name='foo__bar_from_to_idx', "
+            "fields=['_from', '_to'], unique=True)") in mig_text
+    assert "baz__foo_from_to_idx" not in mig_text
+
+
 if __name__ == '__main__':
     test_simple_migration_builder()
 
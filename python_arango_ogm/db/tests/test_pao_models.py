@@ -1,4 +1,9 @@
+import pytest
+
 from python_arango_ogm.db.tests.database import use_database
+from python_arango_ogm.db.pao_db_base import Page
+from python_arango_ogm.db.pao_model import PAOModel, Prefetch
+from python_arango_ogm.db.pao_result_set import PAOResultSet
 from python_arango_ogm.db.tests.models import FooModel, BarModel, BazModel
 
 
@@ -33,6 +38,216 @@ def test_model_marshalling():
         assert len(foos) == 10
 
 
+def test_model_transaction():
+    with use_database() as db:
+        with db.transaction(write=[FooModel.collection_name()]):
+            FooModel.insert({"field_str": "foo_0", "field_int": 0})
+            assert FooModel.find_by_attributes({"field_str": "foo_0"}).field_int == 0
+
+        with pytest.raises(ValueError):
+            with db.transaction(write=[FooModel.collection_name()]):
+                FooModel.insert({"field_str": "foo_1", "field_int": 1})
+                raise ValueError("abort")
+
+        assert [f.field_str for f in FooModel.all(sort_fields={"field_str": "ASC"})] == ["foo_0"]
+
+
+def test_model_cursor_streaming():
+    with use_database() as db:
+        db.insert_docs(FooModel.collection_name(), ({"field_str": f"foo_{i:02}", "field_int": i} for i in range(25)))
+
+        foos = FooModel.all(sort_fields={"field_str": "ASC"}, cursor_options={'batch_size': 10})
+        assert foos.count() == 25
+        assert [[f.field_int for f in c] for c in foos.iter_chunks(10)] == [
+            list(range(10)), list(range(10, 20)), list(range(20, 25))
+        ]
+        assert FooModel.all(sort_fields={"field_str": "DESC"}, cursor_options={'batch_size': 10}).first().field_int == 24
+
+
+def test_model_registry(mocker):
+    dir_spy = mocker.patch('python_arango_ogm.db.pao_model.dir', create=True, side_effect=dir)
+
+    assert list(FooModel.get_field_defs()) == ['field_int', 'field_str']
+    assert list(FooModel.get_edge_defs()) == ['bar_edge'] and FooModel.is_field('bar_edge')
+    assert FooModel.collection_name() == 'foo' and FooModel.get_indexes() == {}
+    assert FooModel.add_timestamps({'a': 1}, created=True) == {'a': 1}
+    assert not dir_spy.called
+    with pytest.raises(TypeError):
+        FooModel.get_fields()['field_int'] = None
+
+
+def test_find_by_keys_marshals_by_collection(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    db.find_by_keys.return_value = [
+        {'_id': 'foo/f1', '_key': 'f1'}, None, {'_id': 'bar/b1', '_key': 'b1'}, {'_id': 'other/o1', '_key': 'o1'}
+    ]
+
+    foo, missing, bar, other = FooModel.find_by_keys(['f1', 'missing', 'bar/b1', 'other/o1'], only=['field_int'])
+
+    assert isinstance(foo, FooModel) and not foo.is_loaded('field_str')
+    assert missing is None
+    assert isinstance(bar, BarModel) and not isinstance(bar, FooModel) and not bar.is_loaded('field_str')
+    assert other == {'_id': 'other/o1', '_key': 'o1'}
+
+
+def test_result_set_marshals_lazily(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    rows = iter([{'_key': f"f{i}"} for i in range(5)])
+    db.get_by_attributes.return_value = rows
+    db.count.return_value = 5
+
+    foos = FooModel.get_by_attributes({'field_int': 1})
+
+    assert foos.exists() and next(rows)['_key'] == 'f1'
+    assert foos.count() == 5 and db.count.call_args.args[:2] == ('foo', {'field_int': 1})
+    assert [[f._key for f in c] for c in foos.iter_chunks(2)] == [['f0', 'f2'], ['f3', 'f4']]
+    assert foos
+    with pytest.raises(RuntimeError):
+        foos.first()
+
+    db.get_by_attributes.return_value = iter([{'_key': 'f0'}, {'_key': 'f1'}])
+    assert FooModel.all(None).first()._key == 'f0'
+    db.get_by_attributes.return_value = iter([])
+    assert FooModel.all(None).first() is None
+
+
+def test_result_set_counts_only_when_asked():
+    counts = []
+    count = lambda: counts.append(1) or 3
+
+    assert list(PAOResultSet(iter([{'n': 1}, {'n': 2}]), count=count)) == [{'n': 1}, {'n': 2}]
+    assert len(PAOResultSet(iter([{'n': 1}]), count=count)) == 1
+    assert counts == []
+    assert PAOResultSet(iter([]), count=count).count() == 3 and counts == [1]
+
+    result_set = PAOResultSet(iter([]))
+    assert list(result_set) == [] and not result_set
+
+
+def test_save_sends_changed_attributes(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    db.update_doc.return_value = {'_key': 'f1', '_rev': 'r2'}
+    foo = FooModel.marshall_row({'_key': 'f1', '_rev': 'r1', 'field_int': 1, 'field_str': 'a'})
+
+    assert not foo.save() and not db.update_doc.called
+    foo.field_int = 2
+    foo.note = 'n'
+    foo.bar_edge = []
+    assert foo.changes() == {'field_int': 2, 'note': 'n'}
+    assert foo.save(check_rev=True)
+
+    assert db.update_doc.call_args.args == ('foo', 'f1', {'field_int': 2, 'note': 'n', '_key': 'f1'})
+    assert db.update_doc.call_args.kwargs == {'rev': 'r1', 'return_new': False}
+    assert foo._rev == 'r2' and foo.changes() == {}
+
+
+def test_changes_tracked_once_loaded():
+    record = object.__new__(FooModel.record_class())
+    record.field_int = 1
+    assert record.changes() == {} and record.field_int == 1
+
+    record._loaded = True
+    record.field_str = 'a'
+    assert record.changes() == {'field_str': 'a'}
+
+
+def test_save_all_batches_per_collection(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    db.update_docs.side_effect = lambda name, docs, **kwargs: [{'_key': d['_key'], '_rev': 'r2'} for d in docs][:1]
+    foos = FooModel.marshall_rows([{'_key': 'f1'}, {'_key': 'f2'}, {'_key': 'f3'}])
+    bar = BarModel.marshall_row({'_key': 'b1'})
+    for record in [*foos[:2], bar]:
+        record.field_int = 5
+
+    results = PAOModel.save_all([*foos, bar])
+
+    assert [c.args for c in db.update_docs.call_args_list] == [
+        ('foo', [{'field_int': 5, '_key': 'f1'}, {'field_int': 5, '_key': 'f2'}]),
+        ('bar', [{'field_int': 5, '_key': 'b1'}])
+    ]
+    assert list(results) == ['foo', 'bar']
+    assert foos[0].changes() == {} and foos[1].changes() == {'field_int': 5}
+
+
+def test_traverse_from_key(mocker):
+    db = mocker.patch.object(FooModel, 'db')
+    db.traverse.return_value = iter([{'_key': 'b1', 'field_int': 1}])
+
+    bars = list(FooModel.traverse('f1', edge_defs=[FooModel.bar_edge]))
+
+    assert [b.field_int for b in bars] == [1]
+    assert db.traverse.call_args.args[:2] == ('foo/f1', ['foo__bar'])
+    assert FooModel._start_id('bar/b1') == 'bar/b1'
+
+
+def test_prefetch_related_nested(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    db.get_by_attributes.return_value = iter([{'_id': 'baz/z1'}, {'_id': 'baz/z2'}])
+    db.get_related_vertices_by_parent.side_effect = [
+        {'baz/z1': [{'_id': 'foo/f1'}, {'_id': 'foo/f2'}], 'baz/z2': [{'_id': 'foo/f1'}]},
+        {'foo/f1': [{'_id': 'bar/b1', 'field_int': 1}]},
+    ]
+
+    prefetch = [Prefetch('foo_edge.bar_edge', limit=5)]
+    bazs = BazModel.get_by_attributes({'field_int': 1}, prefetch_related=prefetch).to_list()
+
+    assert [[f._id for f in b.foo_edge] for b in bazs] == [['foo/f1', 'foo/f2'], ['foo/f1']]
+    assert [b.field_int for b in bazs[1].foo_edge[0].bar_edge] == [1]
+    assert bazs[0].foo_edge[1].bar_edge == []
+    calls = db.get_related_vertices_by_parent.call_args_list
+    assert calls[0].args == ('baz__foo', ['baz/z1', 'baz/z2'], None)
+    assert calls[1].args == ('foo__bar', ['foo/f1', 'foo/f2'], 5)
+
+
+def test_iter_pages(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    db.get_page.side_effect = [Page([{'_key': 'a'}], 't1'), Page([{'_key': 'b'}], None)]
+
+    pages = list(FooModel.iter_pages({'field_int': 1}, page_size=1))
+
+    assert [[r._key for r in p.items] for p in pages] == [['a'], ['b']]
+    assert [c.args[4] for c in db.get_page.call_args_list] == [None, 't1']
+
+
+def test_projection_marks_unloaded_fields(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    db.get_by_attributes.return_value = iter([{'_key': 'f1', 'field_str': 'x'}])
+
+    foos = FooModel.get_by_attributes({'field_int': 1}, only=['field_str'])
+
+    assert db.get_by_attributes.call_args.kwargs['only'] == ['field_str']
+    assert foos[0].is_loaded('field_str')
+    assert not foos[0].is_loaded('field_int')
+    assert FooModel.unloaded_fields(exclude=['field_str']) == {'field_str'}
+    assert FooModel.marshall_row({'_key': 'f1'}).is_loaded('field_int')
+
+
+def test_insert_edges_from_records(mocker):
+    db = mocker.patch.object(PAOModel, 'db')
+    foo = FooModel.marshall_row({'_key': 'f1'})
+
+    FooModel.bar_edge.insert_edges([(foo, 'b1'), ('f2', 'b2')], batch_size=10)
+
+    args, kwargs = db.insert_edges.call_args
+    assert args[:2] == ('foo', 'bar') and list(args[2]) == [('f1', 'b1'), ('f2', 'b2')]
+    assert kwargs == {'batch_size': 10, 'on_duplicate': 'error'}
+
+
+def test_marshall_row_into_record():
+    foo = FooModel.marshall_row({'_key': 'f1', 'field_int': 1, 'extra': 'x'}, frozenset({'field_str'}))
+
+    assert isinstance(foo, FooModel) and isinstance(foo, PAOModel)
+    assert type(foo) is FooModel.record_class() and not hasattr(foo, '__dict__')
+    assert (foo._key, foo._id, foo.field_int, foo.field_str, foo.extra) == ('f1', None, 1, None, 'x')
+    assert not foo.is_loaded('field_str')
+    assert foo.bar_edge is FooModel.bar_edge and foo.collection_name() == 'foo'
+    assert foo.to_dict()['extra'] == 'x'
+    assert FooModel.marshall_rows([{'_key': 'f2'}])[0]._extra is None
+    full = {'_id': 'foo/f3', '_key': 'f3', '_rev': 'r', 'field_int': 3, 'field_str': 's'}
+    assert FooModel.marshall_row(full)._extra is None
+    assert FooModel.marshall_row({**full, 'extra': 'y'}).to_dict() == {**full, 'extra': 'y'}
+
+
 if __name__ == '__main__':
     test_model_marshalling()
     # test_migrator_idempotency()
@@ -0,0 +1,47 @@
+from python_arango_ogm.db.pao_query_cache import CACHE_MISS, PAOLRUQueryCache
+
+
+def test_lru_eviction():
+    cache = PAOLRUQueryCache(max_entries=2)
+    cache.set('foo', 'a', {'n': 1}, ttl=60)
+    cache.set('foo', 'b', {'n': 2}, ttl=60)
+    assert cache.get('foo', 'a') == {'n': 1}
+    cache.set('bar', 'c', None, ttl=60)
+
+    assert cache.get('foo', 'b') is CACHE_MISS
+    assert cache.get('foo', 'a') == {'n': 1}
+    assert cache.get('bar', 'c') is None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_bytes_bound_and_copies():
+    cache = PAOLRUQueryCache(max_entries=10, max_bytes=20)
+    cache.set('foo', 'a', ['x' * 10], ttl=60)
+    cache.set('foo', 'b', ['y' * 10], ttl=60)
+    cache.set('foo', 'big', ['z' * 40], ttl=60)
+
+    assert cache.get('foo', 'a') is CACHE_MISS
+    assert cache.get('foo', 'big') is CACHE_MISS
+    docs = cache.get('foo', 'b')
+    docs.append('mutated')
+    assert cache.get('foo', 'b') == ['y' * 10]
+    assert cache.stats()['bytes'] <= 20
+
+
+def test_ttl_and_invalidation(mocker):
+    monotonic = mocker.patch('python_arango_ogm.db.pao_query_cache.time.monotonic', return_value=100.0)
+    cache = PAOLRUQueryCache()
+    cache.set('foo', 'a', 1, ttl=10)
+    cache.set('foo', 'b', 2, ttl=60)
+    cache.set('bar', 'a', 3, ttl=60)
+
+    monotonic.return_value = 120.0
+    assert cache.get('foo', 'a') is CACHE_MISS
+    cache.invalidate('foo')
+    assert cache.get('foo', 'b') is CACHE_MISS
+    assert cache.get('bar', 'a') == 3
+
+    stats = cache.stats()
+    assert stats == {
+        'hits': 1, 'misses': 2, 'evictions': 0, 'expirations': 1, 'invalidations': 1, 'entries': 1, 'bytes': 1
+    }
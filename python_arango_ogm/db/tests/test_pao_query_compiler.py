@@ -0,0 +1,116 @@
+import pytest
+
+from python_arango_ogm.db.pao_queries import PAOQueries
+from python_arango_ogm.db.pao_query_compiler import Clause, ClauseTypeEnum, PAOQueryCompiler
+
+
+def test_lookup_uses_bind_vars():
+    compiler = PAOQueryCompiler()
+    query = compiler.compile(
+        PAOQueries.AQL_QUERY_BY_ATTRS,
+        bind_vars={'@collection': 'foo'},
+        lookup_filter=Clause(ClauseTypeEnum.FILTER, {"field_str": "foo's", "field_int": 3}),
+        sort_by=Clause(ClauseTypeEnum.SORT, {"field_str": "ASC"}),
+        projection=Clause(ClauseTypeEnum.PROJECTION, None)
+    )
+    assert "foo's" not in query.aql
+    assert "FILTER doc.field_int == @lookup_filter_0 AND doc.field_str == @lookup_filter_1" in query.aql
+    assert "SORT doc.field_str ASC" in query.aql
+    assert query.bind_vars == {'@collection': 'foo', 'lookup_filter_0': 3, 'lookup_filter_1': "foo's"}
+
+
+def test_template_is_stable_and_cached():
+    compiler = PAOQueryCompiler(cache_size=2)
+    queries = [
+        compiler.compile(
+            PAOQueries.AQL_QUERY_BY_ATTRS,
+            lookup_filter=Clause(ClauseTypeEnum.FILTER, lookup),
+            sort_by=Clause(ClauseTypeEnum.SORT, None),
+            projection=Clause(ClauseTypeEnum.PROJECTION, None)
+        )
+        for lookup in [{"a": 1, "b": 2}, {"b": 3, "a": 4}, {"a": 5, "b": 6}]
+    ]
+    assert len({q.aql for q in queries}) == 1
+    cache_info = compiler.cache_info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 2
+
+
+def test_literals_are_inlined():
+    compiler = PAOQueryCompiler()
+    query = compiler.compile(
+        PAOQueries.AQL_INSERT_DOC,
+        insert_attrs=Clause(ClauseTypeEnum.ATTRS, {"name": "x", "created_at": "`DATE_NOW()`"})
+    )
+    assert '"created_at": DATE_NOW(), "name": @insert_attrs_1' in query.aql
+    assert query.bind_vars == {'insert_attrs_1': "x"}
+
+
+def test_attribute_names_are_escaped():
+    assert PAOQueryCompiler.attribute_path('doc', 'a.b') == 'doc.a.b'
+    assert PAOQueryCompiler.attribute_path('doc', 'some field') == 'doc["some field"]'
+
+
+def test_invalid_sort():
+    compiler = PAOQueryCompiler()
+    with pytest.raises(ValueError):
+        compiler.compile(PAOQueries.AQL_QUERY_BY_ATTRS, sort_by=Clause(ClauseTypeEnum.SORT, {"a": "UP"}))
+
+
+def test_seek_filter():
+    compiler = PAOQueryCompiler()
+    query = compiler.compile(
+        PAOQueries.AQL_QUERY_PAGE,
+        bind_vars={'@collection': 'foo', 'limit': 11},
+        lookup_filter=Clause(ClauseTypeEnum.FILTER, {}),
+        seek_filter=Clause(ClauseTypeEnum.SEEK, {'field_int': ('DESC', 3), '_key': ('DESC', 'k1')}),
+        sort_by=Clause(ClauseTypeEnum.SORT, {'field_int': 'DESC', '_key': 'DESC'}),
+        projection=Clause(ClauseTypeEnum.PROJECTION, None)
+    )
+    assert ("FILTER (doc.field_int < @seek_filter_0) OR "
+            "(doc.field_int == @seek_filter_0 AND doc._key < @seek_filter_1)") in query.aql
+    assert "SORT doc.field_int DESC, doc._key DESC" in query.aql
+    assert query.bind_vars == {'@collection': 'foo', 'limit': 11, 'seek_filter_0': 3, 'seek_filter_1': 'k1'}
+
+
+def test_projection():
+    compiler = PAOQueryCompiler()
+    keep = compiler.compile(
+        PAOQueries.AQL_QUERY_BY_ATTRS,
+        lookup_filter=Clause(ClauseTypeEnum.FILTER, {}),
+        sort_by=Clause(ClauseTypeEnum.SORT, {}),
+        projection=Clause(ClauseTypeEnum.PROJECTION, {'_key': True, 'field_str': True})
+    )
+    assert 'RETURN doc' in compiler.compile(
+        PAOQueries.AQL_QUERY_BY_HANDLES, projection=Clause(ClauseTypeEnum.PROJECTION, None)
+    ).aql
+    assert 'RETURN { "_key": doc._key, "field_str": doc.field_str }' in keep.aql
+
+    unset = compiler.compile(
+        PAOQueries.AQL_QUERY_BY_ATTRS,
+        lookup_filter=Clause(ClauseTypeEnum.FILTER, {}),
+        sort_by=Clause(ClauseTypeEnum.SORT, {}),
+        projection=Clause(ClauseTypeEnum.PROJECTION, {'bio': False})
+    )
+    assert 'RETURN UNSET(doc, "bio")' in unset.aql
+
+    with pytest.raises(ValueError):
+        compiler.compile(
+            PAOQueries.AQL_QUERY_BY_ATTRS, projection=Clause(ClauseTypeEnum.PROJECTION, {'a': True, 'b': False})
+        )
+
+
+def test_aggregate():
+    compiler = PAOQueryCompiler()
+    query = compiler.compile(
+        PAOQueries.AQL_AGGREGATE,
+        bind_vars={'@collection': 'foo'},
+        lookup_filter=Clause(ClauseTypeEnum.FILTER, {'field_int': 1}),
+        aggregate=Clause(ClauseTypeEnum.AGGREGATE, {'field_str': (None, 'field_str'), 'total': ('SUM', 'price')})
+    )
+    assert "COLLECT group_0 = doc.field_str AGGREGATE metric_1 = SUM(doc.price), count = LENGTH(1)" in query.aql
+    assert 'RETURN { "field_str": group_0, "total": metric_1, "count": count }' in query.aql
+    assert query.bind_vars == {'@collection': 'foo', 'lookup_filter_0': 1}
+
+    with pytest.raises(ValueError):
+        compiler.compile(PAOQueries.AQL_AGGREGATE, aggregate=Clause(ClauseTypeEnum.AGGREGATE, {'x': ('SUM()', 'a')}))
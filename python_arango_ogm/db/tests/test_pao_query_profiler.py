@@ -0,0 +1,40 @@
+from python_arango_ogm.db.pao_query_compiler import CompiledQuery
+from python_arango_ogm.db.pao_query_profiler import PAOQueryProfiler
+
+QUERY = CompiledQuery("FOR d IN @@collection FILTER d.x == @x RETURN d", {'@collection': 'foo', 'x': 1})
+
+
+def test_hooks_receive_profile(mocker):
+    profiler = PAOQueryProfiler()
+    hook = mocker.MagicMock()
+    failing_hook = mocker.MagicMock(side_effect=ValueError("hook failed"))
+    profiler.add_hook(failing_hook)
+    profiler.add_hook(hook)
+
+    run = profiler.start(QUERY)
+    run.add_batch(2)
+    run.add_batch(1)
+    profile = profiler.finish(run, {'executionTime': 0.5, 'scannedFull': 10, 'filtered': 7, 'peakMemoryUsage': 32})
+
+    hook.assert_called_once_with(profile)
+    assert profile.bind_var_shape == {'@collection': 'foo', 'x': 'int'}
+    assert (profile.batches, profile.rows) == (2, 3)
+    assert (profile.execution_time, profile.scanned_full, profile.scanned_index) == (0.5, 10, None)
+    assert (profile.filtered, profile.peak_memory) == (7, 32)
+
+    profiler.remove_hook(hook)
+    profiler.finish(profiler.start(QUERY))
+    hook.assert_called_once()
+
+
+def test_slow_query_plan_cached():
+    profiler = PAOQueryProfiler(slow_query_ms=10)
+    run = profiler.start(QUERY)
+    assert not profiler.is_slow(profiler.finish(run))
+
+    run.wall_time = 0.02
+    profile = profiler.finish(run)
+    assert profiler.needs_plan(profile)
+    profiler.log_slow_query(profile, {'nodes': [{'type': 'EnumerateCollectionNode', 'collection': 'foo'}]})
+    assert profiler.is_slow(profile)
+    assert not profiler.needs_plan(profile)
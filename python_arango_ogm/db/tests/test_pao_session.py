@@ -0,0 +1,42 @@
+def test_session_buffers_and_flushes_vertices_first(mocker, pao_db):
+    collections = {}
+    pao_db.db.collection.side_effect = lambda name: collections.setdefault(name, mocker.MagicMock(name=name))
+    imports = []
+
+    def import_bulk(name):
+        def _import(docs, **kwargs):
+            imports.append((name, len(docs)))
+            return {'created': len(docs) - 1, 'errors': 1, 'details': ['bad doc']}
+        return _import
+
+    with pao_db.session(flush_every=5) as session:
+        for name in ['foo__bar', 'foo', 'bar']:
+            pao_db.db.collection(name).import_bulk.side_effect = import_bulk(name)
+        assert pao_db.insert_doc('foo', {'_key': 'f1'}) == {'_key': 'f1'}
+        pao_db.insert_edge('foo', 'bar', 'f1', 'b1')
+        pao_db.insert_doc('bar', {'_key': 'b1'})
+        assert imports == [] and session.pending == 3
+        pao_db.insert_doc('bar', {'_key': 'b2'})
+        pao_db.insert_doc('foo', {'_key': 'f2'})
+        assert imports == [('foo', 2), ('bar', 2), ('foo__bar', 1)]
+        pao_db.insert_doc('foo', {'_key': 'f3'})
+
+    assert imports[-1] == ('foo', 1)
+    assert [(r.collection_name, r.docs, r.created) for r in session.reports][:3] == [
+        ('foo', 2, 1), ('bar', 2, 1), ('foo__bar', 1, 0)
+    ]
+    assert session.errors[0].details == ['bad doc']
+    for name in ['foo', 'bar', 'foo__bar']:
+        collections[name].insert.assert_not_called()
+
+
+def test_session_discards_on_error(pao_db):
+    try:
+        with pao_db.session() as session:
+            pao_db.insert_doc('foo', {'_key': 'f1'})
+            raise ValueError("stop")
+    except ValueError:
+        pass
+
+    assert session.pending == 0 and session.reports == []
+    pao_db.db.collection.return_value.import_bulk.assert_not_called()
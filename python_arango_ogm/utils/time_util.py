@@ -2,6 +2,7 @@ from datetime import datetime
 from contextlib import contextmanager
 from timeit import default_timer as timer
 import sys
+import time
 
 SQL_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 EPI_SQL_DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
@@ -23,3 +24,7 @@ def time_and_log(name: str, silent: bool = False):
     print(f"[{caption}] Processed in in {elapsed:.2f}s.")
     sys.stdout.flush()
   return elapsed
+
+def epoch_millis() -> int:
+  """Milliseconds since the epoch; same as AQL's DATE_NOW()"""
+  return int(time.time() * 1000)